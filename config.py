@@ -4,4 +4,31 @@ BLOCK_BUFFER = 7                        # Gap between the latest block available
 TIME_TO_WAIT_BEFORE_RETRY = 2           # time to wait before retry when RPC is not available
 MAX_RETRIES_PER_BLOCK_RANGE = 7         # Number of time the request will be retried when it has failed before changing the RPC
 COUNT_PERIODIC_BACKFILL_THEGRAPH = 960  # Number of iteration before backfilling the blocks into the DB the blocks of the last few hours (with TheGraph)
-EXPORT_EVENTS_TO_EVENT_QUEUE = False     # Export events to event_queue table (True or False)
\ No newline at end of file
+PERIODIC_BACKFILL_MODE = "reconcile"   # "reconcile": only the events missing from the DB are written, "full": every event of the window goes through add_events_to_db
+PERIODIC_BACKFILL_MAX_REQUEUED_BLOCKS = 120960  # Maximum number of blocks the periodic backfill reaches back for the blocks TheGraph had not indexed yet (120960 blocks = 1 week)
+THEGRAPH_HISTORY_FETCH_PARALLELISM = 4  # Number of block shards fetched concurrently from TheGraph for each entity type during the DB initialization
+THEGRAPH_PAGE_CACHE_ENABLED = False     # Keep the TheGraph pages on disk, so an interrupted DB initialization resumes from the pages already fetched (True or False)
+THEGRAPH_PAGE_CACHE_PATH = "./thegraph_page_cache"  # Directory of the TheGraph page cache
+THEGRAPH_PAGE_CACHE_MAX_MB = 2048       # Size of the TheGraph page cache beyond which the least recently used pages are deleted
+EVENT_QUEUE_SUBSCRIPTIONS = [           # Consumers of the event_queue table, each with its own queue (empty list: no export)
+    # {"consumer": "sale-notify-bot", "event_types": ["OfferAccepted"]},
+    # {"consumer": "my-token-alerts", "event_types": ["OfferCreated", "OfferAccepted"], "tokens": ["0xTOKEN_ADDRESS"]},
+]
+EVENT_BUS_BUFFER_SIZE = 1000            # Maximum number of event batches waiting for each exporter of the event bus (beyond, batches are dropped for this exporter)
+FILE_EXPORT_ENABLED = False             # Export events to NDJSON segment files (True or False)
+FILE_EXPORT_PATH = "./transactions_queue"  # Directory of the NDJSON segment files
+FILE_EXPORT_EVENT_TYPES = ["OfferAccepted"]  # Event types exported to the NDJSON segment files
+FILE_EXPORT_SEGMENT_MAX_EVENTS = 10000  # Number of events after which the active segment file is sealed
+FILE_EXPORT_SEGMENT_MAX_AGE_SECONDS = 3600  # Age after which the active segment file is sealed (also checked when no event arrives)
+ARCHIVE_ENABLED = False                 # Write every event to the columnar Parquet archive (True or False, requires pyarrow)
+ARCHIVE_PATH = "./event_archive"        # Root directory of the Parquet archive
+ARCHIVE_PARTITION_BLOCKS = 1000000      # Number of blocks per partition of the Parquet archive
+ARCHIVE_FLUSH_EVENTS = 50000            # Number of buffered events after which the archive writes a part file
+ARCHIVE_FLUSH_SECONDS = 3600            # Age of the buffered events after which the archive writes a part file (also checked when no event arrives)
+EVENT_QUEUE_MODE = "client"             # "client": exported by the event bus exporter of the indexer, "trigger": enqueued by database triggers on insert
+EVENT_QUEUE_RETENTION_HOURS = 168       # Number of hours an acked event is kept in event_queue before being pruned
+COUNT_PERIODIC_EVENT_QUEUE_PRUNE = 240  # Number of iteration before pruning the acked events of event_queue
+OFFER_EVENTS_PARTITION_LOOKAHEAD = 500000  # Number of blocks ahead of the latest block for which offer_events partitions are pre-created
+COUNT_PERIODIC_GAP_FILL = 240           # Number of iteration before looking for missing block ranges in indexing_state and backfilling them (with TheGraph)
+GAP_FILL_MAX_BLOCKS_PER_REQUEST = 120960  # Maximum number of blocks backfilled at once by the gap filler (120960 blocks = 1 week)
+GAP_FILL_MAX_REQUESTS_PER_CYCLE = 4     # Maximum number of backfills done by the gap filler each time it runs
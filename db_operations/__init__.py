@@ -1,2 +1,6 @@
 from .add_events_to_db import add_events_to_db
-from .fill_db_history import fill_db_history
\ No newline at end of file
+from .add_event_stream_to_db import add_event_stream_to_db
+from .fill_db_history import fill_db_history
+from .partition_maintenance import ensure_offer_events_partitions
+from .rebuild_derived_tables import rebuild_trade_rollups, backfill_trades, rebuild_address_trades
+from .indexing_state import coalesce_indexing_state, get_missing_block_ranges, get_event_keys
\ No newline at end of file
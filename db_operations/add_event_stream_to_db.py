@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from psycopg2.extensions import connection as PGConnection
+
+from .add_events_to_db import add_events_to_db
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def add_event_stream_to_db(
+    pg_conn: PGConnection,
+    pages: Iterable[List[Dict]],
+    batch_size: int = 5000,
+    event_source: str = "history",
+    show_progress: bool = False,
+) -> Tuple[int, Optional[int]]:
+    """
+    Add a stream of YAM event pages to the DB in transactional batches.
+
+    The pages are buffered until `batch_size` events are collected, then written and committed with
+    `add_events_to_db` (one transaction per batch). Only one batch is held in memory, and when the stream
+    fetches its next pages in the background (see `iter_entity_pages_sharded`), the network fetches go
+    on while a batch is written.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+        pages: Iterable of event pages, e.g. a streaming TheGraph fetcher
+        batch_size: Number of events written per transaction
+        event_source: Origin of the events published to the event bus ('live', 'backfill' or 'history')
+        show_progress: Print the number of events written so far
+
+    Returns:
+        Number of events processed and highest block number seen (None for an empty stream)
+    """
+    batch: List[Dict] = []
+    processed_count = 0
+    highest_block_number: Optional[int] = None
+
+    def write_batch() -> None:
+        nonlocal processed_count
+        add_events_to_db(pg_conn, None, None, batch, close_connection=False, event_source=event_source)
+        processed_count += len(batch)
+        if show_progress:
+            print(f"\r{processed_count} events added to the DB".ljust(60), end="", flush=True)
+
+    for page in pages:
+        for event in page:
+            block_number = int(event["blockNumber"])
+            if highest_block_number is None or block_number > highest_block_number:
+                highest_block_number = block_number
+        batch.extend(page)
+
+        if len(batch) >= batch_size:
+            write_batch()
+            batch = []
+
+    if batch:
+        write_batch()
+
+    if show_progress:
+        print()
+    logger.info(f"{processed_count} events from a stream processed in batches of {batch_size}")
+
+    return processed_count, highest_block_number
@@ -3,12 +3,14 @@ from __future__ import annotations
 from typing import List, Dict, Optional
 from psycopg2.extensions import connection as PGConnection
 from app_logging.send_telegram_alert import send_telegram_alert
+from event_bus import EventBatch, get_event_bus
 
 from .internal._event_handlers import (
     _handle_offer_created,
     _handle_offer_accepted,
     _handle_offer_deleted,
     _handle_offer_updated,
+    _refresh_offer_statuses,
 )
 from .internal._db_operations import _update_indexing_state
 
@@ -27,10 +29,18 @@ def add_events_to_db(
     decoded_logs: List[Dict],
     initialisation_mode: bool = False,
     close_connection: bool = True,
+    event_source: str = "live",
+    refresh_offer_status: bool = False,
 ) -> None:
     """
     Add YAM events to a PostgreSQL database.
 
+    Once committed, the events that were not already in the DB are published to the event bus
+    (see event_bus), from which the exporters consume them on their own threads.
+
+    If an event can not be added, the whole batch is rolled back (the block range is not recorded in
+    indexing_state, so the gap filler fetches it again), an alert is sent and nothing is published.
+
     Args:
         pg_conn: Existing PostgreSQL connection
         from_block: Starting block number
@@ -38,7 +48,12 @@ def add_events_to_db(
         decoded_logs: Decoded blockchain event logs
         initialisation_mode: If True, prints progress
         close_connection: Whether this function should close the DB connection
+        event_source: Origin of the events published to the event bus ('live', 'backfill' or 'history')
+        refresh_offer_status: If True, recompute the status of the offers of the inserted events from all
+            their stored events (for events inserted out of chain order, see reconcile_db_block_range)
     """
+    new_logs: List[Dict] = []
+    failed_log: Optional[Dict] = None
 
     try:
         with pg_conn.cursor() as cursor:
@@ -53,18 +68,22 @@ def add_events_to_db(
                     number_of_incorrect_the_graph_logindex += 1
                     continue
                 try:
+                    inserted = False
                     if event_type == "OfferCreated":
-                        _handle_offer_created(cursor, log)
+                        inserted = _handle_offer_created(cursor, log)
                     elif event_type == "OfferAccepted":
-                        _handle_offer_accepted(cursor, log)
+                        inserted = _handle_offer_accepted(cursor, log)
                     elif event_type == "OfferUpdated":
-                        _handle_offer_updated(cursor, log)
+                        inserted = _handle_offer_updated(cursor, log)
                     elif event_type == "OfferDeleted":
-                        _handle_offer_deleted(cursor, log)
-                except Exception as e:
-                    msg = f"event not added to the DB. from block {from_block} to {to_block}. Event: {log}"
-                    logger.exception(msg)
-                    send_telegram_alert(msg)
+                        inserted = _handle_offer_deleted(cursor, log)
+                    if inserted:
+                        new_logs.append(log)
+                except Exception:
+                    # the transaction is aborted: the following events and the indexing state can not be written
+                    logger.exception(f"event not added to the DB. from block {from_block} to {to_block}. Event: {log}")
+                    failed_log = log
+                    break
 
                 if initialisation_mode:
                     print("\r" + " " * 70, end="", flush=True)
@@ -74,10 +93,27 @@ def add_events_to_db(
                         flush=True,
                     )
 
-            if from_block is not None and to_block is not None:
-                _update_indexing_state(cursor, from_block, to_block)
+            if failed_log is None:
+                if refresh_offer_status and new_logs:
+                    _refresh_offer_statuses(cursor, new_logs)
 
-        pg_conn.commit()
+                if from_block is not None and to_block is not None:
+                    _update_indexing_state(cursor, from_block, to_block)
+
+        if failed_log is not None:
+            pg_conn.rollback()
+            msg = (
+                f"{len(decoded_logs)} event(s) rolled back after a failed insert. from block {from_block} to {to_block}. "
+                f"Event: {failed_log}"
+            )
+            logger.error(msg)
+            send_telegram_alert(msg)
+            new_logs = []
+        else:
+            pg_conn.commit()
     finally:
         if close_connection:
-            pg_conn.close()
\ No newline at end of file
+            pg_conn.close()
+
+    # only committed events are published
+    get_event_bus().publish(EventBatch(source=event_source, from_block=from_block, to_block=to_block, events=new_logs))
\ No newline at end of file
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import List, Dict, Any
+from psycopg2.extensions import connection as PGConnection
+
+from .internal._event_handlers import (
+    _handle_offer_created,
+    _handle_offer_accepted,
+    _handle_offer_updated,
+    _refresh_offer_statuses,
+)
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Blocks of the synthetic offer: the first offer_events partition starts before the YAM contract
+# creation block (25530394), so these blocks never hold a real event.
+_CHECK_FIRST_BLOCK = 25000001
+_CHECK_SELLER = "0x" + "00" * 19 + "01"
+_CHECK_BUYER = "0x" + "00" * 19 + "02"
+_CHECK_OFFER_TOKEN = "0x" + "00" * 19 + "03"
+_CHECK_BUYER_TOKEN = "0x" + "00" * 19 + "04"
+
+
+def _build_check_logs(offer_id: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Events of an offer created with 10 units, updated to 5 units, then sold out by a fill of 5 units.
+    """
+    def log(topic: str, block_offset: int, **fields: Any) -> Dict[str, Any]:
+        return {
+            "topic": topic,
+            "offerId": offer_id,
+            "transactionHash": "0x" + "00" * 31 + f"{block_offset:02x}",
+            "blockNumber": _CHECK_FIRST_BLOCK + block_offset,
+            "logIndex": 0,
+            "timestamp": 1700000000 + block_offset * 5,
+            **fields,
+        }
+
+    return {
+        "OfferCreated": log(
+            "OfferCreated", 0, seller=_CHECK_SELLER, amount=10, price=1,
+            offerToken=_CHECK_OFFER_TOKEN, buyerToken=_CHECK_BUYER_TOKEN,
+        ),
+        "OfferUpdated": log("OfferUpdated", 1, newAmount=5, newPrice=1),
+        "OfferAccepted": log("OfferAccepted", 2, buyer=_CHECK_BUYER, amount=5, price=1),
+    }
+
+
+def check_reconcile_offer_status(pg_conn: PGConnection) -> List[str]:
+    """
+    Check that a reconciliation writing a missed event leaves its offer with the right status.
+
+    A synthetic offer is stored as by a live loop that missed its OfferUpdated: the offer and the later
+    OfferAccepted that sells it out are inserted, then the OfferUpdated is inserted alone, as by
+    `reconcile_db_block_range`. The offer must end up 'SoldOut'. Everything is written in a single
+    transaction that is always rolled back, so the check can run against the production database.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+
+    Returns:
+        List of failure messages (empty when the check passed)
+    """
+    failures: List[str] = []
+
+    try:
+        with pg_conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(offer_id), 0) + 1 FROM offers")
+            offer_id = cursor.fetchone()[0]
+            logs = _build_check_logs(offer_id)
+
+            # live loop: the OfferUpdated is missed
+            _handle_offer_created(cursor, logs["OfferCreated"])
+            _handle_offer_accepted(cursor, logs["OfferAccepted"])
+
+            # reconciliation: the missing OfferUpdated is inserted alone, then the statuses are refreshed
+            missing_logs = [logs["OfferUpdated"]]
+            _handle_offer_updated(cursor, logs["OfferUpdated"])
+            _refresh_offer_statuses(cursor, missing_logs)
+
+            cursor.execute("SELECT status FROM offers WHERE offer_id = %s", (offer_id,))
+            status = cursor.fetchone()[0]
+            if status != "SoldOut":
+                failures.append(
+                    f"offer sold out after a missed OfferUpdated: status '{status}' after the reconciliation (expected 'SoldOut')"
+                )
+
+            logger.info(f"status of the synthetic offer {offer_id} after the reconciliation: {status}")
+    finally:
+        pg_conn.rollback()
+
+    return failures
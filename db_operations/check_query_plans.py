@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from typing import List, Dict, Any, Set
+from psycopg2.extensions import connection as PGConnection, cursor as PGCursor
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Query examples of the readme (section "Database Query Examples") and the index each one must use.
+# Keep this list in sync with the readme when an example is added or modified.
+QUERY_PLAN_EXPECTATIONS: List[Dict[str, Any]] = [
+    {
+        "name": "active offers",
+        "query": """
+            SELECT offer_id
+            FROM public.offers
+            WHERE status = 'InProgress'
+            ORDER BY offer_id
+        """,
+        "params": (),
+        "expected_indexes": {"idx_offers_active_offer_id"},
+    },
+    {
+        "name": "active offers of a seller",
+        "query": """
+            SELECT offer_id
+            FROM public.offers
+            WHERE seller_address = %s
+              AND status = 'InProgress'
+            ORDER BY offer_id
+        """,
+        "params": ("0xADDRESS",),
+        "expected_indexes": {"idx_offers_active_seller_address"},
+    },
+    {
+        "name": "event history of an offer",
+        "query": """
+            SELECT
+              event_type, block_number, transaction_hash, log_index, event_timestamp,
+              amount, price, buyer_address, amount_bought, price_bought
+            FROM public.offer_events
+            WHERE offer_id = %s
+            ORDER BY block_number ASC, log_index ASC
+        """,
+        "params": (220191,),
+        "expected_indexes": {"idx_offer_events_offer_id_chain_order"},
+    },
+    {
+        "name": "events of an address for an offer token",
+        "query": """
+            SELECT
+              e.offer_id, o.seller_address, e.buyer_address, e.event_type, e.event_timestamp,
+              e.amount, e.price, e.amount_bought, e.price_bought, e.transaction_hash, e.log_index
+            FROM public.offer_events e
+            JOIN public.offers o ON o.offer_id = e.offer_id
+            WHERE (
+                    o.seller_address = %s
+                 OR e.buyer_address  = %s
+                  )
+              AND o.offer_token = %s
+            ORDER BY e.block_number ASC, e.log_index ASC
+        """,
+        "params": ("0xADDRESS", "0xADDRESS", "0xTOKEN_ADDRESS"),
+        "expected_indexes": {"idx_offers_offer_token_seller_address"},
+    },
+    {
+        "name": "active offers of a token pair",
+        "query": """
+            SELECT offer_id, seller_address, initial_amount, price_per_unit
+            FROM public.offers
+            WHERE offer_token = %s
+              AND buyer_token = %s
+              AND status = 'InProgress'
+        """,
+        "params": ("0xTOKEN_ADDRESS", "0xBUYER_TOKEN_ADDRESS"),
+        "expected_indexes": {"idx_offers_active_token_pair"},
+    },
+    {
+        "name": "purchases of an address over a period",
+        "query": """
+            SELECT offer_id, event_timestamp, amount_bought, price_bought, transaction_hash
+            FROM public.offer_events
+            WHERE event_type = 'OfferAccepted'
+              AND buyer_address = %s
+              AND event_timestamp >= %s
+              AND event_timestamp <  %s
+            ORDER BY event_timestamp ASC
+        """,
+        "params": ("0xADDRESS", "2025-01-01", "2026-01-01"),
+        "expected_indexes": {"idx_offer_events_fills_by_buyer"},
+    },
+    {
+        "name": "sales of an address",
+        "query": """
+            SELECT
+              block_number, log_index, offer_id, buyer_address, offer_token, buyer_token,
+              amount, price, event_timestamp
+            FROM public.trades
+            WHERE seller_address = %s
+            ORDER BY block_number ASC, log_index ASC
+        """,
+        "params": ("0xADDRESS",),
+        "expected_indexes": {"idx_trades_seller_address"},
+    },
+    {
+        "name": "yearly trade ledger of an address",
+        "query": """
+            SELECT
+              event_timestamp, direction, counterparty, offer_token, buyer_token,
+              amount, price, transaction_hash
+            FROM public.address_trades
+            WHERE address = %s
+              AND event_timestamp >= %s
+              AND event_timestamp <  %s
+            ORDER BY event_timestamp ASC
+        """,
+        "params": ("0xADDRESS", "2025-01-01", "2026-01-01"),
+        "expected_indexes": {"idx_address_trades_address_timestamp"},
+    },
+    {
+        "name": "daily volume and VWAP of a token pair",
+        "query": """
+            SELECT bucket_start, trade_count, volume, vwap
+            FROM public.trade_rollups_daily
+            WHERE offer_token = %s
+              AND buyer_token = %s
+              AND bucket_start >= %s
+            ORDER BY bucket_start ASC
+        """,
+        "params": ("0xTOKEN_ADDRESS", "0xBUYER_TOKEN_ADDRESS", "2025-01-01"),
+        "expected_indexes": {"trade_rollups_daily_pkey"},
+    },
+]
+
+
+def _collect_plan_nodes(plan: Dict[str, Any], nodes: List[Dict[str, Any]]) -> None:
+    nodes.append(plan)
+    for child in plan.get("Plans", []):
+        _collect_plan_nodes(child, nodes)
+
+
+def _get_root_index_name(cursor: PGCursor, index_name: str) -> str:
+    """
+    Indexes of a partitioned table are attached to one index per partition, with a generated name.
+    Walk up pg_inherits to return the name of the index declared on the parent table.
+    """
+    cursor.execute(
+        """
+        WITH RECURSIVE parents AS (
+            SELECT c.oid, c.relname, 0 AS depth
+            FROM pg_class c
+            WHERE c.relname = %s
+          UNION ALL
+            SELECT pc.oid, pc.relname, p.depth + 1
+            FROM parents p
+            JOIN pg_inherits i ON i.inhrelid = p.oid
+            JOIN pg_class pc ON pc.oid = i.inhparent
+        )
+        SELECT relname FROM parents ORDER BY depth DESC LIMIT 1
+        """,
+        (index_name,),
+    )
+    row = cursor.fetchone()
+    return row[0] if row else index_name
+
+
+def check_query_plans(pg_conn: PGConnection) -> List[str]:
+    """
+    Run EXPLAIN on each query example of the readme and check it is served by its expected index.
+
+    Sequential scans are disabled for the check: on a small or freshly created database the planner
+    would rightfully prefer them, while the goal here is to detect a missing or unusable index.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+
+    Returns:
+        List of failure messages (empty when every plan uses its expected index)
+    """
+    failures: List[str] = []
+
+    try:
+        with pg_conn.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for expectation in QUERY_PLAN_EXPECTATIONS:
+                cursor.execute("EXPLAIN (FORMAT JSON) " + expectation["query"], expectation["params"])
+                plan = cursor.fetchone()[0][0]["Plan"]
+
+                nodes: List[Dict[str, Any]] = []
+                _collect_plan_nodes(plan, nodes)
+
+                used_indexes: Set[str] = {
+                    _get_root_index_name(cursor, node["Index Name"])
+                    for node in nodes
+                    if "Index Name" in node
+                }
+                seq_scans = sorted({node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"})
+
+                missing_indexes = expectation["expected_indexes"] - used_indexes
+                if missing_indexes:
+                    failures.append(
+                        f"{expectation['name']}: expected index(es) {sorted(missing_indexes)} not used "
+                        f"(used: {sorted(used_indexes)})"
+                    )
+                if seq_scans:
+                    failures.append(f"{expectation['name']}: sequential scan on {seq_scans}")
+
+                logger.info(f"query plan of '{expectation['name']}' uses {sorted(used_indexes)}")
+    finally:
+        pg_conn.rollback()
+
+    return failures
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import RealDictCursor
+
+from event_handlers.archive_events import ParquetEventArchive
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# One archive row per event of the partition: OfferCreated from offers, the other event types
+# from offer_events (with the seller and the tokens of their offer)
+_ARCHIVE_ROWS_QUERY = """
+    SELECT
+      'OfferCreated'                    AS topic,
+      o.block_number, o.log_index, o.transaction_hash, o.offer_id,
+      o.seller_address                  AS seller,
+      NULL                              AS buyer,
+      o.offer_token, o.buyer_token,
+      o.price_per_unit                  AS price,
+      o.initial_amount                  AS amount,
+      NULL AS old_price, NULL AS old_amount, NULL AS new_price, NULL AS new_amount,
+      EXTRACT(EPOCH FROM o.creation_timestamp)::BIGINT AS timestamp
+    FROM public.offers o
+    WHERE o.block_number BETWEEN %(from_block)s AND %(to_block)s
+  UNION ALL
+    SELECT
+      e.event_type,
+      e.block_number, e.log_index, e.transaction_hash, e.offer_id,
+      CASE WHEN e.event_type = 'OfferAccepted' THEN o.seller_address END,
+      e.buyer_address,
+      CASE WHEN e.event_type = 'OfferAccepted' THEN o.offer_token END,
+      CASE WHEN e.event_type = 'OfferAccepted' THEN o.buyer_token END,
+      e.price_bought,
+      e.amount_bought,
+      NULL, NULL,  -- the previous price and amount of an OfferUpdated are not stored in the DB
+      CASE WHEN e.event_type = 'OfferUpdated' THEN e.price END,
+      CASE WHEN e.event_type = 'OfferUpdated' THEN e.amount END,
+      EXTRACT(EPOCH FROM e.event_timestamp)::BIGINT
+    FROM public.offer_events e
+    JOIN public.offers o ON o.offer_id = e.offer_id
+    WHERE e.block_number BETWEEN %(from_block)s AND %(to_block)s
+"""
+
+
+def export_archive_from_db(pg_conn: PGConnection, archive_path: str, partition_blocks: int = 1000000, from_block: Optional[int] = None) -> int:
+    """
+    (Re)build the Parquet event archive from the events stored in the DB, one partition at a time.
+
+    Each partition of the archive is replaced by the content of the DB for its block range, so this
+    can be used to create the archive of an existing database or to repair it. It should not run
+    while the indexer writes to the archive. The DB does not store the previous price and amount of an
+    OfferUpdated: `old_price` and `old_amount` are null in the rebuilt partitions.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+        archive_path: Root directory of the archive
+        partition_blocks: Number of blocks per partition (must match ARCHIVE_PARTITION_BLOCKS)
+        from_block: Only rebuild the partitions from the one holding this block (default: all of them)
+
+    Returns:
+        Number of events written
+    """
+    archive = ParquetEventArchive(archive_path, partition_blocks)
+
+    with pg_conn.cursor() as cursor:
+        cursor.execute("SELECT MIN(block_number), MAX(block_number) FROM public.offers")
+        min_block, max_block = cursor.fetchone()
+        cursor.execute("SELECT MAX(block_number) FROM public.offer_events")
+        max_event_block = cursor.fetchone()[0]
+    pg_conn.commit()
+
+    if min_block is None:
+        return 0
+    max_block = max(max_block, max_event_block or max_block)
+    if from_block is not None:
+        if from_block > max_block:
+            return 0
+        min_block = max(min_block, from_block)
+
+    written_count = 0
+    for partition_start in range(archive.get_partition_start(min_block), max_block + 1, partition_blocks):
+        with pg_conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(
+                _ARCHIVE_ROWS_QUERY,
+                {"from_block": partition_start, "to_block": partition_start + partition_blocks - 1},
+            )
+            rows: List[Dict[str, Any]] = [dict(row) for row in cursor.fetchall()]
+        pg_conn.commit()
+
+        archive.replace_partition(partition_start, rows)
+        written_count += len(rows)
+        logger.info(f"event archive: partition starting at block {partition_start} rebuilt with {len(rows)} event(s)")
+
+    archive.set_repaired(max_block)
+    return written_count
@@ -1,9 +1,12 @@
-from db_operations import add_events_to_db
+from db_operations import add_events_to_db, add_event_stream_to_db
 from db_operations.add_events_to_db import get_number_of_incorrect_the_graph_logindex
 from db_operations.internal._db_operations import _get_pg_connection
-from the_graphe_handler.internals import fetch_all_offer_created, fetch_all_offer_deleted, fetch_all_offer_updated, fetch_all_offer_accepted, fetch_offer_created_from_block_range
+from db_operations.partition_maintenance import ensure_offer_events_partitions
+from the_graphe_handler.internals import iter_all_offer_created_pages, iter_all_offer_accepted_pages, iter_all_offer_updated_pages, iter_all_offer_deleted_pages, fetch_offer_created_from_block_range, get_page_cache
+from the_graphe_handler.internals._graphql_paginator import merge_entity_streams, fetch_snapshot_block, resolve_subgraph_url, YAM_CONTRACT_CREATION_BLOCK
 from event_handlers.get_and_decode_event_yam import get_raw_logs_yam_by_topic, decode_raw_logs_yam
 from app_logging.send_telegram_alert import send_telegram_alert
+from config import THEGRAPH_HISTORY_FETCH_PARALLELISM
 from concurrent.futures import ThreadPoolExecutor
 from web3 import Web3
 from web3.exceptions import Web3RPCError
@@ -21,7 +24,7 @@ load_dotenv()
 
 POSTGRES_WRITER_USER = "yam-indexing-writer"
 
-START_BLOCK = 25530394 # block creation for the yam v1 contract
+START_BLOCK = YAM_CONTRACT_CREATION_BLOCK # block creation for the yam v1 contract
 BTACH_SIZE_BLOCK = 7500  # number of block to retrieve each request
 
 # Dictionary of YAM event topic hashes for efficient lookup
@@ -45,6 +48,20 @@ API_KEY = os.getenv("YAM_INDEXING_THE_GRAPH_API_KEY")
 with open('ressources/blockchain_contracts.json', 'r') as f:
     yam_contract_address = json.load(f)['contracts']['yamv1']['address']
 
+HISTORY_SNAPSHOT_PIN = "fill_db_history"  # name of the snapshot block pinned in the page cache until the history is filled
+
+
+def _iter_history_pages(iter_all_pages, history_snapshot_block: int, snapshot_block: int):
+    """
+    Yield the pages of an event type from START_BLOCK: up to `history_snapshot_block` read at this block, then
+    the blocks indexed since, read at `snapshot_block`. Both parts are in chain order, so their chaining is too.
+    Only the first part, read at the pinned snapshot block, goes through the page cache.
+    """
+    yield from iter_all_pages(API_KEY, SUBGRAPH_URL, START_BLOCK, THEGRAPH_HISTORY_FETCH_PARALLELISM, history_snapshot_block, use_page_cache=True)
+    if snapshot_block > history_snapshot_block:
+        yield from iter_all_pages(API_KEY, SUBGRAPH_URL, history_snapshot_block + 1, THEGRAPH_HISTORY_FETCH_PARALLELISM, snapshot_block)
+
+
 def fill_db_history():
 
     def is_rpc_timeout(exc: Exception) -> bool:
@@ -83,6 +100,9 @@ def fill_db_history():
         raise SystemExit(msg)
 
     try:
+        # create the offer_events partitions for the whole history (and the coming blocks)
+        ensure_offer_events_partitions(pg_conn, latest_block_number)
+
         # Fetch from w3 RPC all offerCreated and add them to the DB
         logger.info("step 1/4 : fetching offer created from w3 RPC")
         print("\nofferCreated with w3 RPC:")
@@ -173,16 +193,24 @@ def fill_db_history():
                     )
                     last_logged_step = current_step
 
-        add_events_to_db(pg_conn=pg_conn, from_block=None, to_block=None, decoded_logs=created_offers_w3, initialisation_mode=True, close_connection=False)
+        add_events_to_db(pg_conn=pg_conn, from_block=None, to_block=None, decoded_logs=created_offers_w3, initialisation_mode=True, close_connection=False, event_source="history")
         pg_conn.commit()
 
         # Fetch from TheGraph all offerCreated and add them to the DB
         logger.info("step 2/4 : fetching offer created from The Graph")
         print("\nofferCreated with TheGraph:")
-        created_offers_the_graph = []
-        created_offers_the_graph = fetch_all_offer_created(API_KEY, SUBGRAPH_URL)
-        add_events_to_db(pg_conn=pg_conn, from_block=None, to_block=None, decoded_logs=created_offers_the_graph, initialisation_mode=True, close_connection=False)
-        pg_conn.commit()
+        # With the page cache, the history is read at the snapshot block of a previous run interrupted by a crash
+        # (its pages are on disk): only the missing pages and the blocks indexed since are requested
+        snapshot_block = fetch_snapshot_block(resolve_subgraph_url(SUBGRAPH_URL, API_KEY), API_KEY)
+        page_cache = get_page_cache()
+        history_snapshot_block = page_cache.pin_snapshot_block(HISTORY_SNAPSHOT_PIN, snapshot_block) if page_cache else snapshot_block
+        # pages are written in batches while the next ones are fetched
+        _, highest_created_block_the_graph = add_event_stream_to_db(
+            pg_conn,
+            _iter_history_pages(iter_all_offer_created_pages, history_snapshot_block, snapshot_block),
+            event_source="history",
+            show_progress=True,
+        )
 
         # check the number of offer_id in the table to make sure there are no missing created offer
         cur = pg_conn.cursor()
@@ -295,7 +323,7 @@ def fill_db_history():
                     )
                     last_logged_step = current_step
         
-        add_events_to_db(pg_conn=pg_conn, from_block=None, to_block=None, decoded_logs=accepted_updated_deleted_offers_w3, initialisation_mode=True, close_connection=False)
+        add_events_to_db(pg_conn=pg_conn, from_block=None, to_block=None, decoded_logs=accepted_updated_deleted_offers_w3, initialisation_mode=True, close_connection=False, event_source="history")
         pg_conn.commit()
 
         # fetch new offers with w3 RPC that might have been created after the start of this script
@@ -303,7 +331,7 @@ def fill_db_history():
         
         highest_block_number = max(
             int(created_offers_w3[-1]['blockNumber']),
-            int(created_offers_the_graph[-1]['blockNumber'])
+            highest_created_block_the_graph or START_BLOCK
         )
         
         latest_block_number = w3_1.eth.block_number
@@ -315,29 +343,35 @@ def fill_db_history():
             decoded_logs = decode_raw_logs_yam(raw_logs)
             created_offers_w3_second_iteration.extend(decoded_logs)
             time.sleep(0.05)
-        add_events_to_db(pg_conn=pg_conn, from_block=None, to_block=None, decoded_logs=created_offers_w3_second_iteration, initialisation_mode=False, close_connection=False)
+        add_events_to_db(pg_conn=pg_conn, from_block=None, to_block=None, decoded_logs=created_offers_w3_second_iteration, initialisation_mode=False, close_connection=False, event_source="history")
         pg_conn.commit()
 
 
         # Fetch from TheGraph all offerAccepted/offerDeleted/offerUpdated and add them to the DB
         logger.info("step 4/4 : fetching offerAccepted, offerUpdated and offerDeleted from TheGraph")
         print("\nofferAccepted, offerUpdated and offerDeleted with TheGrpah:")
-        accepted_offers_the_graph = fetch_all_offer_accepted(API_KEY, SUBGRAPH_URL)
-        updated_offers_the_graph = fetch_all_offer_updated(API_KEY, SUBGRAPH_URL)
-        deleted_offers_the_graph = fetch_all_offer_deleted(API_KEY, SUBGRAPH_URL)
         latest_block_number = w3_1.eth.block_number
         created_offers_the_graph = fetch_offer_created_from_block_range(SUBGRAPH_URL, API_KEY, highest_block_number, latest_block_number)
-        all_events_the_graph = created_offers_the_graph + accepted_offers_the_graph + updated_offers_the_graph + deleted_offers_the_graph
-        all_events_sorted_the_graph = sorted(all_events_the_graph, key=lambda x: x['timestamp'])
-        add_events_to_db(pg_conn=pg_conn, from_block=None, to_block=None, decoded_logs=all_events_sorted_the_graph, initialisation_mode=True, close_connection=False)
-        pg_conn.commit()
+        snapshot_block = fetch_snapshot_block(resolve_subgraph_url(SUBGRAPH_URL, API_KEY), API_KEY)
+        # the four streams are in chain order: merged, the events are written in the order they were emitted
+        _, highest_block_the_graph = add_event_stream_to_db(
+            pg_conn,
+            merge_entity_streams([
+                [created_offers_the_graph],
+                _iter_history_pages(iter_all_offer_accepted_pages, history_snapshot_block, snapshot_block),
+                _iter_history_pages(iter_all_offer_updated_pages, history_snapshot_block, snapshot_block),
+                _iter_history_pages(iter_all_offer_deleted_pages, history_snapshot_block, snapshot_block),
+            ]),
+            event_source="history",
+            show_progress=True,
+        )
 
 
         highest_block_number = max(
             int(created_offers_w3[-1]['blockNumber']),
-            int(created_offers_the_graph[-1]['blockNumber']),
+            highest_created_block_the_graph or START_BLOCK,
             int(created_offers_w3_second_iteration[-1]['blockNumber']),
-            int(all_events_sorted_the_graph[-1]['blockNumber'])
+            highest_block_the_graph or START_BLOCK
         )
 
         # Add indexing state record
@@ -347,9 +381,11 @@ def fill_db_history():
             INSERT INTO indexing_state (from_block, to_block)
             VALUES (%s, %s)
             """,
-            (25530394, highest_block_number),
+            (START_BLOCK, highest_block_number),
         )
         pg_conn.commit()
+        if page_cache:
+            page_cache.unpin_snapshot_block(HISTORY_SNAPSHOT_PIN)
         
         logger.info(f"Total number of TheGraph event not added because of a incorrect logIndex: {get_number_of_incorrect_the_graph_logindex()}")
         logger.info(f'Filling DB history completed ! DB indexed up to block {highest_block_number}')
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import List, Set, Tuple
+from psycopg2.extensions import connection as PGConnection
+
+from .internal._db_operations import _coalesce_indexing_state, _get_missing_block_ranges, _get_event_keys
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def coalesce_indexing_state(pg_conn: PGConnection) -> int:
+    """
+    Merge the overlapping or adjacent rows of indexing_state into one row per contiguous indexed range.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+
+    Returns:
+        Number of rows removed
+    """
+    try:
+        with pg_conn.cursor() as cursor:
+            removed_count = _coalesce_indexing_state(cursor)
+        pg_conn.commit()
+    except Exception:
+        pg_conn.rollback()
+        raise
+
+    if removed_count:
+        logger.info(f"indexing_state coalesced: {removed_count} row(s) merged")
+
+    return removed_count
+
+
+def get_missing_block_ranges(
+    pg_conn: PGConnection,
+    start_block: int,
+    end_block: int,
+) -> List[Tuple[int, int]]:
+    """
+    Return the block ranges between `start_block` and `end_block` that have never been indexed.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+        start_block: First block of the span to check (e.g. the creation block of the YAM contract)
+        end_block: Last block of the span to check (e.g. the chain head)
+
+    Returns:
+        List of (from_block, to_block) tuples (inclusive), in ascending order
+    """
+    with pg_conn.cursor() as cursor:
+        missing_ranges = _get_missing_block_ranges(cursor, start_block, end_block)
+    pg_conn.commit()
+    return missing_ranges
+
+
+def get_event_keys(
+    pg_conn: PGConnection,
+    from_block: int,
+    to_block: int,
+) -> Set[Tuple[int, int]]:
+    """
+    Return the keys of the events already stored for a block range, with a single query.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+        from_block: First block of the range (inclusive)
+        to_block: Last block of the range (inclusive)
+
+    Returns:
+        Set of (block_number, log_index) of the offers and offer_events of the range
+    """
+    with pg_conn.cursor() as cursor:
+        event_keys = _get_event_keys(cursor, from_block, to_block)
+    pg_conn.commit()
+    return event_keys
@@ -0,0 +1,101 @@
+from psycopg2.extensions import cursor as PGCursor
+
+
+_ADDRESS_TRADES_COLUMNS = """
+    address, block_number, log_index, direction, counterparty, offer_id, transaction_hash,
+    offer_token, buyer_token, amount, price, quote_value, event_timestamp
+"""
+
+
+def _insert_address_trades(
+    cursor: PGCursor,
+    block_number: int,
+    log_index: int,
+) -> None:
+    """
+    Add a fill of the trades table to the ledger of its buyer and of its seller.
+    Must be called in the same transaction as the trades insert.
+    """
+    cursor.execute(
+        f"""
+        INSERT INTO address_trades ({_ADDRESS_TRADES_COLUMNS})
+        SELECT
+            t.buyer_address, t.block_number, t.log_index, 'buy', t.seller_address, t.offer_id, t.transaction_hash,
+            t.offer_token, t.buyer_token, t.amount, t.price, t.quote_value, t.event_timestamp
+        FROM trades t
+        WHERE t.block_number = %(block_number)s AND t.log_index = %(log_index)s
+        UNION ALL
+        SELECT
+            t.seller_address, t.block_number, t.log_index, 'sell', t.buyer_address, t.offer_id, t.transaction_hash,
+            t.offer_token, t.buyer_token, t.amount, t.price, t.quote_value, t.event_timestamp
+        FROM trades t
+        WHERE t.block_number = %(block_number)s AND t.log_index = %(log_index)s
+        ON CONFLICT (address, block_number, log_index, direction) DO NOTHING
+        """,
+        {"block_number": block_number, "log_index": log_index},
+    )
+
+
+def _backfill_address_trades(
+    cursor: PGCursor,
+    from_block: int,
+    to_block: int,
+) -> int:
+    """
+    Add to the ledger the OfferAccepted events of offer_events between `from_block` and `to_block` (inclusive).
+    Rows already present are left untouched. Returns the number of ledger rows inserted.
+    """
+    cursor.execute(
+        f"""
+        WITH fills AS (
+            SELECT
+                e.block_number,
+                e.log_index,
+                e.offer_id,
+                e.transaction_hash,
+                o.seller_address,
+                e.buyer_address,
+                o.offer_token,
+                o.buyer_token,
+                e.amount_bought::numeric AS amount,
+                e.price_bought::numeric  AS price,
+                e.event_timestamp
+            FROM offer_events e
+            JOIN offers o ON o.offer_id = e.offer_id
+            WHERE e.event_type = 'OfferAccepted'
+              AND e.block_number BETWEEN %s AND %s
+        )
+        INSERT INTO address_trades ({_ADDRESS_TRADES_COLUMNS})
+        SELECT
+            buyer_address, block_number, log_index, 'buy', seller_address, offer_id, transaction_hash,
+            offer_token, buyer_token, amount, price, amount * price, event_timestamp
+        FROM fills
+        UNION ALL
+        SELECT
+            seller_address, block_number, log_index, 'sell', buyer_address, offer_id, transaction_hash,
+            offer_token, buyer_token, amount, price, amount * price, event_timestamp
+        FROM fills
+        ON CONFLICT (address, block_number, log_index, direction) DO NOTHING
+        """,
+        (from_block, to_block),
+    )
+    return cursor.rowcount
+
+
+def _rebuild_address_trades(cursor: PGCursor) -> int:
+    """
+    Recompute the ledger from the OfferAccepted events of offer_events. Returns the number of ledger rows inserted.
+
+    The ledger is locked first: the indexer waits for the rebuild to commit before adding
+    fills to it, so that readers never see a partially rebuilt ledger and no fill is lost.
+    """
+    cursor.execute("LOCK TABLE address_trades IN EXCLUSIVE MODE")
+    cursor.execute("DELETE FROM address_trades")
+
+    cursor.execute(
+        "SELECT MIN(block_number), MAX(block_number) FROM offer_events WHERE event_type = 'OfferAccepted'"
+    )
+    min_block, max_block = cursor.fetchone()
+    if min_block is None:
+        return 0
+    return _backfill_address_trades(cursor, min_block, max_block)
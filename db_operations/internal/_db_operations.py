@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Optional, List, Set, Tuple
 import psycopg2
 from psycopg2.extensions import cursor as PGCursor, connection as PGConnection
 
@@ -10,34 +10,152 @@ def _update_indexing_state(
     from_block: int,
     to_block: int,
 ) -> None:
+    """
+    Add [from_block, to_block] to the indexed ranges.
+
+    indexing_state is kept as a set of disjoint ranges: the new range is merged with every
+    range it overlaps or touches, so the table holds one row per contiguous indexed span.
+    """
     cursor.execute(
         "SELECT indexing_id, from_block, to_block "
         "FROM indexing_state "
-        "ORDER BY indexing_id DESC "
-        "LIMIT 1"
+        "WHERE from_block <= %s AND to_block >= %s "
+        "ORDER BY from_block "
+        "FOR UPDATE",
+        (to_block + 1, from_block - 1),
+    )
+    touching_entries = cursor.fetchall()
+
+    if not touching_entries:
+        cursor.execute(
+            "INSERT INTO indexing_state (from_block, to_block) VALUES (%s, %s)",
+            (from_block, to_block),
+        )
+        return
+
+    merged_from = min([from_block] + [entry[1] for entry in touching_entries])
+    merged_to = max([to_block] + [entry[2] for entry in touching_entries])
+
+    kept_id, kept_from, kept_to = touching_entries[0]
+    if (kept_from, kept_to) != (merged_from, merged_to):
+        cursor.execute(
+            "UPDATE indexing_state SET from_block = %s, to_block = %s WHERE indexing_id = %s",
+            (merged_from, merged_to, kept_id),
+        )
+
+    merged_ids = [entry[0] for entry in touching_entries[1:]]
+    if merged_ids:
+        cursor.execute(
+            "DELETE FROM indexing_state WHERE indexing_id = ANY(%s)",
+            (merged_ids,),
+        )
+
+
+def _coalesce_indexing_state(cursor: PGCursor) -> int:
+    """
+    Merge the overlapping or adjacent ranges of indexing_state (rows written before it was kept coalesced).
+    Returns the number of rows removed.
+    """
+    cursor.execute("LOCK TABLE indexing_state IN SHARE ROW EXCLUSIVE MODE")
+    cursor.execute(
+        """
+        WITH ordered AS (
+            SELECT
+                from_block,
+                to_block,
+                MAX(to_block) OVER (
+                    ORDER BY from_block, to_block
+                    ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                ) AS previous_max_to
+            FROM indexing_state
+        ),
+        islands AS (
+            SELECT
+                from_block,
+                to_block,
+                SUM(CASE WHEN previous_max_to IS NULL OR from_block > previous_max_to + 1 THEN 1 ELSE 0 END)
+                    OVER (ORDER BY from_block, to_block) AS island
+            FROM ordered
+        )
+        SELECT MIN(from_block), MAX(to_block)
+        FROM islands
+        GROUP BY island
+        ORDER BY 1
+        """
     )
-    most_recent_entry = cursor.fetchone()
-
-    if most_recent_entry is not None:
-        indexing_id, last_from, last_to = most_recent_entry
-        if last_from <= from_block <= (last_to + 1) and to_block > last_to:
-            cursor.execute(
-                "UPDATE indexing_state SET to_block = %s WHERE indexing_id = %s",
-                (to_block, indexing_id),
-            )
-            return
-
-    if most_recent_entry is None or to_block > most_recent_entry[2]:
+    coalesced_ranges = cursor.fetchall()
+
+    cursor.execute("SELECT COUNT(*) FROM indexing_state")
+    row_count = cursor.fetchone()[0]
+
+    if len(coalesced_ranges) == row_count:
+        return 0
+
+    cursor.execute("DELETE FROM indexing_state")
+    for from_block, to_block in coalesced_ranges:
         cursor.execute(
             "INSERT INTO indexing_state (from_block, to_block) VALUES (%s, %s)",
             (from_block, to_block),
         )
+    return row_count - len(coalesced_ranges)
+
+
+def _get_missing_block_ranges(
+    cursor: PGCursor,
+    start_block: int,
+    end_block: int,
+) -> List[Tuple[int, int]]:
+    """
+    Return the block ranges (inclusive) between `start_block` and `end_block` that are not covered
+    by indexing_state, in ascending order.
+    """
+    cursor.execute(
+        "SELECT from_block, to_block "
+        "FROM indexing_state "
+        "WHERE to_block >= %s AND from_block <= %s "
+        "ORDER BY from_block",
+        (start_block, end_block),
+    )
+
+    missing_ranges: List[Tuple[int, int]] = []
+    next_block = start_block
+    for from_block, to_block in cursor.fetchall():
+        if from_block > next_block:
+            missing_ranges.append((next_block, from_block - 1))
+        next_block = max(next_block, to_block + 1)
+
+    if next_block <= end_block:
+        missing_ranges.append((next_block, end_block))
+
+    return missing_ranges
+
+
+def _get_event_keys(
+    cursor: PGCursor,
+    from_block: int,
+    to_block: int,
+) -> Set[Tuple[int, int]]:
+    """
+    Return the (block_number, log_index) of all the events (offers and offer_events) stored between
+    `from_block` and `to_block` (inclusive).
+    """
+    cursor.execute(
+        """
+        SELECT block_number, log_index FROM offers
+        WHERE block_number BETWEEN %s AND %s
+        UNION ALL
+        SELECT block_number, log_index FROM offer_events
+        WHERE block_number BETWEEN %s AND %s
+        """,
+        (from_block, to_block, from_block, to_block),
+    )
+    return {(int(block_number), int(log_index)) for block_number, log_index in cursor.fetchall()}
 
 
 def _get_last_indexed_block(conn: PGConnection) -> Optional[int]:
     with conn.cursor() as cursor:
         cursor.execute(
-            "SELECT to_block FROM indexing_state ORDER BY indexing_id DESC LIMIT 1"
+            "SELECT MAX(to_block) FROM indexing_state"
         )
         row = cursor.fetchone()
         return row[0] if row else None
@@ -54,3 +172,15 @@ def _get_pg_connection(pg_host, pg_port, pg_db, pg_user, pg_password) -> PGConne
         password=pg_password,
         connect_timeout=10,
     )
+
+
+def _ensure_offer_events_partitions(cursor: PGCursor, up_to_block: int) -> int:
+    """
+    Create the missing offer_events partitions up to `up_to_block` (inclusive).
+    Returns the number of partitions created.
+    """
+    cursor.execute(
+        "SELECT public.ensure_offer_events_partitions(%s)",
+        (up_to_block,),
+    )
+    return cursor.fetchone()[0]
@@ -1,10 +1,13 @@
-from typing import Dict
+from typing import Dict, List
 from datetime import datetime
 from web3 import Web3
 
 from psycopg2.extensions import cursor as PGCursor
 
 from ._get_status_offer import _get_offer_status
+from ._trade_rollups import _update_trade_rollups
+from ._trades import _insert_trade
+from ._address_trades import _insert_address_trades
 
 
 def _get_timestamp_value(log: Dict) -> datetime:
@@ -16,10 +19,30 @@ def _get_timestamp_value(log: Dict) -> datetime:
     return datetime.now()
 
 
+def _refresh_offer_statuses(
+    cursor: PGCursor,
+    logs: List[Dict]
+) -> None:
+    """
+    Recompute the status of the offers of `logs` from all the events stored for them.
+
+    The handlers assume the events of an offer arrive in chain order. When an event is inserted after
+    later events of its offer (e.g. an OfferUpdated missed by the live indexing and written by a
+    reconciliation), the status it sets may be wrong: it is recomputed here, in the same transaction.
+    """
+    for offer_id in dict.fromkeys(log["offerId"] for log in logs):
+        status = _get_offer_status(cursor, offer_id)
+        if status is not None:
+            cursor.execute(
+                "UPDATE offers SET status = %s WHERE offer_id = %s",
+                (status, offer_id),
+            )
+
+
 def _handle_offer_created(
     cursor: PGCursor,
     log: Dict
-) -> None:
+) -> bool:
     timestamp_value = _get_timestamp_value(log)
 
     cursor.execute(
@@ -44,23 +67,22 @@ def _handle_offer_created(
             timestamp_value,
         ),
     )
+    return cursor.rowcount == 1
 
 
 def _handle_offer_accepted(
     cursor: PGCursor,
     log: Dict
-) -> None:
-    unique_id = f"{log['transactionHash']}_{log['logIndex']}"
+) -> bool:
     timestamp_value = _get_timestamp_value(log)
 
     cursor.execute(
         """
         INSERT INTO offer_events (
             offer_id, event_type, buyer_address, amount_bought, price_bought,
-            transaction_hash, block_number, log_index, unique_id,
-            event_timestamp
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (unique_id) DO NOTHING
+            transaction_hash, block_number, log_index, event_timestamp
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (block_number, log_index) DO NOTHING
         """,
         (
             log["offerId"],
@@ -71,34 +93,39 @@ def _handle_offer_accepted(
             log["transactionHash"],
             log["blockNumber"],
             log["logIndex"],
-            unique_id,
             timestamp_value,
         ),
     )
 
+    # derived tables are only fed with new fills (ON CONFLICT DO NOTHING gives rowcount = 0)
+    inserted = cursor.rowcount == 1
+    if inserted:
+        _insert_trade(cursor, log, timestamp_value)
+        _insert_address_trades(cursor, log["blockNumber"], log["logIndex"])
+        _update_trade_rollups(cursor, log["offerId"], timestamp_value, str(log["amount"]), str(log["price"]))
+
     status = _get_offer_status(cursor, log["offerId"])
     if status is not None and status != "InProgress":
         cursor.execute(
             "UPDATE offers SET status = %s WHERE offer_id = %s",
             (status, log["offerId"]),
         )
+    return inserted
 
 
 def _handle_offer_updated(
     cursor: PGCursor,
     log: Dict
-) -> None:
-    unique_id = f"{log['transactionHash']}_{log['logIndex']}"
+) -> bool:
     timestamp_value = _get_timestamp_value(log)
 
     cursor.execute(
         """
         INSERT INTO offer_events (
             offer_id, event_type, amount, price,
-            transaction_hash, block_number, log_index, unique_id,
-            event_timestamp
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (unique_id) DO NOTHING
+            transaction_hash, block_number, log_index, event_timestamp
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (block_number, log_index) DO NOTHING
         """,
         (
             log["offerId"],
@@ -108,31 +135,31 @@ def _handle_offer_updated(
             log["transactionHash"],
             log["blockNumber"],
             log["logIndex"],
-            unique_id,
             timestamp_value,
         ),
     )
+    inserted = cursor.rowcount == 1
 
     cursor.execute(
         "UPDATE offers SET status = 'InProgress' WHERE offer_id = %s",
         (log["offerId"],),
     )
+    return inserted
 
 
 def _handle_offer_deleted(
     cursor: PGCursor,
     log: Dict
-) -> None:
-    unique_id = f"{log['transactionHash']}_{log['logIndex']}"
+) -> bool:
     timestamp_value = _get_timestamp_value(log)
 
     cursor.execute(
         """
         INSERT INTO offer_events (
             offer_id, event_type, transaction_hash, block_number, log_index,
-            unique_id, event_timestamp
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (unique_id) DO NOTHING
+            event_timestamp
+        ) VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (block_number, log_index) DO NOTHING
         """,
         (
             log["offerId"],
@@ -140,12 +167,13 @@ def _handle_offer_deleted(
             log["transactionHash"],
             log["blockNumber"],
             log["logIndex"],
-            unique_id,
             timestamp_value,
         ),
     )
+    inserted = cursor.rowcount == 1
 
     cursor.execute(
         "UPDATE offers SET status = 'Deleted' WHERE offer_id = %s",
         (log["offerId"],),
     )
+    return inserted
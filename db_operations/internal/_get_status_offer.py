@@ -117,7 +117,7 @@ def _get_all_events_from_offer_id(cursor: PGCursor, offer_id: str) -> List[Dict[
                 e.amount_bought,
                 e.price_bought,
                 e.event_timestamp,
-                e.unique_id,
+                e.transaction_hash || '_' || e.log_index AS unique_id,
 
                 -- event blockchain ordering
                 COALESCE(e.block_number, o.block_number) AS _block_number,
@@ -0,0 +1,92 @@
+from datetime import datetime
+from psycopg2.extensions import cursor as PGCursor
+
+
+# (date_trunc precision, rollup table)
+_ROLLUP_TABLES = (
+    ("hour", "trade_rollups_hourly"),
+    ("day", "trade_rollups_daily"),
+)
+
+
+def _update_trade_rollups(
+    cursor: PGCursor,
+    offer_id: int,
+    event_timestamp: datetime,
+    amount_bought: str,
+    price_bought: str,
+) -> None:
+    """
+    Add one OfferAccepted fill to the hourly and daily rollups of its token pair.
+    Must be called in the same transaction as the offer_events insert, and only if the event was new.
+    """
+    for precision, table in _ROLLUP_TABLES:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (
+                offer_token, buyer_token, bucket_start,
+                trade_count, volume, quote_volume, min_price, max_price
+            )
+            SELECT
+                o.offer_token,
+                o.buyer_token,
+                date_trunc(%(precision)s, %(event_timestamp)s::timestamptz, 'UTC'),
+                1,
+                %(amount)s::numeric,
+                %(amount)s::numeric * %(price)s::numeric,
+                %(price)s::numeric,
+                %(price)s::numeric
+            FROM offers o
+            WHERE o.offer_id = %(offer_id)s
+            ON CONFLICT (offer_token, buyer_token, bucket_start) DO UPDATE SET
+                trade_count  = {table}.trade_count + EXCLUDED.trade_count,
+                volume       = {table}.volume + EXCLUDED.volume,
+                quote_volume = {table}.quote_volume + EXCLUDED.quote_volume,
+                min_price    = LEAST({table}.min_price, EXCLUDED.min_price),
+                max_price    = GREATEST({table}.max_price, EXCLUDED.max_price)
+            """,
+            {
+                "precision": precision,
+                "event_timestamp": event_timestamp,
+                "amount": amount_bought,
+                "price": price_bought,
+                "offer_id": offer_id,
+            },
+        )
+
+
+def _rebuild_trade_rollups(cursor: PGCursor) -> None:
+    """
+    Recompute the hourly and daily rollups from offer_events.
+
+    The rollup tables are locked first: the indexer waits for the rebuild to commit before
+    updating them, so that no fill is counted twice or lost while the rebuild runs.
+    """
+    cursor.execute(
+        "LOCK TABLE trade_rollups_hourly, trade_rollups_daily IN EXCLUSIVE MODE"
+    )
+
+    for precision, table in _ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (
+                offer_token, buyer_token, bucket_start,
+                trade_count, volume, quote_volume, min_price, max_price
+            )
+            SELECT
+                o.offer_token,
+                o.buyer_token,
+                date_trunc(%s, e.event_timestamp, 'UTC') AS bucket_start,
+                COUNT(*),
+                SUM(e.amount_bought::numeric),
+                SUM(e.amount_bought::numeric * e.price_bought::numeric),
+                MIN(e.price_bought::numeric),
+                MAX(e.price_bought::numeric)
+            FROM offer_events e
+            JOIN offers o ON o.offer_id = e.offer_id
+            WHERE e.event_type = 'OfferAccepted'
+            GROUP BY o.offer_token, o.buyer_token, bucket_start
+            """,
+            (precision,),
+        )
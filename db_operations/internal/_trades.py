@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Dict
+from web3 import Web3
+from psycopg2.extensions import cursor as PGCursor
+
+
+def _insert_trade(
+    cursor: PGCursor,
+    log: Dict,
+    event_timestamp: datetime,
+) -> None:
+    """
+    Insert one OfferAccepted fill in the trades table, with the seller and tokens of its offer.
+    Must be called in the same transaction as the offer_events insert.
+    """
+    cursor.execute(
+        """
+        INSERT INTO trades (
+            block_number, log_index, offer_id, transaction_hash,
+            seller_address, buyer_address, offer_token, buyer_token,
+            amount, price, quote_value, event_timestamp
+        )
+        SELECT
+            %(block_number)s,
+            %(log_index)s,
+            o.offer_id,
+            %(transaction_hash)s,
+            o.seller_address,
+            %(buyer_address)s,
+            o.offer_token,
+            o.buyer_token,
+            %(amount)s::numeric,
+            %(price)s::numeric,
+            %(amount)s::numeric * %(price)s::numeric,
+            %(event_timestamp)s
+        FROM offers o
+        WHERE o.offer_id = %(offer_id)s
+        ON CONFLICT (block_number, log_index) DO NOTHING
+        """,
+        {
+            "block_number": log["blockNumber"],
+            "log_index": log["logIndex"],
+            "transaction_hash": log["transactionHash"],
+            "buyer_address": Web3.to_checksum_address(log["buyer"]),
+            "amount": str(log["amount"]),
+            "price": str(log["price"]),
+            "event_timestamp": event_timestamp,
+            "offer_id": log["offerId"],
+        },
+    )
+
+
+def _backfill_trades(
+    cursor: PGCursor,
+    from_block: int,
+    to_block: int,
+) -> int:
+    """
+    Insert in the trades table the OfferAccepted events of offer_events between
+    `from_block` and `to_block` (inclusive). Existing trades are left untouched.
+    Returns the number of trades inserted.
+    """
+    cursor.execute(
+        """
+        INSERT INTO trades (
+            block_number, log_index, offer_id, transaction_hash,
+            seller_address, buyer_address, offer_token, buyer_token,
+            amount, price, quote_value, event_timestamp
+        )
+        SELECT
+            e.block_number,
+            e.log_index,
+            e.offer_id,
+            e.transaction_hash,
+            o.seller_address,
+            e.buyer_address,
+            o.offer_token,
+            o.buyer_token,
+            e.amount_bought::numeric,
+            e.price_bought::numeric,
+            e.amount_bought::numeric * e.price_bought::numeric,
+            e.event_timestamp
+        FROM offer_events e
+        JOIN offers o ON o.offer_id = e.offer_id
+        WHERE e.event_type = 'OfferAccepted'
+          AND e.block_number BETWEEN %s AND %s
+        ON CONFLICT (block_number, log_index) DO NOTHING
+        """,
+        (from_block, to_block),
+    )
+    return cursor.rowcount
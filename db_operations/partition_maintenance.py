@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from psycopg2.extensions import connection as PGConnection
+
+from config import OFFER_EVENTS_PARTITION_LOOKAHEAD
+from .internal._db_operations import _ensure_offer_events_partitions
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def ensure_offer_events_partitions(
+    pg_conn: PGConnection,
+    latest_block_number: int,
+    lookahead: int = OFFER_EVENTS_PARTITION_LOOKAHEAD,
+) -> int:
+    """
+    Pre-create the offer_events partitions needed to store the events up to
+    `latest_block_number + lookahead`, so that inserts never hit a missing partition.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+        latest_block_number: Latest block number known on chain
+        lookahead: Number of blocks ahead of `latest_block_number` to cover
+
+    Returns:
+        Number of partitions created
+    """
+    with pg_conn.cursor() as cursor:
+        created_count = _ensure_offer_events_partitions(cursor, latest_block_number + lookahead)
+    pg_conn.commit()
+
+    if created_count:
+        logger.info(f"{created_count} offer_events partition(s) created up to block {latest_block_number + lookahead}")
+
+    return created_count
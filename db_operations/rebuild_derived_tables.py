@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from psycopg2.extensions import connection as PGConnection
+
+from .internal._trade_rollups import _rebuild_trade_rollups
+from .internal._trades import _backfill_trades
+from .internal._address_trades import _rebuild_address_trades
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def rebuild_trade_rollups(pg_conn: PGConnection) -> None:
+    """
+    Recompute the hourly and daily trading rollups (trade_rollups_hourly, trade_rollups_daily)
+    from scratch, in a single transaction.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+    """
+    try:
+        with pg_conn.cursor() as cursor:
+            _rebuild_trade_rollups(cursor)
+        pg_conn.commit()
+    except Exception:
+        pg_conn.rollback()
+        raise
+
+    logger.info("trade rollups rebuilt")
+
+
+def backfill_trades(pg_conn: PGConnection, batch_size_blocks: int = 1000000) -> int:
+    """
+    Populate the trades table from the OfferAccepted events already stored in offer_events.
+
+    The history is processed by block ranges of `batch_size_blocks` (one offer_events partition by default),
+    each range in its own transaction. Trades already present are skipped, so the backfill can be interrupted
+    and run again.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+        batch_size_blocks: Number of blocks processed per transaction
+
+    Returns:
+        Number of trades inserted
+    """
+    with pg_conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT MIN(block_number), MAX(block_number) FROM offer_events WHERE event_type = 'OfferAccepted'"
+        )
+        min_block, max_block = cursor.fetchone()
+    pg_conn.commit()
+
+    if min_block is None:
+        return 0
+
+    inserted_count = 0
+    for from_block in range(min_block, max_block + 1, batch_size_blocks):
+        to_block = min(from_block + batch_size_blocks - 1, max_block)
+        try:
+            with pg_conn.cursor() as cursor:
+                inserted_count += _backfill_trades(cursor, from_block, to_block)
+            pg_conn.commit()
+        except Exception:
+            pg_conn.rollback()
+            raise
+        logger.info(f"trades backfilled from block {from_block} to {to_block} ({inserted_count} rows inserted so far)")
+
+    return inserted_count
+
+
+def rebuild_address_trades(pg_conn: PGConnection) -> int:
+    """
+    Rebuild the per-address ledger (address_trades) from the OfferAccepted events of offer_events,
+    in a single transaction.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+
+    Returns:
+        Number of ledger rows inserted
+    """
+    try:
+        with pg_conn.cursor() as cursor:
+            inserted_count = _rebuild_address_trades(cursor)
+        pg_conn.commit()
+    except Exception:
+        pg_conn.rollback()
+        raise
+
+    logger.info(f"address_trades rebuilt ({inserted_count} rows inserted)")
+    return inserted_count
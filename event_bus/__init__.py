@@ -0,0 +1 @@
+from .event_bus import EventBus, EventBatch, Exporter, get_event_bus
\ No newline at end of file
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+"""
+In-process publish / subscribe bus for the committed YAM events.
+
+The indexer publishes each batch of events once it is committed to the DB (live loop, TheGraph
+backfills, history fill). Exporters (event queue, files, ...) subscribe as plugins: each one runs
+on its own worker thread and reads from its own bounded buffer, so a slow exporter never stalls
+the indexing loop. When the buffer of an exporter is full, the published batch is dropped for this
+exporter only, and counted in its metrics. Each exporter only receives the batches of the sources it
+declares: by default not the history fill, whose back-to-back batches would overflow every buffer.
+
+Usage Example:
+    bus = get_event_bus()
+    bus.subscribe(MyExporter())
+    ...
+    bus.publish(EventBatch(source="live", from_block=from_block, to_block=to_block, events=new_logs))
+    ...
+    bus.stop()
+"""
+
+
+@dataclass
+class EventBatch:
+    """
+    Events committed to the DB by one call to add_events_to_db.
+
+    Attributes:
+        source: Where the events come from ('live', 'backfill' or 'history')
+        from_block: First block of the indexed range (None when no range is recorded, e.g. history fill)
+        to_block: Last block of the indexed range (None when no range is recorded)
+        events: Decoded logs newly added to the DB, in the order they were written
+        published_at: time.time() of the publication
+    """
+    source: str
+    from_block: Optional[int]
+    to_block: Optional[int]
+    events: List[Dict[str, Any]]
+    published_at: float = field(default_factory=time.time)
+
+
+class Exporter(ABC):
+    """
+    Base class of the event bus plugins. `handle_batch` is called on the worker thread of the
+    exporter, once per published batch of one of its `sources` and in publication order.
+    """
+    name: str = "exporter"
+    sources: Tuple[str, ...] = ("live", "backfill")  # the history is rebuilt from the DB (e.g. export-archive)
+
+    @abstractmethod
+    def handle_batch(self, batch: EventBatch) -> None:
+        """Export the events of a batch. An exception is logged and counted in the metrics of the exporter."""
+
+    def handle_published(self, batch: EventBatch) -> None:
+        """Called on the publishing thread before the batch is queued, e.g. to record it durably. Must be quick."""
+
+    def handle_dropped(self, batch: EventBatch) -> None:
+        """Called on the publishing thread when the batch is dropped because the buffer of the exporter is full."""
+
+    def tick(self) -> None:
+        """Called on the worker thread when no batch arrived for a while (about every 0.5 s), e.g. to flush by age."""
+
+    def close(self) -> None:
+        """Called on the worker thread when the bus stops, after the last batch."""
+
+
+class _ExporterWorker:
+    def __init__(self, exporter: Exporter, buffer_size: int):
+        self.exporter = exporter
+        self.buffer: "queue.Queue[EventBatch]" = queue.Queue(maxsize=buffer_size)
+        self.stop_requested = threading.Event()
+        self.lock = threading.Lock()
+        self.metrics = {
+            "published_batches": 0,
+            "delivered_batches": 0,
+            "delivered_events": 0,
+            "failed_batches": 0,
+            "dropped_batches": 0,
+            "dropped_events": 0,
+            "last_error": None,
+        }
+        self.oldest_pending_published_at: Optional[float] = None
+        self.thread = threading.Thread(target=self._run, name=f"exporter-{exporter.name}", daemon=True)
+
+    def offer(self, batch: EventBatch) -> None:
+        if batch.source not in self.exporter.sources:
+            return
+        with self.lock:
+            self.metrics["published_batches"] += 1
+        self._call_hook(self.exporter.handle_published, batch)
+        try:
+            self.buffer.put_nowait(batch)
+        except queue.Full:
+            with self.lock:
+                self.metrics["dropped_batches"] += 1
+                self.metrics["dropped_events"] += len(batch.events)
+            logger.warning(
+                f"event bus: buffer of exporter '{self.exporter.name}' is full, "
+                f"batch of {len(batch.events)} event(s) ({batch.source}, blocks {batch.from_block}-{batch.to_block}) dropped"
+            )
+            self._call_hook(self.exporter.handle_dropped, batch)
+
+    def _call_hook(self, hook, batch: EventBatch) -> None:
+        # an exporter hook never fails the publication
+        try:
+            hook(batch)
+        except Exception:
+            logger.exception(f"event bus: exporter '{self.exporter.name}' failed in {hook.__name__}")
+
+    def _run(self) -> None:
+        while not (self.stop_requested.is_set() and self.buffer.empty()):
+            try:
+                batch = self.buffer.get(timeout=0.5)
+            except queue.Empty:
+                try:
+                    self.exporter.tick()
+                except Exception:
+                    logger.exception(f"event bus: exporter '{self.exporter.name}' failed on tick")
+                continue
+
+            with self.lock:
+                self.oldest_pending_published_at = batch.published_at
+            try:
+                self.exporter.handle_batch(batch)
+                with self.lock:
+                    self.metrics["delivered_batches"] += 1
+                    self.metrics["delivered_events"] += len(batch.events)
+            except Exception as e:
+                with self.lock:
+                    self.metrics["failed_batches"] += 1
+                    self.metrics["last_error"] = str(e)
+                logger.exception(f"event bus: exporter '{self.exporter.name}' failed to handle a batch of {len(batch.events)} event(s)")
+            finally:
+                with self.lock:
+                    self.oldest_pending_published_at = None
+
+        try:
+            self.exporter.close()
+        except Exception:
+            logger.exception(f"event bus: exporter '{self.exporter.name}' failed to close")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics = dict(self.metrics)
+            oldest_published_at = self.oldest_pending_published_at
+        with self.buffer.mutex:
+            pending_batches = len(self.buffer.queue)
+            if oldest_published_at is None and pending_batches:
+                oldest_published_at = self.buffer.queue[0].published_at
+        metrics["pending_batches"] = pending_batches
+        metrics["lag_seconds"] = round(time.time() - oldest_published_at, 3) if oldest_published_at is not None else 0.0
+        return metrics
+
+
+class EventBus:
+    """
+    Publish / subscribe bus dispatching the committed event batches to the exporters.
+
+    Args:
+        buffer_size: Maximum number of batches waiting in the buffer of each exporter
+    """
+
+    def __init__(self, buffer_size: int = 1000):
+        self.buffer_size = buffer_size
+        self._workers: List[_ExporterWorker] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, exporter: Exporter, buffer_size: Optional[int] = None) -> None:
+        """
+        Register an exporter and start its worker thread. It receives the batches published from now on.
+
+        Args:
+            exporter: Exporter plugin (a unique `name` per bus)
+            buffer_size: Size of the buffer of this exporter (default: the buffer size of the bus)
+        """
+        worker = _ExporterWorker(exporter, buffer_size if buffer_size is not None else self.buffer_size)
+        with self._lock:
+            if any(existing.exporter.name == exporter.name for existing in self._workers):
+                raise ValueError(f"An exporter named '{exporter.name}' is already subscribed to the event bus")
+            self._workers.append(worker)
+        worker.thread.start()
+        logger.info(f"event bus: exporter '{exporter.name}' subscribed")
+
+    def publish(self, batch: EventBatch) -> None:
+        """
+        Hand a batch over to every exporter accepting its source. Never blocks: a batch is dropped for an
+        exporter whose buffer is full.
+        """
+        if not batch.events:
+            return
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            worker.offer(batch)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the metrics of each exporter, by exporter name: batches published / delivered / failed /
+        dropped, events delivered / dropped, batches pending in the buffer, lag (age in seconds of the
+        oldest batch not yet handled) and last error.
+        """
+        with self._lock:
+            workers = list(self._workers)
+        return {worker.exporter.name: worker.get_metrics() for worker in workers}
+
+    def log_metrics(self) -> None:
+        for name, metrics in self.get_metrics().items():
+            logger.info(f"event bus: exporter '{name}' {metrics}")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """
+        Stop the workers once their buffer is drained (waiting at most `timeout` seconds in total)
+        and close the exporters. The bus can be reused with new subscriptions afterwards.
+        """
+        with self._lock:
+            workers = self._workers
+            self._workers = []
+
+        for worker in workers:
+            worker.stop_requested.set()
+        deadline = time.time() + timeout
+        for worker in workers:
+            worker.thread.join(max(0.0, deadline - time.time()))
+            if worker.thread.is_alive():
+                logger.warning(
+                    f"event bus: exporter '{worker.exporter.name}' stopped with {worker.buffer.qsize()} batch(es) not handled"
+                )
+
+
+_default_event_bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    """
+    Return the event bus of the process, to which add_events_to_db publishes the committed events.
+    """
+    return _default_event_bus
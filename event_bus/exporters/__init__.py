@@ -0,0 +1,3 @@
+from .event_queue_exporter import EventQueueExporter
+from .file_exporter import FileExporter
+from .archive_exporter import ArchiveExporter
\ No newline at end of file
@@ -0,0 +1,36 @@
+from event_bus.event_bus import EventBatch, Exporter
+from event_handlers.archive_events import ParquetEventArchive
+
+
+class ArchiveExporter(Exporter):
+    """
+    Append every committed event (all four event types) to the columnar Parquet archive
+    (see event_handlers/archive_events.py). The batches are announced to the archive when they are
+    published, so the ones lost in the event bus or in the buffer of the archive are rebuilt from the
+    DB at the next startup.
+
+    Args:
+        archive_path: Root directory of the archive
+        partition_blocks: Number of blocks per partition
+        flush_events: Number of buffered events triggering a write
+        flush_seconds: Age of the buffer triggering a write
+    """
+    name = "archive"
+
+    def __init__(self, archive_path: str, partition_blocks: int, flush_events: int, flush_seconds: int):
+        self.archive = ParquetEventArchive(archive_path, partition_blocks, flush_events, flush_seconds)
+
+    def handle_published(self, batch: EventBatch) -> None:
+        self.archive.expect_events(id(batch), batch.events)
+
+    def handle_dropped(self, batch: EventBatch) -> None:
+        self.archive.drop_expected_events(id(batch))
+
+    def handle_batch(self, batch: EventBatch) -> None:
+        self.archive.add_events(batch.events, id(batch))
+
+    def tick(self) -> None:
+        self.archive.flush_if_due()
+
+    def close(self) -> None:
+        self.archive.close()
@@ -0,0 +1,28 @@
+from typing import Any, Callable, Dict, List
+from psycopg2.extensions import connection as PGConnection
+
+from event_bus.event_bus import EventBatch, Exporter
+from event_handlers import store_events_in_queue
+
+
+class EventQueueExporter(Exporter):
+    """
+    Export the committed events to the event_queue table (client mode of the event queue),
+    fanned out to the queues of the subscriptions they match.
+
+    Args:
+        get_pg_connection: Callable returning a new PostgreSQL connection (one per batch)
+        subscriptions: Subscriptions as defined in EVENT_QUEUE_SUBSCRIPTIONS
+    """
+    name = "event_queue"
+
+    def __init__(self, get_pg_connection: Callable[[], PGConnection], subscriptions: List[Dict[str, Any]]):
+        self.get_pg_connection = get_pg_connection
+        self.subscriptions = subscriptions
+
+    def handle_batch(self, batch: EventBatch) -> None:
+        conn = self.get_pg_connection()
+        try:
+            store_events_in_queue(conn, batch.events, self.subscriptions)
+        finally:
+            conn.close()
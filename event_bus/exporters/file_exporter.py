@@ -0,0 +1,31 @@
+from typing import List
+
+from event_bus.event_bus import EventBatch, Exporter
+from event_handlers.export_event import NdjsonSegmentWriter
+
+
+class FileExporter(Exporter):
+    """
+    Export the committed events of the given types to rotating NDJSON segment files
+    (see event_handlers/export_event.py).
+
+    Args:
+        export_path: Directory of the segments
+        event_types: Event types exported
+        max_segment_events: Number of events after which a segment is sealed
+        max_segment_age_seconds: Age after which a segment is sealed
+    """
+    name = "file"
+
+    def __init__(self, export_path: str, event_types: List[str], max_segment_events: int, max_segment_age_seconds: int):
+        self.event_types = set(event_types)
+        self.writer = NdjsonSegmentWriter(export_path, max_segment_events, max_segment_age_seconds)
+
+    def handle_batch(self, batch: EventBatch) -> None:
+        self.writer.append_batch([event for event in batch.events if event["topic"] in self.event_types])
+
+    def tick(self) -> None:
+        self.writer.seal_if_due()
+
+    def close(self) -> None:
+        self.writer.close()
@@ -1 +1,5 @@
-from .store_event_in_queue import store_event_in_queue
\ No newline at end of file
+from .store_event_in_queue import store_events_in_queue, EVENT_QUEUE_NOTIFY_CHANNEL
+from .listen_event_queue import listen_event_queue
+from .event_queue_consumer import claim_events, ack_events
+from .prune_event_queue import prune_event_queue
+from .event_queue_subscriptions import set_event_queue_subscriptions
\ No newline at end of file
@@ -0,0 +1,313 @@
+import os
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+"""
+Columnar change-data-capture archive of the YAM events (Parquet, zstd compressed).
+
+All four event types share a single schema (columns that do not apply to an event type are null).
+Files are partitioned by block range:
+    <archive path>/block_range=<first block>-<last block>/part-<first block>-<last block>-<time ns>.parquet
+
+A part file is written to a temporary name then atomically renamed, so readers never see a partial
+file. The whole archive can be read at once by analytics tools, e.g.:
+    pyarrow.dataset.dataset("<archive path>", format="parquet", partitioning="hive")
+    duckdb: SELECT * FROM read_parquet('<archive path>/*/*.parquet', hive_partitioning = true)
+
+uint256 values (price, amount, ...) are stored as decimal strings, as they do not fit in 64-bit integers.
+The DB does not store the previous price and amount of an OfferUpdated: `old_price` and `old_amount` are
+only set in the rows written from the indexed events, and are null in the partitions rebuilt from the DB.
+
+`archive_state.json` records the last block written to the archive and the first block of the events
+that may be missing from it (`repair_from_block`): the events published to the archive but not yet
+written to a part file (waiting in the event bus or buffered here) and the events dropped by the event
+bus when the buffer of the archive was full. This block only goes down until the next write, so the
+file is written about once per flush. At startup, the indexer rebuilds the partitions from this block
+(or from the block after the last archived one) from the DB, see export_archive_from_db. The only events
+that can still be missing are those of a batch committed to the DB by a backfill right before a crash,
+before it was published; `python3 -m maintenance export-archive` rebuilds the whole archive.
+
+pyarrow is an optional dependency, only needed when the archive is used (pip install pyarrow).
+"""
+
+ARCHIVE_STATE_NAME = "archive_state.json"
+
+ARCHIVE_COLUMNS = [
+    "topic", "block_number", "log_index", "transaction_hash", "offer_id",
+    "seller", "buyer", "offer_token", "buyer_token",
+    "price", "amount", "old_price", "old_amount", "new_price", "new_amount",
+    "timestamp",
+]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("pyarrow is required for the event archive: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _get_archive_schema():
+    pa, _ = _import_pyarrow()
+    return pa.schema([
+        ("topic", pa.string()),
+        ("block_number", pa.int64()),
+        ("log_index", pa.int32()),
+        ("transaction_hash", pa.string()),
+        ("offer_id", pa.int64()),
+        ("seller", pa.string()),
+        ("buyer", pa.string()),
+        ("offer_token", pa.string()),
+        ("buyer_token", pa.string()),
+        ("price", pa.string()),
+        ("amount", pa.string()),
+        ("old_price", pa.string()),
+        ("old_amount", pa.string()),
+        ("new_price", pa.string()),
+        ("new_amount", pa.string()),
+        ("timestamp", pa.timestamp("s", tz="UTC")),
+    ])
+
+
+def _to_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def event_to_archive_row(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a decoded log (RPC or TheGraph) into an archive row. Events without timestamp
+    (RPC logs) get the current time, as in the DB.
+    """
+    timestamp = event.get("timestamp")
+    return {
+        "topic": event["topic"],
+        "block_number": int(event["blockNumber"]),
+        "log_index": int(event["logIndex"]),
+        "transaction_hash": event["transactionHash"],
+        "offer_id": int(event["offerId"]),
+        "seller": event.get("seller"),
+        "buyer": event.get("buyer"),
+        "offer_token": event.get("offerToken"),
+        "buyer_token": event.get("buyerToken"),
+        "price": _to_str(event.get("price")),
+        "amount": _to_str(event.get("amount")),
+        "old_price": _to_str(event.get("oldPrice")),
+        "old_amount": _to_str(event.get("oldAmount")),
+        "new_price": _to_str(event.get("newPrice")),
+        "new_amount": _to_str(event.get("newAmount")),
+        "timestamp": int(timestamp) if timestamp is not None else int(time.time()),
+    }
+
+
+class ParquetEventArchive:
+    """
+    Append events to the Parquet archive, partitioned by block range.
+
+    Rows are buffered in memory and written as one part file per partition when `flush_events` rows
+    are buffered, when the oldest buffered row is `flush_seconds` old (checked when events are added
+    and by `flush_if_due`, called periodically by the exporter) or on close.
+
+    The events published to the archive are announced with `expect_events` (on the publishing thread)
+    before they reach `add_events`, or are reported with `drop_expected_events` if they never will, so
+    `repair_from_block` always covers the events not yet written.
+
+    Args:
+        archive_path: Root directory of the archive (created if needed)
+        partition_blocks: Number of blocks per partition
+        flush_events: Number of buffered rows triggering a write
+        flush_seconds: Age of the buffer triggering a write
+    """
+
+    def __init__(self, archive_path: str, partition_blocks: int = 1000000, flush_events: int = 50000, flush_seconds: int = 3600):
+        _import_pyarrow()  # fail at startup rather than at the first write
+        self.path = Path(archive_path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.partition_blocks = partition_blocks
+        self.flush_events = flush_events
+        self.flush_seconds = flush_seconds
+        self._buffers: Dict[int, List[Dict[str, Any]]] = {}
+        self._buffered_count = 0
+        self._buffer_started_at = 0.0
+
+        self._state_lock = threading.Lock()
+        state = self._read_state()
+        self._last_archived_block: Optional[int] = state.get("last_archived_block")
+        self._saved_repair_from_block: Optional[int] = state.get("repair_from_block")
+        self._dropped_from_block: Optional[int] = self._saved_repair_from_block  # not repaired since the last run
+        self._expected_first_blocks: Dict[Hashable, int] = {}  # published, not yet buffered
+        self._buffered_from_block: Optional[int] = None
+
+    def get_partition_start(self, block_number: int) -> int:
+        return block_number - block_number % self.partition_blocks
+
+    def get_partition_dir(self, partition_start: int) -> Path:
+        return self.path / f"block_range={partition_start}-{partition_start + self.partition_blocks - 1}"
+
+    def expect_events(self, key: Hashable, events: List[Dict[str, Any]]) -> None:
+        """
+        Announce events that will be passed to `add_events` with the same `key` (thread safe).
+        """
+        if not events:
+            return
+        first_block = min(int(event["blockNumber"]) for event in events)
+        with self._state_lock:
+            self._expected_first_blocks[key] = first_block
+            self._save_state(lower_only=True)
+
+    def drop_expected_events(self, key: Hashable) -> None:
+        """
+        Report that the events announced under `key` will never be added: they are left for the repair (thread safe).
+        """
+        with self._state_lock:
+            first_block = self._expected_first_blocks.pop(key, None)
+            if first_block is not None:
+                if self._dropped_from_block is None or first_block < self._dropped_from_block:
+                    self._dropped_from_block = first_block
+                self._save_state(lower_only=True)
+
+    def add_events(self, events: List[Dict[str, Any]], key: Optional[Hashable] = None) -> None:
+        with self._state_lock:
+            self._expected_first_blocks.pop(key, None)
+            if events:
+                first_block = min(int(event["blockNumber"]) for event in events)
+                if self._buffered_from_block is None or first_block < self._buffered_from_block:
+                    self._buffered_from_block = first_block
+                self._save_state(lower_only=True)
+        if not events:
+            return
+        if not self._buffered_count:
+            self._buffer_started_at = time.time()
+
+        for event in events:
+            row = event_to_archive_row(event)
+            self._buffers.setdefault(self.get_partition_start(row["block_number"]), []).append(row)
+        self._buffered_count += len(events)
+
+        if self._buffered_count >= self.flush_events:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        """
+        Write the buffered rows if the oldest one is `flush_seconds` old.
+        """
+        if self._buffered_count and time.time() - self._buffer_started_at >= self.flush_seconds:
+            self.flush()
+
+    def _read_state(self) -> Dict[str, Any]:
+        state_path = self.path / ARCHIVE_STATE_NAME
+        if not state_path.exists():
+            return {}
+        with state_path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_state(self) -> None:
+        tmp_path = self.path / (ARCHIVE_STATE_NAME + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({"last_archived_block": self._last_archived_block, "repair_from_block": self._saved_repair_from_block}, f)
+        os.replace(tmp_path, self.path / ARCHIVE_STATE_NAME)
+
+    def _save_state(self, lower_only: bool) -> None:
+        # called with _state_lock held
+        candidates = list(self._expected_first_blocks.values()) + [
+            block for block in (self._buffered_from_block, self._dropped_from_block) if block is not None
+        ]
+        repair_from_block = min(candidates) if candidates else None
+        if lower_only:
+            # between two flushes the saved block only goes down, so it covers every event not yet written
+            if repair_from_block is None:
+                return
+            if self._saved_repair_from_block is not None and repair_from_block >= self._saved_repair_from_block:
+                return
+        self._saved_repair_from_block = repair_from_block
+        self._write_state()
+
+    def get_last_archived_block(self) -> Optional[int]:
+        """
+        Return the last block written to the archive (None for an archive without state).
+        """
+        with self._state_lock:
+            return self._last_archived_block
+
+    def get_repair_from_block(self) -> Optional[int]:
+        """
+        Return the first block from which the archive must be rebuilt from the DB at startup: the first
+        block of the events that may be missing, or the block after the last archived one (None for an
+        archive without state).
+        """
+        with self._state_lock:
+            candidates = [] if self._saved_repair_from_block is None else [self._saved_repair_from_block]
+            if self._last_archived_block is not None:
+                candidates.append(self._last_archived_block + 1)
+            return min(candidates) if candidates else None
+
+    def set_repaired(self, last_block: int) -> None:
+        """
+        Record the archive as complete up to `last_block` (after a rebuild from the DB).
+        """
+        with self._state_lock:
+            self._last_archived_block = last_block
+            self._dropped_from_block = None
+            self._saved_repair_from_block = None
+            self._save_state(lower_only=False)
+
+    def _write_part(self, directory: Path, rows: List[Dict[str, Any]]) -> Path:
+        pa, pq = _import_pyarrow()
+        rows = sorted(rows, key=lambda row: (row["block_number"], row["log_index"]))
+        table = pa.Table.from_pylist(rows, schema=_get_archive_schema())
+
+        directory.mkdir(parents=True, exist_ok=True)
+        file_name = f"part-{rows[0]['block_number']}-{rows[-1]['block_number']}-{time.time_ns()}.parquet"
+        tmp_path = directory / (file_name + ".tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, directory / file_name)
+        return directory / file_name
+
+    def flush(self) -> None:
+        """
+        Write the buffered rows, one part file per partition.
+        """
+        if not self._buffered_count:
+            return
+        last_block = max(row["block_number"] for rows in self._buffers.values() for row in rows)
+        for partition_start, rows in sorted(self._buffers.items()):
+            part_path = self._write_part(self.get_partition_dir(partition_start), rows)
+            logger.info(f"event archive: {len(rows)} event(s) written to {part_path}")
+        self._buffers = {}
+        self._buffered_count = 0
+        with self._state_lock:
+            self._last_archived_block = max(last_block, self._last_archived_block or 0)
+            self._buffered_from_block = None
+            self._save_state(lower_only=False)
+
+    def replace_partition(self, partition_start: int, rows: List[Dict[str, Any]]) -> None:
+        """
+        Replace the whole content of a partition by `rows` (archive rows, see event_to_archive_row).
+        The new partition is built next to the old one and swapped with two renames.
+        """
+        partition_dir = self.get_partition_dir(partition_start)
+        new_dir = partition_dir.with_name(partition_dir.name + ".new")
+        old_dir = partition_dir.with_name(partition_dir.name + ".old")
+        shutil.rmtree(new_dir, ignore_errors=True)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        if rows:
+            self._write_part(new_dir, rows)
+        if partition_dir.exists():
+            os.replace(partition_dir, old_dir)
+        if rows:
+            os.replace(new_dir, partition_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def close(self) -> None:
+        self.flush()
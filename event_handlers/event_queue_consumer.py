@@ -0,0 +1,94 @@
+from typing import Any, Dict, List, Sequence
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import RealDictCursor
+
+"""
+Claim / ack consumption of the event_queue table.
+
+Each consumer (see EVENT_QUEUE_SUBSCRIPTIONS) has its own queue, and several workers can drain
+the queue of a consumer in parallel: `claim_events` locks the oldest pending rows
+with FOR UPDATE SKIP LOCKED, so two workers never claim the same row, and marks them as claimed.
+Once processed, the rows are acknowledged with `ack_events`. A claimed row that is not acked
+within `claim_timeout_seconds` (worker crashed, ...) becomes claimable again.
+
+Usage Example:
+    while True:
+        events = claim_events(conn, "sale-notify-bot", "worker-1")
+        for event in events:
+            handle(event)
+        ack_events(conn, [event["id"] for event in events])
+"""
+
+
+def claim_events(
+    pg_conn: PGConnection,
+    consumer: str,
+    worker_name: str,
+    batch_size: int = 100,
+    claim_timeout_seconds: int = 300,
+) -> List[Dict[str, Any]]:
+    """
+    Claim the oldest pending events of the queue of `consumer` for `worker_name`.
+
+    Args:
+        pg_conn: PostgreSQL connection (e.g. with the yam-indexing-event_queue user)
+        consumer: Consumer name of the subscription (see EVENT_QUEUE_SUBSCRIPTIONS)
+        worker_name: Name of the worker claiming the events (stored in claimed_by)
+        batch_size: Maximum number of events claimed
+        claim_timeout_seconds: Delay after which an event claimed but not acked can be claimed again
+
+    Returns:
+        Claimed rows (id, created_at, event_type, offer_id, block_number, log_index, payload), in id order
+    """
+    query = """
+        WITH claimable AS (
+            SELECT id
+            FROM public.event_queue
+            WHERE consumer = %s
+              AND acked_at IS NULL
+              AND (claimed_at IS NULL OR claimed_at < now() - make_interval(secs => %s))
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE public.event_queue q
+        SET claimed_by = %s,
+            claimed_at = now()
+        FROM claimable c
+        WHERE q.id = c.id
+        RETURNING q.id, q.created_at, q.event_type, q.offer_id, q.block_number, q.log_index, q.payload
+    """
+
+    with pg_conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(query, (consumer, claim_timeout_seconds, batch_size, worker_name))
+        events = sorted((dict(row) for row in cursor.fetchall()), key=lambda event: event["id"])
+
+    pg_conn.commit()
+    return events
+
+
+def ack_events(pg_conn: PGConnection, event_ids: Sequence[int]) -> int:
+    """
+    Acknowledge processed events. Acked events are no longer claimable and are pruned
+    by the indexer after the retention period.
+
+    Returns:
+        Number of events acked
+    """
+    if not event_ids:
+        return 0
+
+    with pg_conn.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE public.event_queue
+            SET acked_at = now()
+            WHERE id = ANY(%s)
+              AND acked_at IS NULL
+            """,
+            (list(event_ids),),
+        )
+        acked_count = cursor.rowcount
+
+    pg_conn.commit()
+    return acked_count
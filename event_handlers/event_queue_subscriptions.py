@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, Optional
+from psycopg2.extensions import connection as PGConnection
+
+import logging
+logger = logging.getLogger(__name__)
+
+"""
+Event queue subscriptions.
+
+A subscription names a consumer, the event types it wants and, optionally, the tokens it is
+interested in. Each consumer gets its own queue in event_queue (rows with its consumer name):
+an event matching several subscriptions is stored once per consumer.
+
+Subscriptions are defined in config.py (EVENT_QUEUE_SUBSCRIPTIONS), for example:
+    {"consumer": "sale-notify-bot", "event_types": ["OfferAccepted"]}
+    {"consumer": "reg-dashboard", "event_types": ["OfferCreated", "OfferAccepted"], "tokens": ["0x..."]}
+
+`tokens` is matched against both the offer token and the buyer token of the event
+(no `tokens` key, or an empty list, means all tokens).
+"""
+
+EVENT_TYPES = ("OfferCreated", "OfferUpdated", "OfferAccepted", "OfferDeleted")
+
+
+def normalize_subscriptions(subscriptions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Validate the subscriptions of the configuration and return them with `event_types` as a set and
+    `tokens` as a set of lowercase addresses (None for all tokens).
+
+    Raises:
+        ValueError: If a subscription has no consumer name, a duplicated consumer name,
+            no event type or an unknown event type
+    """
+    normalized = []
+    consumers = set()
+
+    for subscription in subscriptions:
+        consumer = subscription.get("consumer")
+        if not consumer:
+            raise ValueError(f"Event queue subscription without consumer name: {subscription}")
+        if consumer in consumers:
+            raise ValueError(f"Event queue subscription defined twice for consumer '{consumer}'")
+        consumers.add(consumer)
+
+        event_types = set(subscription.get("event_types") or [])
+        unknown_event_types = event_types - set(EVENT_TYPES)
+        if not event_types or unknown_event_types:
+            raise ValueError(
+                f"Event queue subscription '{consumer}' must list event types among {EVENT_TYPES} "
+                f"(got {sorted(event_types)})"
+            )
+
+        tokens = subscription.get("tokens")
+        normalized.append({
+            "consumer": consumer,
+            "event_types": event_types,
+            "tokens": {token.lower() for token in tokens} if tokens else None,
+        })
+
+    return normalized
+
+
+def subscription_matches(
+    subscription: Dict[str, Any],
+    event_type: str,
+    offer_token: Optional[str],
+    buyer_token: Optional[str],
+) -> bool:
+    """
+    Tell whether an event matches a normalized subscription.
+    """
+    if event_type not in subscription["event_types"]:
+        return False
+    if subscription["tokens"] is None:
+        return True
+    return (
+        (offer_token is not None and offer_token.lower() in subscription["tokens"])
+        or (buyer_token is not None and buyer_token.lower() in subscription["tokens"])
+    )
+
+
+def set_event_queue_subscriptions(pg_conn: PGConnection, subscriptions: List[Dict[str, Any]]) -> None:
+    """
+    Replace the content of event_queue_subscriptions, the subscriptions served by the database
+    triggers (trigger mode of the event queue). An empty list disables the triggers.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+        subscriptions: Subscriptions as defined in EVENT_QUEUE_SUBSCRIPTIONS
+    """
+    normalized = normalize_subscriptions(subscriptions)
+
+    try:
+        with pg_conn.cursor() as cursor:
+            cursor.execute("DELETE FROM public.event_queue_subscriptions")
+            for subscription in normalized:
+                cursor.execute(
+                    """
+                    INSERT INTO public.event_queue_subscriptions (consumer, event_types, tokens)
+                    VALUES (%s, %s, %s)
+                    """,
+                    (
+                        subscription["consumer"],
+                        sorted(subscription["event_types"]),
+                        sorted(subscription["tokens"]) if subscription["tokens"] is not None else None,
+                    ),
+                )
+        pg_conn.commit()
+    except Exception:
+        pg_conn.rollback()
+        raise
+
+    consumers = [subscription["consumer"] for subscription in normalized]
+    logger.info(f"event queue triggers serve: {consumers if consumers else 'nothing (disabled)'}")
@@ -1,12 +1,196 @@
 import json
+import os
+import time
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
-def export_event_to_json(decoded_logs: list, export_path: str = "./transactions_queue"):
-    path = Path(export_path)
-    path.mkdir(parents=True, exist_ok=True)
+import logging
+logger = logging.getLogger(__name__)
 
-    for log in decoded_logs:
-        if log.get("topic") == "OfferAccepted":
-            file_path = path / f"{log['transactionHash']}_{log['logIndex']}.json"
-            with file_path.open("w", encoding="utf-8") as f:
-                json.dump(log, f, indent=4)
\ No newline at end of file
+"""
+File export of the YAM events as NDJSON segments.
+
+Each batch is appended (one JSON object per line) to the active segment `current.ndjson.tmp`.
+When the active segment reaches `max_segment_events` events or `max_segment_age_seconds` seconds,
+it is sealed: flushed, fsynced and atomically renamed to
+    segment-<sequence>-<first block>-<last block>.ndjson
+then added to `index.json`, which maps the block range of each sealed segment to its file:
+    {"segments": [{"file": "...", "sequence": 1, "from_block": ..., "to_block": ..., "event_count": ...}, ...]}
+
+Readers only read sealed segments (listed in the index, in sequence order): they are never modified
+once renamed. The index itself is replaced atomically.
+"""
+
+ACTIVE_SEGMENT_NAME = "current.ndjson.tmp"
+INDEX_NAME = "index.json"
+
+
+class NdjsonSegmentWriter:
+    """
+    Append event batches to rotating NDJSON segment files.
+
+    Args:
+        export_path: Directory of the segments (created if needed)
+        max_segment_events: Number of events after which the active segment is sealed
+        max_segment_age_seconds: Age after which the active segment is sealed (checked at each batch and by `seal_if_due`)
+    """
+
+    def __init__(self, export_path: str, max_segment_events: int = 10000, max_segment_age_seconds: int = 3600):
+        self.path = Path(export_path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_segment_events = max_segment_events
+        self.max_segment_age_seconds = max_segment_age_seconds
+
+        self.index = self._load_index()
+        self._file = None
+        self._event_count = 0
+        self._from_block: Optional[int] = None
+        self._to_block: Optional[int] = None
+        self._opened_at = 0.0
+
+        # an active segment left by a previous run (crash, kill) is sealed first
+        if (self.path / ACTIVE_SEGMENT_NAME).exists():
+            self._recover_active_segment()
+
+    def _load_index(self) -> Dict[str, Any]:
+        index_path = self.path / INDEX_NAME
+        index = {"segments": []}
+        if index_path.exists():
+            with index_path.open("r", encoding="utf-8") as f:
+                index = json.load(f)
+
+        # a segment renamed just before the process stopped may be missing from the index
+        indexed_files = {segment["file"] for segment in index["segments"]}
+        missing_files = sorted(p.name for p in self.path.glob("segment-*.ndjson") if p.name not in indexed_files)
+        for file_name in missing_files:
+            _, sequence, from_block, to_block = file_name[: -len(".ndjson")].split("-")
+            with (self.path / file_name).open("rb") as f:
+                event_count = sum(1 for line in f if line.strip())
+            index["segments"].append({
+                "file": file_name,
+                "sequence": int(sequence),
+                "from_block": int(from_block),
+                "to_block": int(to_block),
+                "event_count": event_count,
+            })
+
+        self.index = index
+        if missing_files:
+            self._write_index()
+        return index
+
+    def _write_index(self) -> None:
+        tmp_path = self.path / (INDEX_NAME + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path / INDEX_NAME)
+
+    def _recover_active_segment(self) -> None:
+        active_path = self.path / ACTIVE_SEGMENT_NAME
+        with active_path.open("rb") as f:
+            content = f.read()
+
+        # drop a line partially written when the process stopped
+        complete_content = content[: content.rfind(b"\n") + 1]
+        lines = [line for line in complete_content.split(b"\n") if line]
+        if not lines:
+            active_path.unlink()
+            return
+
+        if len(complete_content) != len(content):
+            with active_path.open("wb") as f:
+                f.write(complete_content)
+
+        block_numbers = [int(json.loads(line)["blockNumber"]) for line in lines]
+        self._event_count = len(lines)
+        self._from_block = min(block_numbers)
+        self._to_block = max(block_numbers)
+        logger.info(f"file export: recovered an active segment of {len(lines)} event(s)")
+        self._seal()
+
+    def append_batch(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Append events to the active segment (opened if needed) and seal it if it is full or too old.
+        """
+        if not events:
+            return
+
+        if self._file is None:
+            self._file = (self.path / ACTIVE_SEGMENT_NAME).open("a", encoding="utf-8")
+            self._opened_at = time.time()
+
+        self._file.write("".join(json.dumps(event, separators=(",", ":"), default=str) + "\n" for event in events))
+        self._file.flush()
+
+        block_numbers = [int(event["blockNumber"]) for event in events]
+        self._event_count += len(events)
+        self._from_block = min(block_numbers) if self._from_block is None else min(self._from_block, *block_numbers)
+        self._to_block = max(block_numbers) if self._to_block is None else max(self._to_block, *block_numbers)
+
+        if self._event_count >= self.max_segment_events:
+            self._seal()
+        else:
+            self.seal_if_due()
+
+    def seal_if_due(self) -> None:
+        """
+        Seal the active segment if it is `max_segment_age_seconds` old, so its events become visible to the
+        readers even when no new batch arrives.
+        """
+        if self._event_count and time.time() - self._opened_at >= self.max_segment_age_seconds:
+            self._seal()
+
+    def _seal(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+        sequence = max((segment["sequence"] for segment in self.index["segments"]), default=0) + 1
+        file_name = f"segment-{sequence:08d}-{self._from_block}-{self._to_block}.ndjson"
+        os.replace(self.path / ACTIVE_SEGMENT_NAME, self.path / file_name)
+
+        self.index["segments"].append({
+            "file": file_name,
+            "sequence": sequence,
+            "from_block": self._from_block,
+            "to_block": self._to_block,
+            "event_count": self._event_count,
+        })
+        self._write_index()
+        logger.info(f"file export: segment {file_name} sealed ({self._event_count} event(s))")
+
+        self._event_count = 0
+        self._from_block = None
+        self._to_block = None
+
+    def close(self) -> None:
+        """
+        Seal the active segment, if any.
+        """
+        if self._event_count:
+            self._seal()
+        elif self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def get_segments_for_block_range(export_path: str, from_block: int, to_block: int) -> List[str]:
+    """
+    Return the paths of the sealed segments containing events between `from_block` and `to_block`
+    (inclusive), in sequence order.
+    """
+    index_path = Path(export_path) / INDEX_NAME
+    if not index_path.exists():
+        return []
+    with index_path.open("r", encoding="utf-8") as f:
+        index = json.load(f)
+
+    return [
+        str(Path(export_path) / segment["file"])
+        for segment in sorted(index["segments"], key=lambda segment: segment["sequence"])
+        if segment["from_block"] <= to_block and segment["to_block"] >= from_block
+    ]
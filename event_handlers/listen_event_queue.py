@@ -0,0 +1,72 @@
+import select
+from typing import Any, Dict, Iterator, List
+from psycopg2.extensions import connection as PGConnection, ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.extras import RealDictCursor
+
+from .store_event_in_queue import EVENT_QUEUE_NOTIFY_CHANNEL
+
+
+def _fetch_events_after(pg_conn: PGConnection, consumer: str, last_id: int, batch_size: int) -> List[Dict[str, Any]]:
+    with pg_conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(
+            """
+            SELECT id, created_at, event_type, offer_id, block_number, log_index, payload
+            FROM public.event_queue
+            WHERE consumer = %s
+              AND id > %s
+            ORDER BY id
+            LIMIT %s
+            """,
+            (consumer, last_id, batch_size),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def listen_event_queue(
+    pg_conn: PGConnection,
+    consumer: str,
+    last_id: int = 0,
+    timeout: float = 60.0,
+    batch_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the rows of the queue of `consumer` with an id greater than `last_id`, then wait for the
+    NOTIFY sent by the indexer on EVENT_QUEUE_NOTIFY_CHANNEL to yield the new ones as soon
+    as they are committed. No polling query is sent while the queue is idle.
+
+    Intended for consumers of the event queue (bots, alerts, ...). The connection is switched
+    to autocommit (required by LISTEN) and must not be shared with other work.
+
+    Rows are fetched by id: the indexer is the only writer of event_queue and commits its
+    rows in id order, so `id > last_id` never misses a row.
+
+    Args:
+        pg_conn: Dedicated PostgreSQL connection (e.g. with the yam-indexing-event_queue user)
+        consumer: Consumer name of the subscription (see EVENT_QUEUE_SUBSCRIPTIONS)
+        last_id: Id of the last row already processed by the consumer
+        timeout: Seconds to wait for a notification before checking the table again anyway
+        batch_size: Maximum number of rows fetched per query
+
+    Yields:
+        Dict with the keys `id`, `created_at`, `event_type`, `offer_id`, `block_number`,
+        `log_index` and `payload`, in id order
+    """
+    pg_conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    with pg_conn.cursor() as cursor:
+        cursor.execute(f"LISTEN {EVENT_QUEUE_NOTIFY_CHANNEL}")
+
+    while True:
+        # catch up first: rows committed before LISTEN or while the previous rows were being processed
+        events = _fetch_events_after(pg_conn, consumer, last_id, batch_size)
+        for event in events:
+            last_id = event["id"]
+            yield event
+
+        if len(events) == batch_size:
+            continue
+
+        if select.select([pg_conn], [], [], timeout) == ([], [], []):
+            continue  # timeout: check the table again anyway
+
+        pg_conn.poll()
+        pg_conn.notifies.clear()
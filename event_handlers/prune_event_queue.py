@@ -0,0 +1,51 @@
+from psycopg2.extensions import connection as PGConnection
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def prune_event_queue(pg_conn: PGConnection, retention_hours: int, batch_size: int = 10000) -> int:
+    """
+    Delete the events acked more than `retention_hours` ago from event_queue.
+
+    Rows are deleted in batches of `batch_size`, each batch in its own transaction,
+    to keep the locks and the WAL volume of each transaction small.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (not closed by this function)
+        retention_hours: How long acked events are kept
+        batch_size: Maximum number of rows deleted per transaction
+
+    Returns:
+        Number of rows deleted
+    """
+    deleted_count = 0
+
+    try:
+        while True:
+            with pg_conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    DELETE FROM public.event_queue
+                    WHERE id IN (
+                        SELECT id
+                        FROM public.event_queue
+                        WHERE acked_at < now() - make_interval(hours => %s)
+                        LIMIT %s
+                    )
+                    """,
+                    (retention_hours, batch_size),
+                )
+                batch_deleted = cursor.rowcount
+            pg_conn.commit()
+
+            deleted_count += batch_deleted
+            if batch_deleted < batch_size:
+                break
+    except Exception:
+        pg_conn.rollback()
+        raise
+
+    if deleted_count:
+        logger.info(f"{deleted_count} acked event(s) pruned from event_queue")
+    return deleted_count
@@ -1,20 +1,93 @@
-from psycopg2.extensions import connection as PGConnection
-from psycopg2.extras import Json
+from typing import Any, Dict, List, Tuple
+from psycopg2.extensions import connection as PGConnection, cursor as PGCursor
+from psycopg2.extras import Json, execute_values
 
+from .event_queue_subscriptions import normalize_subscriptions, subscription_matches
+
+# Channel on which a NOTIFY is sent each time new rows are committed in event_queue.
+# The payload is the id of the latest row committed.
+EVENT_QUEUE_NOTIFY_CHANNEL = "yam_event_queue"
+
+# Keys of the decoded logs promoted to their own event_queue columns (not repeated in the payload)
+_PROMOTED_KEYS = ("topic", "offerId", "blockNumber", "logIndex")
 
-def store_event_in_queue(pg_conn: PGConnection, log: dict) -> None:
-    """
-    Store a single event log into the event_queue table.
 
-    :param conn: psycopg2 connection
-    :param log: decoded log dict to store as JSONB
+def _get_offer_tokens(cursor: PGCursor, offer_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+    cursor.execute(
+        "SELECT offer_id, offer_token, buyer_token FROM public.offers WHERE offer_id = ANY(%s)",
+        (offer_ids,),
+    )
+    return {offer_id: (offer_token, buyer_token) for offer_id, offer_token, buyer_token in cursor.fetchall()}
+
+
+def store_events_in_queue(
+    pg_conn: PGConnection,
+    logs: List[Dict[str, Any]],
+    subscriptions: List[Dict[str, Any]],
+) -> int:
     """
-    query = """
-        INSERT INTO public.event_queue (payload)
-        VALUES (%s)
+    Fan the event logs out to the queues of the subscriptions they match, in a single pass and
+    one multi-row insert into event_queue, and notify the listeners of EVENT_QUEUE_NOTIFY_CHANNEL
+    (the notification is delivered on commit).
+
+    The event type, offer id, block number and log index are stored in their own columns,
+    the payload only keeps the event specific fields. Events already in a queue are skipped.
+
+    OfferUpdated and OfferDeleted logs do not carry the tokens of the offer: for the subscriptions
+    filtering on tokens, they are taken from the OfferCreated logs of the batch or from offers.
+
+    :param pg_conn: psycopg2 connection (not closed by this function)
+    :param logs: decoded log dicts
+    :param subscriptions: subscriptions as defined in EVENT_QUEUE_SUBSCRIPTIONS
+    :return: number of rows added to the queues
     """
+    subscriptions = normalize_subscriptions(subscriptions)
+    if not logs or not subscriptions:
+        return 0
 
     with pg_conn.cursor() as cursor:
-        cursor.execute(query, (Json(log),))
+        offer_tokens = {
+            log["offerId"]: (log["offerToken"], log["buyerToken"])
+            for log in logs
+            if "offerToken" in log
+        }
+        if any(subscription["tokens"] is not None for subscription in subscriptions):
+            unknown_offer_ids = sorted({log["offerId"] for log in logs} - offer_tokens.keys())
+            if unknown_offer_ids:
+                offer_tokens.update(_get_offer_tokens(cursor, unknown_offer_ids))
+
+        rows = []
+        for log in logs:
+            offer_token, buyer_token = offer_tokens.get(log["offerId"], (None, None))
+            consumers = [
+                subscription["consumer"]
+                for subscription in subscriptions
+                if subscription_matches(subscription, log["topic"], offer_token, buyer_token)
+            ]
+            if not consumers:
+                continue
+
+            payload = Json({key: value for key, value in log.items() if key not in _PROMOTED_KEYS})
+            for consumer in consumers:
+                rows.append((consumer, log["topic"], log["offerId"], log["blockNumber"], log["logIndex"], payload))
+
+        if not rows:
+            return 0
+
+        inserted = execute_values(
+            cursor,
+            """
+            INSERT INTO public.event_queue (consumer, event_type, offer_id, block_number, log_index, payload)
+            VALUES %s
+            ON CONFLICT (consumer, block_number, log_index) DO NOTHING
+            RETURNING id
+            """,
+            rows,
+            fetch=True,
+        )
+        if inserted:
+            latest_id = max(row[0] for row in inserted)
+            cursor.execute("SELECT pg_notify(%s, %s)", (EVENT_QUEUE_NOTIFY_CHANNEL, str(latest_id)))
 
     pg_conn.commit()
+    return len(inserted)
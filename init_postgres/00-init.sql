@@ -54,10 +54,59 @@ CREATE TABLE IF NOT EXISTS public.offer_events (
   log_index           INT NOT NULL,
   price_bought        TEXT,
   event_timestamp     TIMESTAMPTZ,
-  unique_id           TEXT PRIMARY KEY NOT NULL,
+  -- (block_number, log_index) identifies a log on chain and grows with the chain,
+  -- so inserts land at the right edge of the index instead of at random positions
+  CONSTRAINT offer_events_pkey
+    PRIMARY KEY (block_number, log_index),
   CONSTRAINT fk_offer_events_offer
     FOREIGN KEY (offer_id) REFERENCES public.offers (offer_id)
-);
+) PARTITION BY RANGE (block_number);
+
+-- offer_events is split in ranges of 1,000,000 blocks (~2 months on Gnosis).
+-- Partitions are named offer_events_p<first block> and are created ahead of the chain
+-- head by the indexer (see db_operations/partition_maintenance.py).
+-- SECURITY DEFINER: the writer role is not allowed to create tables in the public schema.
+CREATE OR REPLACE FUNCTION public.ensure_offer_events_partitions(p_up_to_block BIGINT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  partition_size  CONSTANT BIGINT := 1000000;
+  first_block     CONSTANT BIGINT := 25000000;  -- yam v1 contract was created at block 25530394
+  range_start     BIGINT := first_block;
+  partition_name  TEXT;
+  created_count   INTEGER := 0;
+BEGIN
+  WHILE range_start <= p_up_to_block LOOP
+    partition_name := format('offer_events_p%s', range_start);
+    IF to_regclass(format('public.%I', partition_name)) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.offer_events FOR VALUES FROM (%s) TO (%s)',
+        partition_name, range_start, range_start + partition_size
+      );
+      created_count := created_count + 1;
+    END IF;
+    range_start := range_start + partition_size;
+  END LOOP;
+  RETURN created_count;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.ensure_offer_events_partitions(BIGINT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.ensure_offer_events_partitions(BIGINT) TO "yam-indexing-writer";
+
+-- Create the first partition; the following ones are added by the indexer
+SELECT public.ensure_offer_events_partitions(25000000);
+
+-- Compatibility view for readers still relying on the former text key
+-- unique_id = transaction_hash || '_' || log_index
+CREATE OR REPLACE VIEW public.offer_events_compat AS
+SELECT
+  e.*,
+  e.transaction_hash || '_' || e.log_index AS unique_id
+FROM public.offer_events e;
 
 CREATE TABLE IF NOT EXISTS public.indexing_state (
   indexing_id   BIGSERIAL PRIMARY KEY,
@@ -65,10 +114,117 @@ CREATE TABLE IF NOT EXISTS public.indexing_state (
   to_block      BIGINT NOT NULL
 );
 
+-- Events exported for external consumers, one queue per consumer (the consumer column): an event
+-- matching several subscriptions is stored once per consumer. The event identity is promoted to
+-- columns, the payload only keeps the event specific fields. Consumers claim rows (claimed_by / claimed_at) and ack them
+-- (acked_at); acked rows are pruned by the indexer after EVENT_QUEUE_RETENTION_HOURS.
 CREATE TABLE IF NOT EXISTS public.event_queue (
   id            BIGSERIAL PRIMARY KEY,
   created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
-  payload       JSONB NOT NULL
+  consumer      TEXT NOT NULL,
+  event_type    TEXT NOT NULL,
+  offer_id      BIGINT NOT NULL,
+  block_number  BIGINT NOT NULL,
+  log_index     INT NOT NULL,
+  payload       JSONB NOT NULL,
+  claimed_by    TEXT,
+  claimed_at    TIMESTAMPTZ,
+  acked_at      TIMESTAMPTZ,
+  CONSTRAINT event_queue_consumer_block_number_log_index_key UNIQUE (consumer, block_number, log_index)
+);
+
+-- Rows still to be consumed by each consumer (claim scans)
+CREATE INDEX IF NOT EXISTS idx_event_queue_pending
+  ON public.event_queue (consumer, id)
+  WHERE acked_at IS NULL;
+
+-- Acked rows (retention pruning)
+CREATE INDEX IF NOT EXISTS idx_event_queue_acked_at
+  ON public.event_queue (acked_at)
+  WHERE acked_at IS NOT NULL;
+
+-- Event queue subscriptions served by the event queue triggers (see section 4), synced from config.py
+-- tokens: lowercase token addresses matched against the offer token and the buyer token of the
+-- event (NULL = all tokens)
+CREATE TABLE IF NOT EXISTS public.event_queue_subscriptions (
+  consumer      TEXT PRIMARY KEY,
+  event_types   TEXT[] NOT NULL,
+  tokens        TEXT[]
+);
+
+-- One row per fill (OfferAccepted), denormalized with the offer data so that reports do not
+-- need to join offer_events to offers. Filled by the indexer with each new OfferAccepted event
+-- (backfill: python3 -m maintenance backfill-trades).
+-- quote_value = amount * price (raw on-chain values, not scaled by the token decimals)
+CREATE TABLE IF NOT EXISTS public.trades (
+  block_number      BIGINT NOT NULL,
+  log_index         INT NOT NULL,
+  offer_id          BIGINT NOT NULL,
+  transaction_hash  TEXT NOT NULL,
+  seller_address    TEXT NOT NULL,
+  buyer_address     TEXT NOT NULL,
+  offer_token       TEXT NOT NULL,
+  buyer_token       TEXT NOT NULL,
+  amount            NUMERIC NOT NULL,
+  price             NUMERIC NOT NULL,
+  quote_value       NUMERIC NOT NULL,
+  event_timestamp   TIMESTAMPTZ,
+  PRIMARY KEY (block_number, log_index)
+);
+
+-- Per-address ledger of fills: each trade appears once for its buyer (direction 'buy') and once
+-- for its seller (direction 'sell'), so the full trade history of a wallet is one range scan.
+-- direction is part of the key for the (rare) fills where the buyer is also the seller.
+-- Filled by the indexer with each new OfferAccepted event
+-- (rebuild: python3 -m maintenance rebuild-address-trades).
+CREATE TABLE IF NOT EXISTS public.address_trades (
+  address           TEXT NOT NULL,
+  block_number      BIGINT NOT NULL,
+  log_index         INT NOT NULL,
+  direction         TEXT NOT NULL
+                     CHECK (direction IN ('buy', 'sell')),
+  counterparty      TEXT NOT NULL,
+  offer_id          BIGINT NOT NULL,
+  transaction_hash  TEXT NOT NULL,
+  offer_token       TEXT NOT NULL,
+  buyer_token       TEXT NOT NULL,
+  amount            NUMERIC NOT NULL,
+  price             NUMERIC NOT NULL,
+  quote_value       NUMERIC NOT NULL,
+  event_timestamp   TIMESTAMPTZ,
+  PRIMARY KEY (address, block_number, log_index, direction)
+);
+
+-- Trading rollups per token pair, maintained by the indexer in the same transaction as
+-- each OfferAccepted insert (rebuild: python3 -m maintenance rebuild-trade-rollups).
+-- Amounts and prices are raw on-chain values:
+--   volume       = SUM(amount_bought)                 (offer token units)
+--   quote_volume = SUM(amount_bought * price_bought)  (raw product, not scaled by decimals)
+--   vwap         = quote_volume / volume              (buyer token units per offer token)
+CREATE TABLE IF NOT EXISTS public.trade_rollups_hourly (
+  offer_token   TEXT NOT NULL,
+  buyer_token   TEXT NOT NULL,
+  bucket_start  TIMESTAMPTZ NOT NULL,
+  trade_count   BIGINT NOT NULL,
+  volume        NUMERIC NOT NULL,
+  quote_volume  NUMERIC NOT NULL,
+  min_price     NUMERIC NOT NULL,
+  max_price     NUMERIC NOT NULL,
+  vwap          NUMERIC GENERATED ALWAYS AS (quote_volume / NULLIF(volume, 0)) STORED,
+  PRIMARY KEY (offer_token, buyer_token, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS public.trade_rollups_daily (
+  offer_token   TEXT NOT NULL,
+  buyer_token   TEXT NOT NULL,
+  bucket_start  TIMESTAMPTZ NOT NULL,
+  trade_count   BIGINT NOT NULL,
+  volume        NUMERIC NOT NULL,
+  quote_volume  NUMERIC NOT NULL,
+  min_price     NUMERIC NOT NULL,
+  max_price     NUMERIC NOT NULL,
+  vwap          NUMERIC GENERATED ALWAYS AS (quote_volume / NULLIF(volume, 0)) STORED,
+  PRIMARY KEY (offer_token, buyer_token, bucket_start)
 );
 
 -- -----------------------------
@@ -87,12 +243,177 @@ CREATE INDEX IF NOT EXISTS idx_offer_events_buyer_address
 CREATE INDEX IF NOT EXISTS idx_offers_seller_address
   ON public.offers (seller_address);
 
--- Foreign key index for JOIN optimization
-CREATE INDEX IF NOT EXISTS idx_offer_events_offer_id
-  ON public.offer_events (offer_id);
+-- Foreign key index for JOIN optimization, in chain order so that the history
+-- of an offer is read without sorting
+CREATE INDEX IF NOT EXISTS idx_offer_events_offer_id_chain_order
+  ON public.offer_events (offer_id, block_number, log_index);
+
+-- Active order book: active offers (by id, by seller, by token pair)
+-- status = 'InProgress' is a small part of the table, so the partial indexes stay small
+CREATE INDEX IF NOT EXISTS idx_offers_active_offer_id
+  ON public.offers (offer_id)
+  WHERE status = 'InProgress';
+
+CREATE INDEX IF NOT EXISTS idx_offers_active_seller_address
+  ON public.offers (seller_address, offer_id)
+  WHERE status = 'InProgress';
+
+CREATE INDEX IF NOT EXISTS idx_offers_active_token_pair
+  ON public.offers (offer_token, buyer_token)
+  INCLUDE (offer_id, seller_address, initial_amount, price_per_unit)
+  WHERE status = 'InProgress';
+
+-- Activity of an address for a given offer token (offers side of the JOIN)
+CREATE INDEX IF NOT EXISTS idx_offers_offer_token_seller_address
+  ON public.offers (offer_token, seller_address)
+  INCLUDE (offer_id);
+
+-- Fill history: covering indexes answering "fills of address Z / of offer X in period P"
+-- without reading the heap
+CREATE INDEX IF NOT EXISTS idx_offer_events_fills_by_buyer
+  ON public.offer_events (buyer_address, event_timestamp)
+  INCLUDE (offer_id, amount_bought, price_bought, transaction_hash)
+  WHERE event_type = 'OfferAccepted';
+
+CREATE INDEX IF NOT EXISTS idx_offer_events_fills_by_offer
+  ON public.offer_events (offer_id, event_timestamp)
+  INCLUDE (buyer_address, amount_bought, price_bought, transaction_hash)
+  WHERE event_type = 'OfferAccepted';
+
+-- BRIN indexes: rows are inserted in chain order, so block ranges and timestamps are
+-- physically correlated and a few kilobytes of BRIN are enough for time-range scans
+-- (offer_events.block_number is already the leading column of the primary key)
+CREATE INDEX IF NOT EXISTS brin_offer_events_event_timestamp
+  ON public.offer_events USING brin (event_timestamp);
+
+CREATE INDEX IF NOT EXISTS brin_offers_block_number
+  ON public.offers USING brin (block_number);
+
+CREATE INDEX IF NOT EXISTS brin_offers_creation_timestamp
+  ON public.offers USING brin (creation_timestamp);
+
+-- Trades by buyer, seller and token, in chain order
+CREATE INDEX IF NOT EXISTS idx_trades_buyer_address
+  ON public.trades (buyer_address, block_number, log_index);
+
+CREATE INDEX IF NOT EXISTS idx_trades_seller_address
+  ON public.trades (seller_address, block_number, log_index);
+
+CREATE INDEX IF NOT EXISTS idx_trades_offer_token
+  ON public.trades (offer_token, block_number, log_index);
+
+CREATE INDEX IF NOT EXISTS idx_trades_buyer_token
+  ON public.trades (buyer_token, block_number, log_index);
+
+-- Ledger of an address over a period of time
+CREATE INDEX IF NOT EXISTS idx_address_trades_address_timestamp
+  ON public.address_trades (address, event_timestamp);
+
+-- Dashboards: all token pairs of a period
+CREATE INDEX IF NOT EXISTS idx_trade_rollups_hourly_bucket_start
+  ON public.trade_rollups_hourly (bucket_start);
+
+CREATE INDEX IF NOT EXISTS idx_trade_rollups_daily_bucket_start
+  ON public.trade_rollups_daily (bucket_start);
+
+-- -----------------------------
+-- 4) Triggers
+-- -----------------------------
+
+-- Trigger mode of the event queue (EVENT_QUEUE_MODE = "trigger"): each inserted event is enqueued
+-- once per matching row of event_queue_subscriptions, in the same transaction as its insert and
+-- whatever the source (live indexing, TheGraph backfill, history fill). The subscriptions are synced
+-- with config.py by the indexer at startup; when the table is empty the triggers do nothing.
+-- OfferCreated events are only stored in offers, the other event types in offer_events.
+CREATE OR REPLACE FUNCTION public.enqueue_offer_created()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public.event_queue (consumer, event_type, offer_id, block_number, log_index, payload)
+  SELECT
+    s.consumer, 'OfferCreated', NEW.offer_id, NEW.block_number, NEW.log_index,
+    jsonb_build_object(
+      'transactionHash', NEW.transaction_hash,
+      'seller', NEW.seller_address,
+      'price', NEW.price_per_unit::NUMERIC,
+      'amount', NEW.initial_amount::NUMERIC,
+      'offerToken', NEW.offer_token,
+      'buyerToken', NEW.buyer_token
+    )
+  FROM public.event_queue_subscriptions s
+  WHERE 'OfferCreated' = ANY(s.event_types)
+    AND (s.tokens IS NULL OR lower(NEW.offer_token) = ANY(s.tokens) OR lower(NEW.buyer_token) = ANY(s.tokens))
+  ON CONFLICT (consumer, block_number, log_index) DO NOTHING;
+
+  IF FOUND THEN
+    PERFORM pg_notify('yam_event_queue', currval('public.event_queue_id_seq')::TEXT);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.enqueue_offer_event()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_offer   public.offers%ROWTYPE;
+  v_payload JSONB;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM public.event_queue_subscriptions WHERE NEW.event_type = ANY(event_types)) THEN
+    RETURN NULL;
+  END IF;
+
+  SELECT * INTO v_offer FROM public.offers WHERE offer_id = NEW.offer_id;
+
+  IF NEW.event_type = 'OfferAccepted' THEN
+    v_payload := jsonb_build_object(
+      'transactionHash', NEW.transaction_hash,
+      'seller', v_offer.seller_address,
+      'buyer', NEW.buyer_address,
+      'price', NEW.price_bought::NUMERIC,
+      'amount', NEW.amount_bought::NUMERIC,
+      'offerToken', v_offer.offer_token,
+      'buyerToken', v_offer.buyer_token
+    );
+  ELSIF NEW.event_type = 'OfferUpdated' THEN
+    v_payload := jsonb_build_object(
+      'transactionHash', NEW.transaction_hash,
+      'newPrice', NEW.price::NUMERIC,
+      'newAmount', NEW.amount::NUMERIC
+    );
+  ELSE
+    v_payload := jsonb_build_object('transactionHash', NEW.transaction_hash);
+  END IF;
+
+  INSERT INTO public.event_queue (consumer, event_type, offer_id, block_number, log_index, payload)
+  SELECT s.consumer, NEW.event_type, NEW.offer_id, NEW.block_number, NEW.log_index, v_payload
+  FROM public.event_queue_subscriptions s
+  WHERE NEW.event_type = ANY(s.event_types)
+    AND (s.tokens IS NULL OR lower(v_offer.offer_token) = ANY(s.tokens) OR lower(v_offer.buyer_token) = ANY(s.tokens))
+  ON CONFLICT (consumer, block_number, log_index) DO NOTHING;
+
+  IF FOUND THEN
+    PERFORM pg_notify('yam_event_queue', currval('public.event_queue_id_seq')::TEXT);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_offers_enqueue_offer_created ON public.offers;
+CREATE TRIGGER trg_offers_enqueue_offer_created
+  AFTER INSERT ON public.offers
+  FOR EACH ROW EXECUTE FUNCTION public.enqueue_offer_created();
+
+-- Defined on the partitioned table: applies to every current and future partition
+DROP TRIGGER IF EXISTS trg_offer_events_enqueue_offer_event ON public.offer_events;
+CREATE TRIGGER trg_offer_events_enqueue_offer_event
+  AFTER INSERT ON public.offer_events
+  FOR EACH ROW EXECUTE FUNCTION public.enqueue_offer_event();
 
 -- -----------------------------
--- 4) Privileges
+-- 5) Privileges
 -- -----------------------------
 
 -- Allow DB connection
@@ -0,0 +1,30 @@
+-- init_postgres/migrations/001-offer-events-block-log-index-pk.sql
+-- Replaces the TEXT primary key `unique_id` of offer_events by (block_number, log_index).
+-- Only needed for databases created before this change (00-init.sql already has the new key).
+--
+-- Run as the postgres superuser, with the indexer stopped:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 001-offer-events-block-log-index-pk.sql
+
+BEGIN;
+
+ALTER TABLE public.offer_events DROP CONSTRAINT offer_events_pkey;
+
+ALTER TABLE public.offer_events
+  ADD CONSTRAINT offer_events_pkey PRIMARY KEY (block_number, log_index);
+
+ALTER TABLE public.offer_events DROP COLUMN unique_id;
+
+CREATE OR REPLACE VIEW public.offer_events_compat AS
+SELECT
+  e.*,
+  e.transaction_hash || '_' || e.log_index AS unique_id
+FROM public.offer_events e;
+
+GRANT SELECT ON public.offer_events_compat TO "yam-indexing-writer";
+GRANT SELECT ON public.offer_events_compat TO "yam-indexing-reader";
+GRANT SELECT ON public.offer_events_compat TO "yam-indexing-event_queue";
+
+COMMIT;
+
+-- Rewrite the heap without the dropped column
+VACUUM FULL ANALYZE public.offer_events;
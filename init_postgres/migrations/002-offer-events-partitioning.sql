@@ -0,0 +1,112 @@
+-- init_postgres/migrations/002-offer-events-partitioning.sql
+-- Converts offer_events into a table partitioned by RANGE (block_number).
+-- Requires 001-offer-events-block-log-index-pk.sql to have been applied.
+--
+-- Run as the postgres superuser, with the indexer stopped:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 002-offer-events-partitioning.sql
+
+BEGIN;
+
+LOCK TABLE public.offer_events IN ACCESS EXCLUSIVE MODE;
+
+-- 1) Move the current table out of the way (its index names would collide)
+DROP VIEW IF EXISTS public.offer_events_compat;
+ALTER TABLE public.offer_events RENAME TO offer_events_unpartitioned;
+ALTER TABLE public.offer_events_unpartitioned RENAME CONSTRAINT offer_events_pkey TO offer_events_unpartitioned_pkey;
+DROP INDEX IF EXISTS public.idx_offer_events_type_timestamp;
+DROP INDEX IF EXISTS public.idx_offer_events_buyer_address;
+DROP INDEX IF EXISTS public.idx_offer_events_offer_id;
+
+-- 2) Partitioned table (same definition as 00-init.sql)
+CREATE TABLE public.offer_events (
+  offer_id            BIGINT NOT NULL,
+  event_type          TEXT NOT NULL
+                       CHECK (event_type IN ('OfferCreated', 'OfferUpdated', 'OfferAccepted', 'OfferDeleted')),
+  amount              TEXT,
+  price               TEXT,
+  buyer_address       TEXT,
+  amount_bought       TEXT,
+  block_number        BIGINT NOT NULL,
+  transaction_hash    TEXT NOT NULL,
+  log_index           INT NOT NULL,
+  price_bought        TEXT,
+  event_timestamp     TIMESTAMPTZ,
+  CONSTRAINT offer_events_pkey
+    PRIMARY KEY (block_number, log_index),
+  CONSTRAINT fk_offer_events_offer
+    FOREIGN KEY (offer_id) REFERENCES public.offers (offer_id)
+) PARTITION BY RANGE (block_number);
+
+CREATE OR REPLACE FUNCTION public.ensure_offer_events_partitions(p_up_to_block BIGINT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  partition_size  CONSTANT BIGINT := 1000000;
+  first_block     CONSTANT BIGINT := 25000000;  -- yam v1 contract was created at block 25530394
+  range_start     BIGINT := first_block;
+  partition_name  TEXT;
+  created_count   INTEGER := 0;
+BEGIN
+  WHILE range_start <= p_up_to_block LOOP
+    partition_name := format('offer_events_p%s', range_start);
+    IF to_regclass(format('public.%I', partition_name)) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.offer_events FOR VALUES FROM (%s) TO (%s)',
+        partition_name, range_start, range_start + partition_size
+      );
+      created_count := created_count + 1;
+    END IF;
+    range_start := range_start + partition_size;
+  END LOOP;
+  RETURN created_count;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.ensure_offer_events_partitions(BIGINT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.ensure_offer_events_partitions(BIGINT) TO "yam-indexing-writer";
+
+SELECT public.ensure_offer_events_partitions(
+  (SELECT COALESCE(MAX(block_number), 25000000) FROM public.offer_events_unpartitioned) + 500000
+);
+
+-- 3) Copy the history (rows are routed to their partition)
+INSERT INTO public.offer_events (
+  offer_id, event_type, amount, price, buyer_address, amount_bought,
+  block_number, transaction_hash, log_index, price_bought, event_timestamp
+)
+SELECT
+  offer_id, event_type, amount, price, buyer_address, amount_bought,
+  block_number, transaction_hash, log_index, price_bought, event_timestamp
+FROM public.offer_events_unpartitioned
+ORDER BY block_number, log_index;
+
+DROP TABLE public.offer_events_unpartitioned;
+
+-- 4) Indexes (created on the parent, inherited by every partition)
+CREATE INDEX idx_offer_events_type_timestamp
+  ON public.offer_events (event_type, event_timestamp);
+CREATE INDEX idx_offer_events_buyer_address
+  ON public.offer_events (buyer_address);
+CREATE INDEX idx_offer_events_offer_id
+  ON public.offer_events (offer_id);
+
+-- 5) Compatibility view and privileges
+CREATE OR REPLACE VIEW public.offer_events_compat AS
+SELECT
+  e.*,
+  e.transaction_hash || '_' || e.log_index AS unique_id
+FROM public.offer_events e;
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.offer_events TO "yam-indexing-writer";
+GRANT SELECT ON public.offer_events TO "yam-indexing-reader";
+GRANT SELECT ON public.offer_events TO "yam-indexing-event_queue";
+GRANT SELECT ON public.offer_events_compat TO "yam-indexing-writer";
+GRANT SELECT ON public.offer_events_compat TO "yam-indexing-reader";
+GRANT SELECT ON public.offer_events_compat TO "yam-indexing-event_queue";
+
+COMMIT;
+
+ANALYZE public.offer_events;
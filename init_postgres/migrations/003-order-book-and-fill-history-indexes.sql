@@ -0,0 +1,58 @@
+-- init_postgres/migrations/003-order-book-and-fill-history-indexes.sql
+-- Adds the workload-driven index set of 00-init.sql (partial, covering and BRIN indexes).
+--
+-- Run as the postgres superuser:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 003-order-book-and-fill-history-indexes.sql
+--
+-- Indexes on the partitioned offer_events table cannot be built CONCURRENTLY from the
+-- parent: stop the indexer while this script runs.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_offer_events_offer_id_chain_order
+  ON public.offer_events (offer_id, block_number, log_index);
+
+-- superseded by idx_offer_events_offer_id_chain_order
+DROP INDEX IF EXISTS public.idx_offer_events_offer_id;
+
+CREATE INDEX IF NOT EXISTS idx_offers_active_offer_id
+  ON public.offers (offer_id)
+  WHERE status = 'InProgress';
+
+CREATE INDEX IF NOT EXISTS idx_offers_active_seller_address
+  ON public.offers (seller_address, offer_id)
+  WHERE status = 'InProgress';
+
+CREATE INDEX IF NOT EXISTS idx_offers_active_token_pair
+  ON public.offers (offer_token, buyer_token)
+  INCLUDE (offer_id, seller_address, initial_amount, price_per_unit)
+  WHERE status = 'InProgress';
+
+CREATE INDEX IF NOT EXISTS idx_offers_offer_token_seller_address
+  ON public.offers (offer_token, seller_address)
+  INCLUDE (offer_id);
+
+CREATE INDEX IF NOT EXISTS idx_offer_events_fills_by_buyer
+  ON public.offer_events (buyer_address, event_timestamp)
+  INCLUDE (offer_id, amount_bought, price_bought, transaction_hash)
+  WHERE event_type = 'OfferAccepted';
+
+CREATE INDEX IF NOT EXISTS idx_offer_events_fills_by_offer
+  ON public.offer_events (offer_id, event_timestamp)
+  INCLUDE (buyer_address, amount_bought, price_bought, transaction_hash)
+  WHERE event_type = 'OfferAccepted';
+
+CREATE INDEX IF NOT EXISTS brin_offer_events_event_timestamp
+  ON public.offer_events USING brin (event_timestamp);
+
+CREATE INDEX IF NOT EXISTS brin_offers_block_number
+  ON public.offers USING brin (block_number);
+
+CREATE INDEX IF NOT EXISTS brin_offers_creation_timestamp
+  ON public.offers USING brin (creation_timestamp);
+
+COMMIT;
+
+-- Index-only scans need an up-to-date visibility map
+VACUUM ANALYZE public.offers;
+VACUUM ANALYZE public.offer_events;
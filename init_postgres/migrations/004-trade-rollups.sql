@@ -0,0 +1,47 @@
+-- init_postgres/migrations/004-trade-rollups.sql
+-- Adds the hourly and daily trading rollup tables.
+--
+-- Run as the postgres superuser:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 004-trade-rollups.sql
+-- then fill them from the existing history:
+--   python3 -m maintenance rebuild-trade-rollups
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.trade_rollups_hourly (
+  offer_token   TEXT NOT NULL,
+  buyer_token   TEXT NOT NULL,
+  bucket_start  TIMESTAMPTZ NOT NULL,
+  trade_count   BIGINT NOT NULL,
+  volume        NUMERIC NOT NULL,
+  quote_volume  NUMERIC NOT NULL,
+  min_price     NUMERIC NOT NULL,
+  max_price     NUMERIC NOT NULL,
+  vwap          NUMERIC GENERATED ALWAYS AS (quote_volume / NULLIF(volume, 0)) STORED,
+  PRIMARY KEY (offer_token, buyer_token, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS public.trade_rollups_daily (
+  offer_token   TEXT NOT NULL,
+  buyer_token   TEXT NOT NULL,
+  bucket_start  TIMESTAMPTZ NOT NULL,
+  trade_count   BIGINT NOT NULL,
+  volume        NUMERIC NOT NULL,
+  quote_volume  NUMERIC NOT NULL,
+  min_price     NUMERIC NOT NULL,
+  max_price     NUMERIC NOT NULL,
+  vwap          NUMERIC GENERATED ALWAYS AS (quote_volume / NULLIF(volume, 0)) STORED,
+  PRIMARY KEY (offer_token, buyer_token, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_trade_rollups_hourly_bucket_start
+  ON public.trade_rollups_hourly (bucket_start);
+
+CREATE INDEX IF NOT EXISTS idx_trade_rollups_daily_bucket_start
+  ON public.trade_rollups_daily (bucket_start);
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.trade_rollups_hourly, public.trade_rollups_daily TO "yam-indexing-writer";
+GRANT SELECT ON public.trade_rollups_hourly, public.trade_rollups_daily TO "yam-indexing-reader";
+GRANT SELECT ON public.trade_rollups_hourly, public.trade_rollups_daily TO "yam-indexing-event_queue";
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- init_postgres/migrations/005-trades.sql
+-- Adds the denormalized trades table.
+--
+-- Run as the postgres superuser:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 005-trades.sql
+-- then fill it from the existing history:
+--   python3 -m maintenance backfill-trades
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.trades (
+  block_number      BIGINT NOT NULL,
+  log_index         INT NOT NULL,
+  offer_id          BIGINT NOT NULL,
+  transaction_hash  TEXT NOT NULL,
+  seller_address    TEXT NOT NULL,
+  buyer_address     TEXT NOT NULL,
+  offer_token       TEXT NOT NULL,
+  buyer_token       TEXT NOT NULL,
+  amount            NUMERIC NOT NULL,
+  price             NUMERIC NOT NULL,
+  quote_value       NUMERIC NOT NULL,
+  event_timestamp   TIMESTAMPTZ,
+  PRIMARY KEY (block_number, log_index)
+);
+
+CREATE INDEX IF NOT EXISTS idx_trades_buyer_address
+  ON public.trades (buyer_address, block_number, log_index);
+
+CREATE INDEX IF NOT EXISTS idx_trades_seller_address
+  ON public.trades (seller_address, block_number, log_index);
+
+CREATE INDEX IF NOT EXISTS idx_trades_offer_token
+  ON public.trades (offer_token, block_number, log_index);
+
+CREATE INDEX IF NOT EXISTS idx_trades_buyer_token
+  ON public.trades (buyer_token, block_number, log_index);
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.trades TO "yam-indexing-writer";
+GRANT SELECT ON public.trades TO "yam-indexing-reader";
+GRANT SELECT ON public.trades TO "yam-indexing-event_queue";
+
+COMMIT;
@@ -0,0 +1,36 @@
+-- init_postgres/migrations/006-address-trades.sql
+-- Adds the per-address trade ledger.
+--
+-- Run as the postgres superuser:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 006-address-trades.sql
+-- then fill it from the existing history:
+--   python3 -m maintenance rebuild-address-trades
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.address_trades (
+  address           TEXT NOT NULL,
+  block_number      BIGINT NOT NULL,
+  log_index         INT NOT NULL,
+  direction         TEXT NOT NULL
+                     CHECK (direction IN ('buy', 'sell')),
+  counterparty      TEXT NOT NULL,
+  offer_id          BIGINT NOT NULL,
+  transaction_hash  TEXT NOT NULL,
+  offer_token       TEXT NOT NULL,
+  buyer_token       TEXT NOT NULL,
+  amount            NUMERIC NOT NULL,
+  price             NUMERIC NOT NULL,
+  quote_value       NUMERIC NOT NULL,
+  event_timestamp   TIMESTAMPTZ,
+  PRIMARY KEY (address, block_number, log_index, direction)
+);
+
+CREATE INDEX IF NOT EXISTS idx_address_trades_address_timestamp
+  ON public.address_trades (address, event_timestamp);
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.address_trades TO "yam-indexing-writer";
+GRANT SELECT ON public.address_trades TO "yam-indexing-reader";
+GRANT SELECT ON public.address_trades TO "yam-indexing-event_queue";
+
+COMMIT;
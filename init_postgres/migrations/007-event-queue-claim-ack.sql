@@ -0,0 +1,50 @@
+-- init_postgres/migrations/007-event-queue-claim-ack.sql
+-- Promotes the event identity of event_queue to columns, slims the payload and adds the
+-- claim / ack columns used by the event queue consumers.
+--
+-- Run as the postgres superuser:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 007-event-queue-claim-ack.sql
+
+BEGIN;
+
+ALTER TABLE public.event_queue
+  ADD COLUMN IF NOT EXISTS event_type    TEXT,
+  ADD COLUMN IF NOT EXISTS offer_id      BIGINT,
+  ADD COLUMN IF NOT EXISTS block_number  BIGINT,
+  ADD COLUMN IF NOT EXISTS log_index     INT,
+  ADD COLUMN IF NOT EXISTS claimed_by    TEXT,
+  ADD COLUMN IF NOT EXISTS claimed_at    TIMESTAMPTZ,
+  ADD COLUMN IF NOT EXISTS acked_at      TIMESTAMPTZ;
+
+-- existing rows stored the whole decoded log in the payload
+UPDATE public.event_queue
+SET event_type   = payload->>'topic',
+    offer_id     = (payload->>'offerId')::BIGINT,
+    block_number = (payload->>'blockNumber')::BIGINT,
+    log_index    = (payload->>'logIndex')::INT,
+    payload      = payload - 'topic' - 'offerId' - 'blockNumber' - 'logIndex'
+WHERE event_type IS NULL;
+
+-- the same event could be exported twice when a block range was retried
+DELETE FROM public.event_queue q
+USING public.event_queue d
+WHERE q.block_number = d.block_number
+  AND q.log_index = d.log_index
+  AND q.id > d.id;
+
+ALTER TABLE public.event_queue
+  ALTER COLUMN event_type   SET NOT NULL,
+  ALTER COLUMN offer_id     SET NOT NULL,
+  ALTER COLUMN block_number SET NOT NULL,
+  ALTER COLUMN log_index    SET NOT NULL,
+  ADD CONSTRAINT event_queue_block_number_log_index_key UNIQUE (block_number, log_index);
+
+CREATE INDEX IF NOT EXISTS idx_event_queue_pending
+  ON public.event_queue (id)
+  WHERE acked_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_event_queue_acked_at
+  ON public.event_queue (acked_at)
+  WHERE acked_at IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,115 @@
+-- init_postgres/migrations/008-event-queue-triggers.sql
+-- Adds the trigger mode of the event queue (EVENT_QUEUE_MODE = "trigger").
+--
+-- Run as the postgres superuser:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 008-event-queue-triggers.sql
+
+BEGIN;
+
+-- Event types enqueued by the event queue triggers (see 00-init.sql), synced from config.py
+CREATE TABLE IF NOT EXISTS public.event_queue_trigger_event_types (
+  event_type    TEXT PRIMARY KEY
+                 CHECK (event_type IN ('OfferCreated', 'OfferUpdated', 'OfferAccepted', 'OfferDeleted'))
+);
+
+-- Trigger mode of the event queue (EVENT_QUEUE_MODE = "trigger"): the events of the types listed in
+-- event_queue_trigger_event_types are enqueued by the database in the same transaction as their
+-- insert, whatever the source (live indexing, TheGraph backfill, history fill). The table is kept in
+-- sync with config.py by the indexer at startup; when it is empty the triggers do nothing.
+-- OfferCreated events are only stored in offers, the other event types in offer_events.
+CREATE OR REPLACE FUNCTION public.enqueue_offer_created()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_event_id BIGINT;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM public.event_queue_trigger_event_types WHERE event_type = 'OfferCreated') THEN
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO public.event_queue (event_type, offer_id, block_number, log_index, payload)
+  VALUES (
+    'OfferCreated', NEW.offer_id, NEW.block_number, NEW.log_index,
+    jsonb_build_object(
+      'transactionHash', NEW.transaction_hash,
+      'seller', NEW.seller_address,
+      'price', NEW.price_per_unit::NUMERIC,
+      'amount', NEW.initial_amount::NUMERIC,
+      'offerToken', NEW.offer_token,
+      'buyerToken', NEW.buyer_token
+    )
+  )
+  ON CONFLICT (block_number, log_index) DO NOTHING
+  RETURNING id INTO v_event_id;
+
+  IF v_event_id IS NOT NULL THEN
+    PERFORM pg_notify('yam_event_queue', v_event_id::TEXT);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.enqueue_offer_event()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_payload  JSONB;
+  v_event_id BIGINT;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM public.event_queue_trigger_event_types WHERE event_type = NEW.event_type) THEN
+    RETURN NULL;
+  END IF;
+
+  IF NEW.event_type = 'OfferAccepted' THEN
+    SELECT jsonb_build_object(
+             'transactionHash', NEW.transaction_hash,
+             'seller', o.seller_address,
+             'buyer', NEW.buyer_address,
+             'price', NEW.price_bought::NUMERIC,
+             'amount', NEW.amount_bought::NUMERIC,
+             'offerToken', o.offer_token,
+             'buyerToken', o.buyer_token
+           )
+    INTO v_payload
+    FROM public.offers o
+    WHERE o.offer_id = NEW.offer_id;
+  ELSIF NEW.event_type = 'OfferUpdated' THEN
+    v_payload := jsonb_build_object(
+      'transactionHash', NEW.transaction_hash,
+      'newPrice', NEW.price::NUMERIC,
+      'newAmount', NEW.amount::NUMERIC
+    );
+  ELSE
+    v_payload := jsonb_build_object('transactionHash', NEW.transaction_hash);
+  END IF;
+
+  INSERT INTO public.event_queue (event_type, offer_id, block_number, log_index, payload)
+  VALUES (NEW.event_type, NEW.offer_id, NEW.block_number, NEW.log_index, v_payload)
+  ON CONFLICT (block_number, log_index) DO NOTHING
+  RETURNING id INTO v_event_id;
+
+  IF v_event_id IS NOT NULL THEN
+    PERFORM pg_notify('yam_event_queue', v_event_id::TEXT);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_offers_enqueue_offer_created ON public.offers;
+CREATE TRIGGER trg_offers_enqueue_offer_created
+  AFTER INSERT ON public.offers
+  FOR EACH ROW EXECUTE FUNCTION public.enqueue_offer_created();
+
+-- Defined on the partitioned table: applies to every current and future partition
+DROP TRIGGER IF EXISTS trg_offer_events_enqueue_offer_event ON public.offer_events;
+CREATE TRIGGER trg_offer_events_enqueue_offer_event
+  AFTER INSERT ON public.offer_events
+  FOR EACH ROW EXECUTE FUNCTION public.enqueue_offer_event();
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.event_queue_trigger_event_types TO "yam-indexing-writer";
+GRANT SELECT ON public.event_queue_trigger_event_types TO "yam-indexing-reader";
+GRANT SELECT ON public.event_queue_trigger_event_types TO "yam-indexing-event_queue";
+
+COMMIT;
@@ -0,0 +1,132 @@
+-- init_postgres/migrations/009-event-queue-subscriptions.sql
+-- Replaces the single event queue by one queue per consumer subscription (EVENT_QUEUE_SUBSCRIPTIONS).
+-- The rows already in event_queue are assigned to the consumer 'default'.
+--
+-- Run as the postgres superuser:
+--   psql -v ON_ERROR_STOP=1 -U postgres -d yam_events -f 009-event-queue-subscriptions.sql
+
+BEGIN;
+
+ALTER TABLE public.event_queue
+  ADD COLUMN IF NOT EXISTS consumer TEXT;
+
+UPDATE public.event_queue SET consumer = 'default' WHERE consumer IS NULL;
+
+ALTER TABLE public.event_queue
+  ALTER COLUMN consumer SET NOT NULL,
+  DROP CONSTRAINT IF EXISTS event_queue_block_number_log_index_key,
+  ADD CONSTRAINT event_queue_consumer_block_number_log_index_key UNIQUE (consumer, block_number, log_index);
+
+DROP INDEX IF EXISTS public.idx_event_queue_pending;
+CREATE INDEX idx_event_queue_pending
+  ON public.event_queue (consumer, id)
+  WHERE acked_at IS NULL;
+
+-- Event queue subscriptions served by the event queue triggers (see 00-init.sql), synced from config.py
+-- tokens: lowercase token addresses matched against the offer token and the buyer token of the
+-- event (NULL = all tokens)
+CREATE TABLE IF NOT EXISTS public.event_queue_subscriptions (
+  consumer      TEXT PRIMARY KEY,
+  event_types   TEXT[] NOT NULL,
+  tokens        TEXT[]
+);
+
+-- Trigger mode of the event queue (EVENT_QUEUE_MODE = "trigger"): each inserted event is enqueued
+-- once per matching row of event_queue_subscriptions, in the same transaction as its insert and
+-- whatever the source (live indexing, TheGraph backfill, history fill). The subscriptions are synced
+-- with config.py by the indexer at startup; when the table is empty the triggers do nothing.
+-- OfferCreated events are only stored in offers, the other event types in offer_events.
+CREATE OR REPLACE FUNCTION public.enqueue_offer_created()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public.event_queue (consumer, event_type, offer_id, block_number, log_index, payload)
+  SELECT
+    s.consumer, 'OfferCreated', NEW.offer_id, NEW.block_number, NEW.log_index,
+    jsonb_build_object(
+      'transactionHash', NEW.transaction_hash,
+      'seller', NEW.seller_address,
+      'price', NEW.price_per_unit::NUMERIC,
+      'amount', NEW.initial_amount::NUMERIC,
+      'offerToken', NEW.offer_token,
+      'buyerToken', NEW.buyer_token
+    )
+  FROM public.event_queue_subscriptions s
+  WHERE 'OfferCreated' = ANY(s.event_types)
+    AND (s.tokens IS NULL OR lower(NEW.offer_token) = ANY(s.tokens) OR lower(NEW.buyer_token) = ANY(s.tokens))
+  ON CONFLICT (consumer, block_number, log_index) DO NOTHING;
+
+  IF FOUND THEN
+    PERFORM pg_notify('yam_event_queue', currval('public.event_queue_id_seq')::TEXT);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.enqueue_offer_event()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_offer   public.offers%ROWTYPE;
+  v_payload JSONB;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM public.event_queue_subscriptions WHERE NEW.event_type = ANY(event_types)) THEN
+    RETURN NULL;
+  END IF;
+
+  SELECT * INTO v_offer FROM public.offers WHERE offer_id = NEW.offer_id;
+
+  IF NEW.event_type = 'OfferAccepted' THEN
+    v_payload := jsonb_build_object(
+      'transactionHash', NEW.transaction_hash,
+      'seller', v_offer.seller_address,
+      'buyer', NEW.buyer_address,
+      'price', NEW.price_bought::NUMERIC,
+      'amount', NEW.amount_bought::NUMERIC,
+      'offerToken', v_offer.offer_token,
+      'buyerToken', v_offer.buyer_token
+    );
+  ELSIF NEW.event_type = 'OfferUpdated' THEN
+    v_payload := jsonb_build_object(
+      'transactionHash', NEW.transaction_hash,
+      'newPrice', NEW.price::NUMERIC,
+      'newAmount', NEW.amount::NUMERIC
+    );
+  ELSE
+    v_payload := jsonb_build_object('transactionHash', NEW.transaction_hash);
+  END IF;
+
+  INSERT INTO public.event_queue (consumer, event_type, offer_id, block_number, log_index, payload)
+  SELECT s.consumer, NEW.event_type, NEW.offer_id, NEW.block_number, NEW.log_index, v_payload
+  FROM public.event_queue_subscriptions s
+  WHERE NEW.event_type = ANY(s.event_types)
+    AND (s.tokens IS NULL OR lower(v_offer.offer_token) = ANY(s.tokens) OR lower(v_offer.buyer_token) = ANY(s.tokens))
+  ON CONFLICT (consumer, block_number, log_index) DO NOTHING;
+
+  IF FOUND THEN
+    PERFORM pg_notify('yam_event_queue', currval('public.event_queue_id_seq')::TEXT);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_offers_enqueue_offer_created ON public.offers;
+CREATE TRIGGER trg_offers_enqueue_offer_created
+  AFTER INSERT ON public.offers
+  FOR EACH ROW EXECUTE FUNCTION public.enqueue_offer_created();
+
+-- Defined on the partitioned table: applies to every current and future partition
+DROP TRIGGER IF EXISTS trg_offer_events_enqueue_offer_event ON public.offer_events;
+CREATE TRIGGER trg_offer_events_enqueue_offer_event
+  AFTER INSERT ON public.offer_events
+  FOR EACH ROW EXECUTE FUNCTION public.enqueue_offer_event();
+
+DROP TABLE IF EXISTS public.event_queue_trigger_event_types;
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.event_queue_subscriptions TO "yam-indexing-writer";
+GRANT SELECT ON public.event_queue_subscriptions TO "yam-indexing-reader";
+GRANT SELECT ON public.event_queue_subscriptions TO "yam-indexing-event_queue";
+
+COMMIT;
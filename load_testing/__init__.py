@@ -0,0 +1,2 @@
+from .dataset import EventDataset, generate_synthetic_dataset, load_dataset, save_dataset
+from .mock_server import FaultInjection, MockChain, MockServer, start_mock_server
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Local mock subgraph and JSON-RPC server to benchmark the indexer offline.
+
+Usage:
+    python3 -m load_testing serve [--synthetic-offers N | --dataset FILE] [--port N] [fault options]
+    python3 -m load_testing record --from-block N --to-block N --output FILE
+"""
+import argparse
+import logging
+import time
+from load_testing.dataset import generate_synthetic_dataset, load_dataset, save_dataset
+from load_testing.mock_server import FaultInjection, MockChain, start_mock_server
+from app_logging.logging_config import setup_logging
+
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger("load_testing")
+
+
+def _fault_injection(args: argparse.Namespace, side: str) -> FaultInjection:
+    return FaultInjection(
+        latency_ms=getattr(args, f"{side}_latency_ms"),
+        jitter_ms=getattr(args, f"{side}_jitter_ms"),
+        error_rate=getattr(args, f"{side}_error_rate"),
+        rate_limit_rps=getattr(args, f"{side}_rate_limit_rps"),
+    )
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    if args.dataset:
+        dataset = load_dataset(args.dataset)
+    else:
+        dataset = generate_synthetic_dataset(args.synthetic_offers, args.start_block, args.end_block, seed=args.seed)
+    print(f"Dataset: {len(dataset.events)} events, head block {dataset.head_block}")
+
+    # with a block time the chain starts `--live-blocks` before the dataset head, to feed the live loop
+    initial_head = dataset.head_block - args.live_blocks if args.block_time else dataset.head_block
+    chain = MockChain(dataset, initial_head, args.block_time, args.subgraph_lag)
+    server = start_mock_server(chain, args.host, args.port, _fault_injection(args, "graphql"), _fault_injection(args, "rpc"))
+
+    base_url = f"http://{args.host}:{server.server_port}"
+    print(f"YAM_INDEXING_SUBGRAPH_URL={base_url}/api/[api-key]/subgraphs/id/mock")
+    print(f"YAM_INDEXING_W3_URLS={base_url}/rpc,{base_url}/rpc")
+    print(f"Request counters: {base_url}/stats")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Requests served: {server.stats.snapshot()}")
+
+
+def cmd_record(args: argparse.Namespace) -> None:
+    from the_graphe_handler.backfill_db_block_range import fetch_block_range_events
+    from the_graphe_handler.internals._graphql_paginator import fetch_snapshot_block, resolve_subgraph_url
+
+    subgraph_url = os.environ["YAM_INDEXING_SUBGRAPH_URL"]
+    the_graph_api_key = os.environ["YAM_INDEXING_THE_GRAPH_API_KEY"]
+
+    snapshot_block = fetch_snapshot_block(resolve_subgraph_url(subgraph_url, the_graph_api_key), the_graph_api_key)
+    to_block = min(args.to_block, snapshot_block)
+    events = fetch_block_range_events(subgraph_url, the_graph_api_key, args.from_block, to_block, snapshot_block)
+    save_dataset(args.output, events, to_block)
+    print(f"{len(events)} event(s) of blocks {args.from_block}-{to_block} written to {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m load_testing", description="YAM indexing offline load testing")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="serve a dataset as a mock subgraph and JSON-RPC node")
+    serve.add_argument("--dataset", default=None, help="JSON dataset written by 'record' (default: a synthetic dataset)")
+    serve.add_argument("--synthetic-offers", type=int, default=10000, help="number of offers of the synthetic dataset")
+    serve.add_argument("--start-block", type=int, default=25000000, help="first block of the synthetic dataset")
+    serve.add_argument("--end-block", type=int, default=40000000, help="last block (head) of the synthetic dataset")
+    serve.add_argument("--seed", type=int, default=0, help="seed of the synthetic dataset")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8545)
+    serve.add_argument("--subgraph-lag", type=int, default=0, help="blocks the subgraph head lags behind the chain head")
+    serve.add_argument("--block-time", type=float, default=0.0, help="seconds per new block (0: static chain head)")
+    serve.add_argument("--live-blocks", type=int, default=1000, help="with --block-time, blocks of the dataset produced live")
+    for side in ("graphql", "rpc"):
+        serve.add_argument(f"--{side}-latency-ms", type=float, default=0.0, help=f"latency added to each {side} response")
+        serve.add_argument(f"--{side}-jitter-ms", type=float, default=0.0, help=f"random latency added to each {side} response")
+        serve.add_argument(f"--{side}-error-rate", type=float, default=0.0, help=f"share of {side} requests answered with a 502/503")
+        serve.add_argument(f"--{side}-rate-limit-rps", type=float, default=0.0, help=f"{side} requests per second before a 429 (0: no limit)")
+    serve.set_defaults(func=cmd_serve)
+
+    record = subparsers.add_parser("record", help="record the events of a block range from the real subgraph")
+    record.add_argument("--from-block", type=int, required=True)
+    record.add_argument("--to-block", type=int, required=True)
+    record.add_argument("--output", required=True, help="path of the JSON dataset")
+    record.set_defaults(func=cmd_record)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
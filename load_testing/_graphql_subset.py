@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+"""
+Parser of the subset of GraphQL sent by the_graphe_handler to the subgraph.
+
+Supported: an optional `query Name(<variable definitions>)` header, nested selection sets, aliases,
+arguments whose values are variables, numbers, strings, booleans, null, enums, objects and lists.
+Fragments, directives and mutations are not supported (the indexer does not use them).
+"""
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<ignored>[\s,]+|\#[^\n]*)
+    | (?P<punctuator>[{}()\[\]:!$=])
+    | (?P<string>"(?:[^"\\]|\\.)*")
+    | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+    """,
+    re.VERBOSE,
+)
+
+
+class GraphQLSyntaxError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Variable:
+    name: str
+
+
+@dataclass(frozen=True)
+class Enum:
+    value: str
+
+
+@dataclass
+class Selection:
+    """
+    One field of a selection set: `alias: name(arguments) { selections }`.
+    """
+    name: str
+    alias: Optional[str] = None
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    selections: List["Selection"] = field(default_factory=list)
+
+    @property
+    def response_key(self) -> str:
+        return self.alias or self.name
+
+
+def _tokenize(source: str) -> List[Tuple[str, str]]:
+    tokens: List[Tuple[str, str]] = []
+    position = 0
+    while position < len(source):
+        match = _TOKEN_PATTERN.match(source, position)
+        if match is None:
+            raise GraphQLSyntaxError(f"Unexpected character {source[position]!r} at position {position}")
+        position = match.end()
+        if match.lastgroup != "ignored":
+            tokens.append((match.lastgroup, match.group()))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, source: str) -> None:
+        self._tokens = _tokenize(source)
+        self._position = 0
+
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return None, None
+
+    def _next(self) -> Tuple[str, str]:
+        if self._position >= len(self._tokens):
+            raise GraphQLSyntaxError("Unexpected end of query")
+        token = self._tokens[self._position]
+        self._position += 1
+        return token
+
+    def _expect(self, value: str) -> None:
+        _, token_value = self._next()
+        if token_value != value:
+            raise GraphQLSyntaxError(f"Expected {value!r}, got {token_value!r}")
+
+    def parse_document(self) -> List[Selection]:
+        kind, value = self._peek()
+        if kind == "name":
+            if value != "query":
+                raise GraphQLSyntaxError(f"Only queries are supported, got {value!r}")
+            self._next()
+            if self._peek()[0] == "name":
+                self._next()  # operation name
+            if self._peek()[1] == "(":
+                self._skip_variable_definitions()
+        selections = self._parse_selection_set()
+        if self._peek()[0] is not None:
+            raise GraphQLSyntaxError("Only one operation per document is supported")
+        return selections
+
+    def _skip_variable_definitions(self) -> None:
+        # the types are not checked: the values are taken from the `variables` of the request
+        depth = 0
+        while True:
+            _, value = self._next()
+            if value == "(":
+                depth += 1
+            elif value == ")":
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _parse_selection_set(self) -> List[Selection]:
+        self._expect("{")
+        selections: List[Selection] = []
+        while self._peek()[1] != "}":
+            selections.append(self._parse_selection())
+        self._next()
+        return selections
+
+    def _parse_selection(self) -> Selection:
+        kind, name = self._next()
+        if kind != "name":
+            raise GraphQLSyntaxError(f"Expected a field name, got {name!r}")
+        selection = Selection(name=name)
+        if self._peek()[1] == ":":
+            self._next()
+            _, selection.name = self._next()
+            selection.alias = name
+        if self._peek()[1] == "(":
+            self._next()
+            while self._peek()[1] != ")":
+                _, argument_name = self._next()
+                self._expect(":")
+                selection.arguments[argument_name] = self._parse_value()
+            self._next()
+        if self._peek()[1] == "{":
+            selection.selections = self._parse_selection_set()
+        return selection
+
+    def _parse_value(self) -> Any:
+        kind, value = self._next()
+        if value == "$":
+            _, name = self._next()
+            return Variable(name)
+        if value == "{":
+            result: Dict[str, Any] = {}
+            while self._peek()[1] != "}":
+                _, key = self._next()
+                self._expect(":")
+                result[key] = self._parse_value()
+            self._next()
+            return result
+        if value == "[":
+            items: List[Any] = []
+            while self._peek()[1] != "]":
+                items.append(self._parse_value())
+            self._next()
+            return items
+        if kind == "string":
+            return bytes(value[1:-1], "utf-8").decode("unicode_escape")
+        if kind == "number":
+            return float(value) if any(c in value for c in ".eE") else int(value)
+        if kind == "name":
+            return {"true": True, "false": False, "null": None}.get(value, Enum(value))
+        raise GraphQLSyntaxError(f"Unexpected token {value!r}")
+
+
+def parse_query(source: str) -> List[Selection]:
+    """
+    Parse a GraphQL query and return its top-level selections.
+
+    Raises:
+        GraphQLSyntaxError: If the query is not valid or uses an unsupported feature
+    """
+    return _Parser(source).parse_document()
+
+
+def resolve_value(value: Any, variables: Dict[str, Any]) -> Any:
+    """
+    Replace the variables of an argument value by their value, and the enums by their name.
+    """
+    if isinstance(value, Variable):
+        if value.name not in variables:
+            raise GraphQLSyntaxError(f"Variable ${value.name} is not provided")
+        return variables[value.name]
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {key: resolve_value(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_value(item, variables) for item in value]
+    return value
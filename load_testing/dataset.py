@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import random
+from typing import Any, Dict, Iterable, List, Optional
+
+"""
+Event dataset served by the mock subgraph and JSON-RPC server.
+
+Events are stored in the format of the subgraph entities (the format of `fetch_block_range_events`):
+a 'topic' key with the event type and the fields queried by the_graphe_handler, numbers as strings.
+A dataset is either generated (`generate_synthetic_dataset`) or loaded from a JSON file written by
+`save_dataset`, e.g. recorded from the real subgraph with `python3 -m load_testing record`.
+"""
+
+COLLECTIONS = {
+    "offerCreateds": "OfferCreated",
+    "offerAccepteds": "OfferAccepted",
+    "offerUpdateds": "OfferUpdated",
+    "offerDeleteds": "OfferDeleted",
+}
+
+TOPIC_HASHES = {
+    "OfferCreated": "0x9fa2d733a579251ad3a2286bebb5db74c062332de37e4904aa156729c4b38a65",
+    "OfferDeleted": "0x88686b85d6f2c3ab9a04e4f15a22fcfa025ffd97226dcf0a67cdf682def55676",
+    "OfferAccepted": "0x0fe687b89794caf9729d642df21576cbddc748b0c8c7a5e1ec39f3a46bd00410",
+    "OfferUpdated": "0xc26a0a1f023ef119f120b3d9843d9e77dc8f66bbc0ea91d48d6dd39b8e351178",
+}
+
+YAM_V1_ADDRESS = "0xC759AA7f9dd9720A1502c104DaE4F9852bb17C14"
+BLOCK_TIME_SECONDS = 5  # Gnosis chain
+_GENESIS_TIMESTAMP = 1640995200
+
+
+def _block_timestamp(block_number: int) -> int:
+    return _GENESIS_TIMESTAMP + block_number * BLOCK_TIME_SECONDS
+
+
+def _word(value: Any) -> str:
+    if isinstance(value, str) and value.startswith("0x"):
+        return value[2:].lower().rjust(64, "0")
+    return format(int(value), "x").rjust(64, "0")
+
+
+class EventDataset:
+    """
+    In-memory dataset indexed for the queries of the mock server.
+
+    Each collection is kept sorted by (blockNumber, logIndex) and by id, so that the pages of the
+    paginator (block cursor or `id_gt` cursor) are served with a bisect instead of a full scan.
+    """
+
+    def __init__(self, events: Iterable[Dict[str, Any]], head_block: Optional[int] = None, contract_address: str = YAM_V1_ADDRESS) -> None:
+        self.contract_address = contract_address
+        self.events: List[Dict[str, Any]] = sorted(events, key=lambda e: (int(e["blockNumber"]), int(e["logIndex"])))
+        self.head_block = head_block if head_block is not None else max((int(e["blockNumber"]) for e in self.events), default=0)
+
+        self.by_block: Dict[str, List[Dict[str, Any]]] = {collection: [] for collection in COLLECTIONS}
+        topic_to_collection = {topic: collection for collection, topic in COLLECTIONS.items()}
+        for event in self.events:
+            self.by_block[topic_to_collection[event["topic"]]].append(event)
+        self.block_keys: Dict[str, List[int]] = {
+            collection: [int(e["blockNumber"]) for e in entities] for collection, entities in self.by_block.items()
+        }
+        self.by_id: Dict[str, List[Dict[str, Any]]] = {
+            collection: sorted(entities, key=lambda e: e["id"]) for collection, entities in self.by_block.items()
+        }
+        self.id_keys: Dict[str, List[str]] = {
+            collection: [e["id"] for e in entities] for collection, entities in self.by_id.items()
+        }
+        self._all_block_keys = [int(e["blockNumber"]) for e in self.events]
+
+    def events_in_block_range(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        start = bisect.bisect_left(self._all_block_keys, from_block)
+        end = bisect.bisect_right(self._all_block_keys, to_block)
+        return self.events[start:end]
+
+
+def event_to_rpc_log(event: Dict[str, Any], contract_address: str) -> Dict[str, Any]:
+    """
+    Encode an event as the `eth_getLogs` result decoded by event_handlers.decode_raw_logs_yam.
+    """
+    topic = event["topic"]
+    if topic == "OfferCreated":
+        topics = [event["offerToken"], event["buyerToken"], event["offerId"]]
+        data = [event["seller"], event["buyer"], event["price"], event["amount"]]
+    elif topic == "OfferAccepted":
+        topics = [event["offerId"], event["seller"], event["buyer"]]
+        data = [event["offerToken"], event["buyerToken"], event["price"], event["amount"]]
+    elif topic == "OfferUpdated":
+        topics = [event["offerId"], event["newPrice"], event["newAmount"]]
+        data = [event["oldPrice"], event["oldAmount"]]
+    else:
+        topics = [event["offerId"]]
+        data = []
+
+    block_number = int(event["blockNumber"])
+    return {
+        "address": contract_address,
+        "topics": [TOPIC_HASHES[topic]] + ["0x" + _word(value) for value in topics],
+        "data": "0x" + "".join(_word(value) for value in data),
+        "blockNumber": hex(block_number),
+        "blockHash": "0x" + hashlib.sha256(str(block_number).encode()).hexdigest(),
+        "transactionHash": event["transactionHash"],
+        "transactionIndex": "0x0",
+        "logIndex": hex(int(event["logIndex"])),
+        "removed": False,
+    }
+
+
+def generate_synthetic_dataset(
+    offer_count: int,
+    start_block: int,
+    end_block: int,
+    events_per_offer: float = 3.0,
+    seed: int = 0,
+) -> EventDataset:
+    """
+    Generate a reproducible dataset of `offer_count` offers created between `start_block` and `end_block`,
+    each followed by about `events_per_offer` accepted / updated events, some ending with a deletion.
+
+    Offer ids are contiguous from 0 (as checked by the history fill), and the events of a block get
+    increasing log indexes, so several events often share a block.
+    """
+    rng = random.Random(seed)
+    tokens = ["0x" + format(rng.getrandbits(160), "040x") for _ in range(20)]
+    addresses = ["0x" + format(rng.getrandbits(160), "040x") for _ in range(200)]
+
+    raw_events: List[Dict[str, Any]] = []
+    for offer_id in range(offer_count):
+        created_block = start_block + (end_block - start_block) * offer_id // max(1, offer_count)
+        offer_token, buyer_token = rng.sample(tokens, 2)
+        seller = rng.choice(addresses)
+        price = rng.randint(10**6, 10**8)
+        amount = rng.randint(10**17, 10**20)
+        raw_events.append({
+            "topic": "OfferCreated", "blockNumber": created_block, "offerId": offer_id,
+            "offerToken": offer_token, "buyerToken": buyer_token, "seller": seller,
+            "buyer": "0x" + "0" * 40, "price": price, "amount": amount,
+        })
+
+        block = created_block
+        for _ in range(rng.randint(0, int(2 * events_per_offer))):
+            block = min(end_block, block + rng.randint(0, 2000))
+            if rng.random() < 0.7:
+                bought = rng.randint(1, amount)
+                raw_events.append({
+                    "topic": "OfferAccepted", "blockNumber": block, "offerId": offer_id,
+                    "offerToken": offer_token, "buyerToken": buyer_token, "seller": seller,
+                    "buyer": rng.choice(addresses), "price": price, "amount": bought,
+                })
+            else:
+                new_price = rng.randint(10**6, 10**8)
+                new_amount = rng.randint(10**17, 10**20)
+                raw_events.append({
+                    "topic": "OfferUpdated", "blockNumber": block, "offerId": offer_id,
+                    "oldPrice": price, "oldAmount": amount, "newPrice": new_price, "newAmount": new_amount,
+                })
+                price, amount = new_price, new_amount
+        if rng.random() < 0.2:
+            raw_events.append({"topic": "OfferDeleted", "blockNumber": min(end_block, block + rng.randint(1, 2000)), "offerId": offer_id})
+
+    # events keep their generation order within a block (an offer is created before it is accepted)
+    raw_events.sort(key=lambda e: e["blockNumber"])
+    events: List[Dict[str, Any]] = []
+    log_index = 0
+    previous_block = None
+    for event in raw_events:
+        log_index = log_index + 1 if event["blockNumber"] == previous_block else 0
+        previous_block = event["blockNumber"]
+        transaction_hash = "0x" + hashlib.sha256(f"{event['blockNumber']}-{log_index}".encode()).hexdigest()
+        event.update({
+            "id": f"{transaction_hash}-{log_index}",
+            "transactionHash": transaction_hash,
+            "logIndex": log_index,
+            "timestamp": _block_timestamp(event["blockNumber"]),
+        })
+        events.append({key: str(value) if isinstance(value, int) else value for key, value in event.items()})
+
+    return EventDataset(events, head_block=end_block)
+
+
+def load_dataset(path: str) -> EventDataset:
+    with open(path, "r") as f:
+        content = json.load(f)
+    return EventDataset(content["events"], content.get("head_block"), content.get("contract_address", YAM_V1_ADDRESS))
+
+
+def save_dataset(path: str, events: List[Dict[str, Any]], head_block: int, contract_address: str = YAM_V1_ADDRESS) -> None:
+    with open(path, "w") as f:
+        json.dump({"contract_address": contract_address, "head_block": head_block, "events": events}, f)
@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import bisect
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ._graphql_subset import GraphQLSyntaxError, Selection, parse_query, resolve_value
+from .dataset import COLLECTIONS, EventDataset, event_to_rpc_log
+
+import logging
+logger = logging.getLogger(__name__)
+
+"""
+Local stand-in for the subgraph and the JSON-RPC nodes used by the indexer.
+
+A POST on a path containing '/subgraphs' is answered as a GraphQL query of the subgraph, any other POST
+as a JSON-RPC call. The indexer is pointed at it with, e.g.:
+    YAM_INDEXING_SUBGRAPH_URL=http://127.0.0.1:8545/api/[api-key]/subgraphs/id/mock
+    YAM_INDEXING_W3_URLS=http://127.0.0.1:8545/rpc,http://127.0.0.1:8545/rpc
+
+Subgraph: `_meta`, the four YAM collections with `first`, `skip`, `orderBy`, `orderDirection`, `block`
+and `where` filters (`field`, `field_gt`, `_gte`, `_lt`, `_lte`, `_in`), and aliases.
+JSON-RPC: `eth_blockNumber`, `eth_getLogs`, `eth_chainId`, `net_version`.
+
+Each side has its own FaultInjection (latency, error rate, rate limit), and a GET on /stats returns the
+request counters, so a backfill, the history fill or the live loop can be benchmarked offline.
+"""
+
+MAX_FIRST = 1000  # same limit as TheGraph
+GNOSIS_CHAIN_ID = 100
+
+
+@dataclass
+class FaultInjection:
+    """
+    Faults injected in the responses of one side of the server.
+
+    Attributes:
+        latency_ms: Fixed delay added to each response
+        jitter_ms: Random delay (uniform, up to this value) added to each response
+        error_rate: Probability of answering with an HTTP 502 / 503
+        rate_limit_rps: Requests per second accepted (token bucket), beyond: HTTP 429 (0: no limit)
+        rate_limit_burst: Size of the token bucket
+    """
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rps: float = 0.0
+    rate_limit_burst: int = 10
+    _tokens: float = field(default=0.0, init=False, repr=False)
+    _last_refill: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._tokens = float(self.rate_limit_burst)
+
+    def is_rate_limited(self) -> bool:
+        if self.rate_limit_rps <= 0:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit_burst, self._tokens + (now - self._last_refill) * self.rate_limit_rps)
+            self._last_refill = now
+            if self._tokens < 1:
+                return True
+            self._tokens -= 1
+            return False
+
+    def delay(self) -> None:
+        delay_ms = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+    def is_failing(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+class MockChain:
+    """
+    Head of the mock chain and of the mock subgraph.
+
+    With `block_time` set, the chain head starts at `initial_head` and advances by one block every
+    `block_time` seconds (up to the last block of the dataset) to feed the live loop. The subgraph head
+    lags `subgraph_lag_blocks` behind the chain head.
+    """
+
+    def __init__(self, dataset: EventDataset, initial_head: Optional[int] = None, block_time: float = 0.0, subgraph_lag_blocks: int = 0) -> None:
+        self.dataset = dataset
+        self.initial_head = initial_head if initial_head is not None else dataset.head_block
+        self.block_time = block_time
+        self.subgraph_lag_blocks = subgraph_lag_blocks
+        self._started_at = time.monotonic()
+
+    def head_block(self) -> int:
+        if not self.block_time:
+            return self.initial_head
+        elapsed_blocks = int((time.monotonic() - self._started_at) / self.block_time)
+        return min(self.dataset.head_block, self.initial_head + elapsed_blocks)
+
+    def subgraph_head_block(self) -> int:
+        return self.head_block() - self.subgraph_lag_blocks
+
+
+class QueryError(Exception):
+    """Error returned in the `errors` of a GraphQL response (HTTP 200), as TheGraph does."""
+
+
+_STRING_FIELDS = {"id", "transactionHash", "seller", "buyer", "offerToken", "buyerToken"}
+_OPERATORS = ("_not_in", "_gte", "_lte", "_gt", "_lt", "_not", "_in")
+
+
+def _field_value(entity: Dict[str, Any], field_name: str) -> Any:
+    value = entity.get(field_name)
+    if value is None or field_name in _STRING_FIELDS:
+        return value.lower() if isinstance(value, str) and field_name != "id" else value
+    return int(value)
+
+
+def _coerce(field_name: str, value: Any) -> Any:
+    if isinstance(value, list):
+        return [_coerce(field_name, item) for item in value]
+    if field_name in _STRING_FIELDS:
+        return value.lower() if isinstance(value, str) and field_name != "id" else value
+    return int(value)
+
+
+def _compile_where(where: Dict[str, Any]) -> List[Callable[[Dict[str, Any]], bool]]:
+    comparisons = {
+        "": lambda a, b: a == b, "_not": lambda a, b: a != b,
+        "_gt": lambda a, b: a > b, "_gte": lambda a, b: a >= b,
+        "_lt": lambda a, b: a < b, "_lte": lambda a, b: a <= b,
+        "_in": lambda a, b: a in b, "_not_in": lambda a, b: a not in b,
+    }
+    predicates = []
+    for key, value in where.items():
+        operator = next((op for op in _OPERATORS if key.endswith(op)), "")
+        field_name = key[: len(key) - len(operator)]
+        expected = _coerce(field_name, value)
+        compare = comparisons[operator]
+        predicates.append(lambda entity, f=field_name, e=expected, c=compare: (
+            _field_value(entity, f) is not None and c(_field_value(entity, f), e)
+        ))
+    return predicates
+
+
+def _candidates(dataset: EventDataset, collection: str, order_by: str, where: Dict[str, Any]) -> Tuple[Iterable[Dict[str, Any]], bool]:
+    """
+    Return the entities to filter, and whether they are already in the requested (ascending) order.
+    The block and id cursors of the paginator are served from a bisect on the matching sorted list.
+    """
+    if order_by == "blockNumber":
+        keys = dataset.block_keys[collection]
+        start, end = 0, len(keys)
+        if "blockNumber_gte" in where:
+            start = bisect.bisect_left(keys, int(where["blockNumber_gte"]))
+        elif "blockNumber_gt" in where:
+            start = bisect.bisect_right(keys, int(where["blockNumber_gt"]))
+        if "blockNumber_lte" in where:
+            end = bisect.bisect_right(keys, int(where["blockNumber_lte"]))
+        elif "blockNumber_lt" in where:
+            end = bisect.bisect_left(keys, int(where["blockNumber_lt"]))
+        entities = dataset.by_block[collection]
+        return (entities[i] for i in range(start, max(start, end))), True
+    if order_by == "id":
+        keys = dataset.id_keys[collection]
+        start = 0
+        if "id_gt" in where:
+            start = bisect.bisect_right(keys, where["id_gt"])
+        elif "id_gte" in where:
+            start = bisect.bisect_left(keys, where["id_gte"])
+        entities = dataset.by_id[collection]
+        return (entities[i] for i in range(start, len(entities))), True
+    return dataset.by_block[collection], False
+
+
+def _project(entity: Dict[str, Any], selections: List[Selection]) -> Dict[str, Any]:
+    result = {}
+    for selection in selections:
+        if selection.name == "__typename":
+            result[selection.response_key] = entity["topic"]
+        else:
+            result[selection.response_key] = entity.get(selection.name)
+    return result
+
+
+def _resolve_collection(chain: MockChain, selection: Selection, variables: Dict[str, Any]) -> List[Dict[str, Any]]:
+    arguments = {key: resolve_value(value, variables) for key, value in selection.arguments.items()}
+    first = int(arguments.get("first", 100))
+    skip = int(arguments.get("skip", 0))
+    if first > MAX_FIRST:
+        raise QueryError(f"The `first` argument must be between 0 and {MAX_FIRST}, but is {first}")
+    order_by = arguments.get("orderBy", "id")
+    descending = arguments.get("orderDirection", "asc") == "desc"
+    where = dict(arguments.get("where") or {})
+
+    subgraph_head = chain.subgraph_head_block()
+    block_number = (arguments.get("block") or {}).get("number")
+    if block_number is not None and int(block_number) > subgraph_head:
+        raise QueryError(
+            f"Failed to decode `block.number` value: `subgraph mock has only indexed up to block number {subgraph_head} "
+            f"and data for block number {block_number} is therefore not yet available`"
+        )
+    snapshot_block = int(block_number) if block_number is not None else subgraph_head
+
+    candidates, ordered = _candidates(chain.dataset, selection.name, order_by, where)
+    predicates = _compile_where(where)
+    predicates.append(lambda entity: int(entity["blockNumber"]) <= snapshot_block)
+
+    if ordered and not descending:
+        matches: List[Dict[str, Any]] = []
+        for entity in candidates:
+            if all(predicate(entity) for predicate in predicates):
+                matches.append(entity)
+                if len(matches) >= skip + first:
+                    break
+    else:
+        matches = [entity for entity in candidates if all(predicate(entity) for predicate in predicates)]
+        matches.sort(key=lambda entity: (_field_value(entity, order_by), entity["id"]), reverse=descending)
+
+    return [_project(entity, selection.selections) for entity in matches[skip:skip + first]]
+
+
+def execute_graphql(chain: MockChain, query: str, variables: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Execute a subgraph query against the dataset and return the GraphQL response body.
+    """
+    try:
+        data: Dict[str, Any] = {}
+        for selection in parse_query(query):
+            if selection.name == "_meta":
+                meta = {
+                    "block": {"number": chain.subgraph_head_block(), "hash": None, "timestamp": None},
+                    "hasIndexingErrors": False,
+                    "deployment": "mock",
+                }
+                data[selection.response_key] = {
+                    sub.response_key: (
+                        {s.response_key: meta["block"].get(s.name) for s in sub.selections}
+                        if sub.name == "block" else meta.get(sub.name)
+                    )
+                    for sub in selection.selections
+                }
+            elif selection.name in COLLECTIONS:
+                data[selection.response_key] = _resolve_collection(chain, selection, variables or {})
+            else:
+                raise QueryError(f"Type `Query` has no field `{selection.name}`")
+        return {"data": data}
+    except (QueryError, GraphQLSyntaxError, ValueError, TypeError) as e:
+        return {"errors": [{"message": str(e)}]}
+
+
+def _parse_block_parameter(chain: MockChain, value: Any) -> int:
+    if value in (None, "latest", "safe", "finalized", "pending"):
+        return chain.head_block()
+    if value == "earliest":
+        return 0
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def execute_json_rpc(chain: MockChain, request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answer one JSON-RPC request.
+    """
+    method = request.get("method")
+    params = request.get("params") or []
+    response: Dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+
+    if method == "eth_blockNumber":
+        response["result"] = hex(chain.head_block())
+    elif method == "eth_chainId":
+        response["result"] = hex(GNOSIS_CHAIN_ID)
+    elif method == "net_version":
+        response["result"] = str(GNOSIS_CHAIN_ID)
+    elif method == "eth_getLogs":
+        log_filter = params[0] if params else {}
+        from_block = _parse_block_parameter(chain, log_filter.get("fromBlock"))
+        to_block = min(_parse_block_parameter(chain, log_filter.get("toBlock")), chain.head_block())
+
+        addresses = log_filter.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        if addresses and chain.dataset.contract_address.lower() not in {address.lower() for address in addresses}:
+            response["result"] = []
+            return response
+
+        topic0 = (log_filter.get("topics") or [None])[0]
+        if isinstance(topic0, str):
+            topic0 = [topic0]
+        allowed_topics = {topic.lower() for topic in topic0} if topic0 else None
+
+        logs = []
+        for event in chain.dataset.events_in_block_range(from_block, to_block):
+            log = event_to_rpc_log(event, chain.dataset.contract_address)
+            if allowed_topics is None or log["topics"][0] in allowed_topics:
+                logs.append(log)
+        response["result"] = logs
+    else:
+        response["error"] = {"code": -32601, "message": f"the method {method} does not exist/is not available"}
+    return response
+
+
+class MockServerStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def count(self, side: str, outcome: str) -> None:
+        with self._lock:
+            side_counters = self.counters.setdefault(side, {})
+            side_counters[outcome] = side_counters.get(outcome, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {side: dict(counters) for side, counters in self.counters.items()}
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        chain: MockChain,
+        graphql_faults: Optional[FaultInjection] = None,
+        rpc_faults: Optional[FaultInjection] = None,
+    ) -> None:
+        super().__init__(address, _MockRequestHandler)
+        self.chain = chain
+        self.faults = {"graphql": graphql_faults or FaultInjection(), "rpc": rpc_faults or FaultInjection()}
+        self.stats = MockServerStats()
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    server: MockServer
+    protocol_version = "HTTP/1.1"  # keep-alive, as the pooled sessions of the indexer expect
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stats.snapshot())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        side = "graphql" if "/subgraphs" in self.path else "rpc"
+        faults = self.server.faults[side]
+
+        faults.delay()
+        if faults.is_rate_limited():
+            self.server.stats.count(side, "rate_limited")
+            self._send_json(429, {"error": "Too Many Requests"}, {"Retry-After": "1"})
+            return
+        if faults.is_failing():
+            self.server.stats.count(side, "injected_error")
+            self._send_json(random.choice((502, 503)), {"error": "Bad Gateway"})
+            return
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self.server.stats.count(side, "bad_request")
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+
+        if side == "graphql":
+            response = execute_graphql(self.server.chain, request.get("query", ""), request.get("variables"))
+        elif isinstance(request, list):
+            response = [execute_json_rpc(self.server.chain, item) for item in request]
+        else:
+            response = execute_json_rpc(self.server.chain, request)
+        self.server.stats.count(side, "ok")
+        self._send_json(200, response)
+
+
+def start_mock_server(
+    chain: MockChain,
+    host: str = "127.0.0.1",
+    port: int = 8545,
+    graphql_faults: Optional[FaultInjection] = None,
+    rpc_faults: Optional[FaultInjection] = None,
+) -> MockServer:
+    """
+    Start the mock server on a daemon thread and return it (stop it with `shutdown()`).
+    """
+    server = MockServer((host, port), chain, graphql_faults, rpc_faults)
+    threading.Thread(target=server.serve_forever, name="mock-server", daemon=True).start()
+    logger.info(f"Mock subgraph and JSON-RPC server listening on http://{host}:{server.server_port}")
+    return server
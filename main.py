@@ -2,15 +2,22 @@ import json
 import time
 import logging
 from web3 import Web3
-from the_graphe_handler import backfill_db_block_range
+from the_graphe_handler import backfill_db_block_range, reconcile_db_block_range, fill_indexing_gaps
+from the_graphe_handler.internals import PageCache, set_page_cache
 from db_operations.internal._db_operations import _get_last_indexed_block, _get_pg_connection
-from db_operations import fill_db_history
+from db_operations import fill_db_history, coalesce_indexing_state
+from db_operations.fill_db_history import START_BLOCK
 from event_handlers.get_and_decode_event_yam import get_raw_logs_yam, decode_raw_logs_yam
-from event_handlers import store_event_in_queue
-from db_operations import add_events_to_db
+from event_handlers import prune_event_queue, set_event_queue_subscriptions
+from event_handlers.event_queue_subscriptions import normalize_subscriptions
+from db_operations import add_events_to_db, ensure_offer_events_partitions
+from db_operations.export_archive import export_archive_from_db
+from event_handlers.archive_events import ParquetEventArchive
 from app_logging.logging_config import setup_logging
 from app_logging.send_telegram_alert import send_telegram_alert
 from app_logging import shutdown
+from event_bus import get_event_bus
+from event_bus.exporters import EventQueueExporter, FileExporter, ArchiveExporter
 from config import(
     BLOCK_TO_RETRIEVE,
     COUNT_BEFORE_RESYNC,
@@ -18,7 +25,29 @@ from config import(
     TIME_TO_WAIT_BEFORE_RETRY,        
     MAX_RETRIES_PER_BLOCK_RANGE,
     COUNT_PERIODIC_BACKFILL_THEGRAPH,
-    EXPORT_EVENTS_TO_EVENT_QUEUE
+    PERIODIC_BACKFILL_MODE,
+    PERIODIC_BACKFILL_MAX_REQUEUED_BLOCKS,
+    EVENT_QUEUE_SUBSCRIPTIONS,
+    EVENT_QUEUE_MODE,
+    EVENT_QUEUE_RETENTION_HOURS,
+    COUNT_PERIODIC_EVENT_QUEUE_PRUNE,
+    EVENT_BUS_BUFFER_SIZE,
+    FILE_EXPORT_ENABLED,
+    FILE_EXPORT_PATH,
+    FILE_EXPORT_EVENT_TYPES,
+    FILE_EXPORT_SEGMENT_MAX_EVENTS,
+    FILE_EXPORT_SEGMENT_MAX_AGE_SECONDS,
+    ARCHIVE_ENABLED,
+    ARCHIVE_PATH,
+    ARCHIVE_PARTITION_BLOCKS,
+    ARCHIVE_FLUSH_EVENTS,
+    ARCHIVE_FLUSH_SECONDS,
+    COUNT_PERIODIC_GAP_FILL,
+    GAP_FILL_MAX_BLOCKS_PER_REQUEST,
+    GAP_FILL_MAX_REQUESTS_PER_CYCLE,
+    THEGRAPH_PAGE_CACHE_ENABLED,
+    THEGRAPH_PAGE_CACHE_PATH,
+    THEGRAPH_PAGE_CACHE_MAX_MB
 )
 
 
@@ -59,6 +88,7 @@ def main_indexing():
 
     try:
         conn = _get_pg_connection(*POSTGRES_DATA)
+        coalesce_indexing_state(conn)
         last_block_indexed = _get_last_indexed_block(conn)
     finally:
         conn.close()
@@ -74,15 +104,33 @@ def main_indexing():
         send_telegram_alert(f"Application yam indexing: {msg}")
         raise SystemExit(msg)
 
+    # make sure offer_events can receive the events of the coming blocks
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        ensure_offer_events_partitions(conn, latest_block_number)
+    finally:
+        conn.close()
+
     # backfill DB from the last indexed block in DB to the latest available block in the blockchain
     conn = _get_pg_connection(*POSTGRES_DATA)
-    backfill_db_block_range(conn, subgraph_url, the_graph_api_key, last_block_indexed, latest_block_number)
+    try:
+        indexed_to_block = backfill_db_block_range(conn, subgraph_url, the_graph_api_key, last_block_indexed, latest_block_number)
+        # first block not yet indexed by TheGraph, added to the next periodic backfill
+        requeued_from_block = indexed_to_block + 1 if indexed_to_block < latest_block_number else None
+    except Exception as e:
+        # live indexing does not depend on TheGraph: the range is not recorded in indexing_state, the gap filler retries it
+        conn.close()
+        requeued_from_block = None
+        logger.error(f"Startup backfill failed, blocks {last_block_indexed}-{latest_block_number} left to the gap filler: {e}")
+        send_telegram_alert(f"Application yam indexing: startup backfill from TheGraph failed, live indexing continues ({e})")
 
 
     from_block = latest_block_number - BLOCK_BUFFER - BLOCK_TO_RETRIEVE + 1
     to_block = latest_block_number - BLOCK_BUFFER
     sync_counter = 0
     backfill_thegraph_count = 0
+    gap_fill_count = 0
+    event_queue_prune_count = 0
 
     logger.info("Application has started")
     send_telegram_alert("Application yam indexing has started")
@@ -155,19 +203,7 @@ def main_indexing():
             
             decoded_logs = decode_raw_logs_yam(raw_logs)
 
-            ### export offerAccepted event to event_queue ###
-            if EXPORT_EVENTS_TO_EVENT_QUEUE:
-                if any(log.get("topic") == "OfferAccepted" for log in decoded_logs):
-                    conn = _get_pg_connection(*POSTGRES_DATA)
-                    try:
-                        for log in decoded_logs:
-                            if log.get("topic") == "OfferAccepted": #store in DB
-                                store_event_in_queue(conn, log)
-                    finally:
-                        conn.close()
-
-        
-            ### Add logs to the DB
+            ### Add logs to the DB (the new events are then published to the exporters of the event bus)
             conn = _get_pg_connection(*POSTGRES_DATA)
             add_events_to_db(conn, from_block, to_block, decoded_logs)
             logger.info(f"{len(decoded_logs)} YAM log(s) retrieved from block {from_block} to {to_block}")
@@ -177,6 +213,8 @@ def main_indexing():
         
             sync_counter += 1
             backfill_thegraph_count += 1
+            gap_fill_count += 1
+            event_queue_prune_count += 1
         
             if sync_counter > COUNT_BEFORE_RESYNC:
                 sync_counter = 0
@@ -189,14 +227,69 @@ def main_indexing():
                 if deviation < 0:
                     from_block = latest_block_number - BLOCK_BUFFER - BLOCK_TO_RETRIEVE + 1
                 logger.info(f"resync on newest block - deviation was {deviation} block(s)")
+                get_event_bus().log_metrics()
 
             if backfill_thegraph_count > COUNT_PERIODIC_BACKFILL_THEGRAPH:
                 backfill_thegraph_count = 0
                 # backfill DB from the last indexed block in DB to the latest available block in the blockchain
                 from_block_backfill = to_block - 17280 # 17280 blocks = 1 day
+                if requeued_from_block is not None:
+                    # blocks TheGraph had not indexed yet at the previous backfill, bounded if TheGraph stays behind
+                    if to_block - requeued_from_block > PERIODIC_BACKFILL_MAX_REQUEUED_BLOCKS:
+                        logger.warning(
+                            f"TheGraph still behind: blocks {requeued_from_block}-{to_block - PERIODIC_BACKFILL_MAX_REQUEUED_BLOCKS - 1} "
+                            "dropped from the periodic backfill"
+                        )
+                        requeued_from_block = to_block - PERIODIC_BACKFILL_MAX_REQUEUED_BLOCKS
+                    from_block_backfill = min(from_block_backfill, requeued_from_block)
                 conn = _get_pg_connection(*POSTGRES_DATA)
-                backfill_db_block_range(conn, subgraph_url, the_graph_api_key, from_block_backfill, to_block)
+                try:
+                    if PERIODIC_BACKFILL_MODE == "reconcile":
+                        # only the events missed by the live indexing are written
+                        indexed_to_block = reconcile_db_block_range(conn, subgraph_url, the_graph_api_key, from_block_backfill, to_block)["indexed_to_block"]
+                    else:
+                        indexed_to_block = backfill_db_block_range(conn, subgraph_url, the_graph_api_key, from_block_backfill, to_block)
+                    requeued_from_block = indexed_to_block + 1 if indexed_to_block < to_block else None
+                except Exception as e:
+                    # a TheGraph outage must not stop the live indexing: the window is backfilled again at the next cycle
+                    conn.close()
+                    requeued_from_block = from_block_backfill
+                    logger.error(f"Periodic backfill failed: {e}")
+
+                # pre-create the offer_events partitions of the coming blocks
+                conn = _get_pg_connection(*POSTGRES_DATA)
+                try:
+                    ensure_offer_events_partitions(conn, to_block)
+                finally:
+                    conn.close()
             
+            if gap_fill_count > COUNT_PERIODIC_GAP_FILL:
+                gap_fill_count = 0
+                # backfill the block ranges missing in indexing_state (up to the range the live loop is about to fetch)
+                try:
+                    fill_indexing_gaps(
+                        lambda: _get_pg_connection(*POSTGRES_DATA),
+                        subgraph_url,
+                        the_graph_api_key,
+                        START_BLOCK,
+                        from_block - 1,
+                        GAP_FILL_MAX_BLOCKS_PER_REQUEST,
+                        GAP_FILL_MAX_REQUESTS_PER_CYCLE,
+                    )
+                except Exception as e:
+                    logger.error(f"Gap filling failed: {e}")
+
+            if EVENT_QUEUE_SUBSCRIPTIONS and event_queue_prune_count > COUNT_PERIODIC_EVENT_QUEUE_PRUNE:
+                event_queue_prune_count = 0
+                # delete the events acked by the consumers once the retention period is over
+                conn = _get_pg_connection(*POSTGRES_DATA)
+                try:
+                    prune_event_queue(conn, EVENT_QUEUE_RETENTION_HOURS)
+                except Exception as e:
+                    logger.error(f"Event queue pruning failed: {e}")
+                finally:
+                    conn.close()
+
             # Adjust sleep time accordingly - we don't want to deviate so we take the execution time into account
             execution_time = time.time() - start_time
             time_to_sleep = max(0, BLOCK_TO_RETRIEVE * 5.4 - execution_time) # 5.4 because it seems to go too fast with 5 and it ends up fetching block that doesn't exist yet
@@ -218,6 +311,31 @@ if __name__ == "__main__":
     ### fill complete history if the DB is empty ###
     conn = _get_pg_connection(*POSTGRES_DATA)
     try:
+        # fail fast on an invalid subscription, then enable (or disable) the event queue triggers before anything is inserted
+        normalize_subscriptions(EVENT_QUEUE_SUBSCRIPTIONS)
+        set_event_queue_subscriptions(conn, EVENT_QUEUE_SUBSCRIPTIONS if EVENT_QUEUE_MODE == "trigger" else [])
+
+        ### exporters: run on their own threads, fed with the committed events by the event bus ###
+        get_event_bus().buffer_size = EVENT_BUS_BUFFER_SIZE
+        if EVENT_QUEUE_SUBSCRIPTIONS and EVENT_QUEUE_MODE == "client":
+            get_event_bus().subscribe(EventQueueExporter(lambda: _get_pg_connection(*POSTGRES_DATA), EVENT_QUEUE_SUBSCRIPTIONS))
+        if FILE_EXPORT_ENABLED:
+            get_event_bus().subscribe(FileExporter(
+                FILE_EXPORT_PATH, FILE_EXPORT_EVENT_TYPES, FILE_EXPORT_SEGMENT_MAX_EVENTS, FILE_EXPORT_SEGMENT_MAX_AGE_SECONDS
+            ))
+        if ARCHIVE_ENABLED:
+            # the events not written to the archive when the indexer last stopped (pending, buffered or
+            # dropped by the event bus) are rebuilt from the DB
+            repair_from_block = ParquetEventArchive(ARCHIVE_PATH, ARCHIVE_PARTITION_BLOCKS).get_repair_from_block()
+            if repair_from_block is not None:
+                export_archive_from_db(conn, ARCHIVE_PATH, ARCHIVE_PARTITION_BLOCKS, from_block=repair_from_block)
+            get_event_bus().subscribe(
+                ArchiveExporter(ARCHIVE_PATH, ARCHIVE_PARTITION_BLOCKS, ARCHIVE_FLUSH_EVENTS, ARCHIVE_FLUSH_SECONDS)
+            )
+
+        if THEGRAPH_PAGE_CACHE_ENABLED:
+            set_page_cache(PageCache(THEGRAPH_PAGE_CACHE_PATH, THEGRAPH_PAGE_CACHE_MAX_MB * 2**20))
+
         with conn.cursor() as cursor:
             cursor.execute("SELECT 1 FROM public.indexing_state LIMIT 1")
             if cursor.fetchone() is None:
@@ -241,4 +359,7 @@ if __name__ == "__main__":
         except Exception as e:
             logger.exception(f"Fatal error in main_indexing. Restarting in 5 minutes...\n{e}")
             send_telegram_alert(f"Application yam indexing: Fatal error in main_indexing. Restarting in 5 minutes...\n{e}")
-            time.sleep(300)
\ No newline at end of file
+            time.sleep(300)
+
+    # let the exporters handle the batches already published
+    get_event_bus().stop()
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""
+Database maintenance commands for the YAM indexing module.
+
+Usage:
+    python3 -m maintenance ensure-partitions [--up-to-block N]
+    python3 -m maintenance check-query-plans
+    python3 -m maintenance check-reconcile-status
+    python3 -m maintenance rebuild-trade-rollups
+    python3 -m maintenance backfill-trades
+    python3 -m maintenance rebuild-address-trades
+    python3 -m maintenance prune-event-queue [--retention-hours N]
+    python3 -m maintenance export-archive [--path DIR]
+"""
+import argparse
+import logging
+from web3 import Web3
+from db_operations import ensure_offer_events_partitions, rebuild_trade_rollups, backfill_trades, rebuild_address_trades
+from db_operations.check_query_plans import check_query_plans
+from db_operations.check_offer_status import check_reconcile_offer_status
+from db_operations.export_archive import export_archive_from_db
+from db_operations.internal._db_operations import _get_pg_connection
+from event_handlers import prune_event_queue
+from config import EVENT_QUEUE_RETENTION_HOURS, ARCHIVE_PATH, ARCHIVE_PARTITION_BLOCKS
+from app_logging.logging_config import setup_logging
+
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+POSTGRES_HOST = os.getenv("POSTGRES_HOST")
+POSTGRES_PORT = os.getenv("POSTGRES_PORT")
+POSTGRES_DB   = os.getenv("POSTGRES_DB")
+POSTGRES_WRITER_USER = "yam-indexing-writer"
+POSTGRES_WRITER_USER_PASSWORD = os.getenv("POSTGRES_WRITER_USER_PASSWORD")
+
+POSTGRES_DATA = [POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB, POSTGRES_WRITER_USER, POSTGRES_WRITER_USER_PASSWORD]
+
+logger = logging.getLogger("maintenance")
+
+
+def _get_latest_block_number() -> int:
+    w3_urls = os.environ["YAM_INDEXING_W3_URLS"].split(",")
+    return Web3(Web3.HTTPProvider(w3_urls[0])).eth.block_number
+
+
+def cmd_ensure_partitions(args: argparse.Namespace) -> None:
+    latest_block_number = args.up_to_block if args.up_to_block is not None else _get_latest_block_number()
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        created_count = ensure_offer_events_partitions(conn, latest_block_number)
+    finally:
+        conn.close()
+    print(f"{created_count} offer_events partition(s) created")
+
+
+def cmd_check_query_plans(args: argparse.Namespace) -> None:
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        failures = check_query_plans(conn)
+    finally:
+        conn.close()
+
+    if failures:
+        for failure in failures:
+            print(f"FAILED - {failure}")
+        raise SystemExit(1)
+    print("All query plans use their expected indexes")
+
+
+def cmd_check_reconcile_status(args: argparse.Namespace) -> None:
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        failures = check_reconcile_offer_status(conn)
+    finally:
+        conn.close()
+
+    if failures:
+        for failure in failures:
+            print(f"FAILED - {failure}")
+        raise SystemExit(1)
+    print("The reconciliation leaves the offers with their right status")
+
+
+def cmd_rebuild_trade_rollups(args: argparse.Namespace) -> None:
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        rebuild_trade_rollups(conn)
+    finally:
+        conn.close()
+    print("Trade rollups rebuilt")
+
+
+def cmd_backfill_trades(args: argparse.Namespace) -> None:
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        inserted_count = backfill_trades(conn)
+    finally:
+        conn.close()
+    print(f"{inserted_count} trade(s) inserted")
+
+
+def cmd_rebuild_address_trades(args: argparse.Namespace) -> None:
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        inserted_count = rebuild_address_trades(conn)
+    finally:
+        conn.close()
+    print(f"{inserted_count} address trade(s) inserted")
+
+
+def cmd_prune_event_queue(args: argparse.Namespace) -> None:
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        deleted_count = prune_event_queue(conn, args.retention_hours)
+    finally:
+        conn.close()
+    print(f"{deleted_count} acked event(s) deleted from event_queue")
+
+
+def cmd_export_archive(args: argparse.Namespace) -> None:
+    conn = _get_pg_connection(*POSTGRES_DATA)
+    try:
+        written_count = export_archive_from_db(conn, args.path, ARCHIVE_PARTITION_BLOCKS)
+    finally:
+        conn.close()
+    print(f"{written_count} event(s) written to the archive {args.path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m maintenance", description="YAM indexing database maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ensure_partitions = subparsers.add_parser(
+        "ensure-partitions",
+        help="pre-create the offer_events partitions up to the chain head (plus lookahead)",
+    )
+    ensure_partitions.add_argument("--up-to-block", type=int, default=None, help="use this block instead of the RPC chain head")
+    ensure_partitions.set_defaults(func=cmd_ensure_partitions)
+
+    check_plans = subparsers.add_parser(
+        "check-query-plans",
+        help="check that the readme query examples are still served by their indexes",
+    )
+    check_plans.set_defaults(func=cmd_check_query_plans)
+
+    check_reconcile_status = subparsers.add_parser(
+        "check-reconcile-status",
+        help="check that a reconciliation writing a missed event recomputes the status of its offer",
+    )
+    check_reconcile_status.set_defaults(func=cmd_check_reconcile_status)
+
+    rebuild_rollups = subparsers.add_parser(
+        "rebuild-trade-rollups",
+        help="recompute the hourly and daily trading rollups from offer_events",
+    )
+    rebuild_rollups.set_defaults(func=cmd_rebuild_trade_rollups)
+
+    backfill_trades_parser = subparsers.add_parser(
+        "backfill-trades",
+        help="populate the trades table from the OfferAccepted events of offer_events",
+    )
+    backfill_trades_parser.set_defaults(func=cmd_backfill_trades)
+
+    rebuild_address_trades_parser = subparsers.add_parser(
+        "rebuild-address-trades",
+        help="rebuild the per-address trade ledger from the OfferAccepted events of offer_events",
+    )
+    rebuild_address_trades_parser.set_defaults(func=cmd_rebuild_address_trades)
+
+    prune_event_queue_parser = subparsers.add_parser(
+        "prune-event-queue",
+        help="delete the events of event_queue acked before the retention period",
+    )
+    prune_event_queue_parser.add_argument(
+        "--retention-hours", type=int, default=EVENT_QUEUE_RETENTION_HOURS, help="keep the events acked during the last N hours"
+    )
+    prune_event_queue_parser.set_defaults(func=cmd_prune_event_queue)
+
+    export_archive_parser = subparsers.add_parser(
+        "export-archive",
+        help="rebuild the Parquet event archive from the events stored in the DB",
+    )
+    export_archive_parser.add_argument("--path", default=ARCHIVE_PATH, help="root directory of the archive (default: ARCHIVE_PATH)")
+    export_archive_parser.set_defaults(func=cmd_export_archive)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -1 +1,3 @@
-from .backfill_db_block_range import backfill_db_block_range
\ No newline at end of file
+from .backfill_db_block_range import backfill_db_block_range
+from .reconcile_db_block_range import reconcile_db_block_range
+from .fill_indexing_gaps import fill_indexing_gaps
\ No newline at end of file
@@ -1,72 +1,205 @@
 import logging
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import List, Dict, Any, Optional, Tuple
 from psycopg2.extensions import connection as PGConnection
 from db_operations import add_events_to_db
-from the_graphe_handler.internals import (
-    fetch_offer_accepted_from_block_range,
-    fetch_offer_created_from_block_range, 
-    fetch_offer_updated_from_block_range,
-    fetch_offer_deleted_from_block_range
+from app_logging.send_telegram_alert import send_telegram_alert
+from the_graphe_handler.internals._graphql_paginator import (
+    paginate_entities,
+    paginate_entities_multi,
+    merge_entity_streams,
+    resolve_subgraph_url,
+    fetch_subgraph_status,
+    EntitySpec,
+    OFFER_CREATED,
+    OFFER_ACCEPTED,
+    OFFER_UPDATED,
+    OFFER_DELETED,
 )
 
+logger = logging.getLogger(__name__)
+
+# hasIndexingErrors stays true once a subgraph hit a non-fatal error: it is only reported once per process
+_indexing_errors_reported = False
+
+
+def _fetch_concurrently(
+    subgraph_url: str,
+    the_graph_api_key: str,
+    specs: Tuple[EntitySpec, ...],
+    from_block: int,
+    to_block: int,
+    snapshot_block: int,
+    max_workers: int,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Paginate each spec on its own worker. The first failure cancels the fetches not started yet and is raised.
+    """
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thegraph-backfill")
+    try:
+        futures = [
+            pool.submit(paginate_entities, subgraph_url, the_graph_api_key, spec, from_block, to_block, snapshot_block)
+            for spec in specs
+        ]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is not None:
+                raise future.exception()
+        return [future.result() for future in futures]
+    finally:
+        # on failure, the running fetches are not waited for
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def clamp_block_range_to_subgraph(
+    subgraph_url: str,
+    the_graph_api_key: str,
+    from_block: int,
+    to_block: int,
+) -> Tuple[Optional[int], int]:
+    """
+    Clamp a block range to the blocks TheGraph has actually indexed, with one `_meta` query.
+
+    Returns:
+        The subgraph head to read the range at (None when there is nothing to fetch) and the last block of
+        the range that can be fetched: `to_block` when TheGraph is up to date, the subgraph head when it lags
+        behind, and `from_block - 1` when no block of the range is indexed yet. The blocks after it are left
+        for a later cycle.
+
+    A subgraph reporting indexing errors is still read up to its head (the flag never clears once set): the
+    errors are logged and alerted once.
+    """
+    global _indexing_errors_reported
+    status = fetch_subgraph_status(resolve_subgraph_url(subgraph_url, the_graph_api_key), the_graph_api_key)
+
+    if status.has_indexing_errors and not _indexing_errors_reported:
+        _indexing_errors_reported = True
+        msg = f"TheGraph subgraph reports indexing errors (head {status.block_number}): its data may be incomplete"
+        logger.error(msg)
+        send_telegram_alert(f"Application yam indexing: {msg}")
+
+    indexed_to_block = min(to_block, status.block_number)
+    if indexed_to_block < from_block:
+        logger.info(f"TheGraph has not indexed block {from_block} yet (head {status.block_number}): nothing to fetch")
+        return None, from_block - 1
+    if indexed_to_block < to_block:
+        logger.info(f"TheGraph head is block {status.block_number}: blocks {indexed_to_block + 1}-{to_block} left for a later cycle")
+
+    return status.block_number, indexed_to_block
+
+
+def fetch_block_range_events(
+    subgraph_url: str,
+    the_graph_api_key: str,
+    from_block: int,
+    to_block: int,
+    snapshot_block: int,
+    max_workers: int = 4,
+    multi_entity_max_blocks: int = 100000,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch the YAM events (created, accepted, updated, deleted) of a block range from TheGraph, in chain order.
+
+    All entity types are read at `snapshot_block`. Windows of at most `multi_entity_max_blocks` blocks are
+    fetched with one aliased query per page covering the four entity types; larger ones with one paginated
+    fetch per entity type, run concurrently (see `backfill_db_block_range`). The four lists are then
+    interleaved with a k-way merge on (blockNumber, logIndex).
+
+    Raises:
+        Exception: If any of the fetches fails
+    """
+    specs = (OFFER_CREATED, OFFER_ACCEPTED, OFFER_UPDATED, OFFER_DELETED)
+    if to_block - from_block <= multi_entity_max_blocks:
+        entities_by_topic = paginate_entities_multi(
+            subgraph_url, the_graph_api_key, list(specs), from_block, to_block, snapshot_block,
+        )
+        created_offers, accepted_offers, updated_offers, deleted_offers = (entities_by_topic[spec.topic] for spec in specs)
+    else:
+        created_offers, accepted_offers, updated_offers, deleted_offers = _fetch_concurrently(
+            subgraph_url, the_graph_api_key, specs, from_block, to_block, snapshot_block, max_workers,
+        )
+
+    # Events of the same block share their timestamp: the log index keeps them in the order the status depends on
+    return [
+        event
+        for page in merge_entity_streams([[created_offers], [accepted_offers], [updated_offers], [deleted_offers]])
+        for event in page
+    ]
+
 
 def backfill_db_block_range(
     pg_conn: PGConnection,
     subgraph_url: str, 
     the_graph_api_key: str,
     last_block_indexed: int,
-    latest_block_number: int
-) -> None:
+    latest_block_number: int,
+    max_workers: int = 4,
+    multi_entity_max_blocks: int = 100000,
+) -> int:
     """
     Backfill the database with YAM events from a specified block range.
     
     This function fetches all YAM marketplace events (created, accepted, updated, deleted)
     from TheGraph subgraph within the given block range and adds them to the local database
-    in chronological order based on their timestamps.
+    in chain order (blockNumber, logIndex): each fetch is in chain order and the four lists are
+    interleaved with a k-way merge.
+
+    The subgraph head is checked first: the range is clamped to the blocks TheGraph has indexed, and
+    nothing is fetched when none of them is. Only the fetched part of the range is recorded in
+    indexing_state; the caller backfills the rest later.
+
+    The four entity types are fetched concurrently (at most `max_workers` at a time, over the shared
+    HTTP session) and at the same subgraph block. If any of the fetches fails, the others are cancelled
+    and nothing is written: the block range is not recorded as indexed and will be backfilled again later.
+
+    Windows of at most `multi_entity_max_blocks` blocks (such as the periodic backfill) are usually almost
+    empty: they are fetched with one aliased query per page covering the four entity types instead.
     
     Args:
-        db_path (str): Path to the local database file
+        pg_conn: Existing PostgreSQL connection (closed by this function)
         subgraph_url (str): URL of TheGraph subgraph endpoint
         the_graph_api_key (str): API key for TheGraph authentication
         last_block_indexed (int): The last block number that was previously indexed (inclusive)
         latest_block_number (Optional[int]): The ending block number (inclusive). If None, fetches to latest block
+        max_workers (int): Maximum number of concurrent subgraph fetches
+        multi_entity_max_blocks (int): Largest window fetched with the multi-entity query
         
     Returns:
-        None
+        int: Last block backfilled (`latest_block_number` unless TheGraph lags behind)
         
     Raises:
         Exception: If any of the fetch operations or database operations fail
         
     """
     
-    # Initialize logger for this module
-    logger = logging.getLogger(__name__)
-    
     try:
         # Fetch all offer events from TheGraph subgraph within the specified block range
-        # Each fetch function returns a list of events for that specific event type
+        # Each fetch returns a list of events for that specific event type
         
         print(f"Backfilling DB events from block {last_block_indexed} to block {latest_block_number} from TheGraph...")
-        
-        created_offers: List[Dict[str, Any]] = fetch_offer_created_from_block_range(subgraph_url, the_graph_api_key, last_block_indexed, latest_block_number)
-        accepted_offers: List[Dict[str, Any]] = fetch_offer_accepted_from_block_range(subgraph_url, the_graph_api_key, last_block_indexed, latest_block_number)
-        updated_offers: List[Dict[str, Any]] = fetch_offer_updated_from_block_range(subgraph_url, the_graph_api_key, last_block_indexed, latest_block_number)
-        deleted_offers: List[Dict[str, Any]] = fetch_offer_deleted_from_block_range(subgraph_url, the_graph_api_key, last_block_indexed, latest_block_number)
-        
-        # Combine all event types into a single list
-        all_events = (created_offers + accepted_offers + updated_offers + deleted_offers)
-        
-        # Sort events chronologically by timestamp to maintain proper event ordering
-        # This ensures that events are processed in the correct temporal sequence
-        all_events_sorted = sorted(all_events, key=lambda event: event['timestamp'])
+
+        # all entity types are read at the same subgraph block
+        snapshot_block, indexed_to_block = clamp_block_range_to_subgraph(
+            subgraph_url, the_graph_api_key, last_block_indexed, latest_block_number,
+        )
+        if snapshot_block is None:
+            pg_conn.close()
+            return indexed_to_block
+
+        # Merge the event types into a single list in chain order
+        all_events_sorted = fetch_block_range_events(
+            subgraph_url, the_graph_api_key, last_block_indexed, indexed_to_block, snapshot_block,
+            max_workers, multi_entity_max_blocks,
+        )
         
         # Add all sorted events to the database
-        add_events_to_db(pg_conn, last_block_indexed, latest_block_number, all_events_sorted)
+        add_events_to_db(pg_conn, last_block_indexed, indexed_to_block, all_events_sorted, event_source="backfill")
         
-        logger.info(f"Backfilling successful - {len(all_events_sorted)} YAM events fetched from the graph between block {last_block_indexed} and block {latest_block_number}.")
+        logger.info(f"Backfilling successful - {len(all_events_sorted)} YAM events fetched from the graph between block {last_block_indexed} and block {indexed_to_block}.")
+        return indexed_to_block
         
     except Exception as e:
         logger.error(
             f"Failed to backfill database for block range {last_block_indexed}-{latest_block_number}: {e}"
         )
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,64 @@
+import logging
+from typing import Callable
+from psycopg2.extensions import connection as PGConnection
+from db_operations import get_missing_block_ranges
+from the_graphe_handler.backfill_db_block_range import backfill_db_block_range
+
+logger = logging.getLogger(__name__)
+
+
+def fill_indexing_gaps(
+    get_pg_connection: Callable[[], PGConnection],
+    subgraph_url: str,
+    the_graph_api_key: str,
+    start_block: int,
+    end_block: int,
+    max_blocks_per_request: int,
+    max_requests: int,
+) -> int:
+    """
+    Backfill, with TheGraph, the block ranges between `start_block` and `end_block` that are missing
+    from indexing_state (failed cycles, interrupted backfills, ...).
+
+    Each missing range is split in chunks of at most `max_blocks_per_request` blocks, and at most
+    `max_requests` chunks are backfilled per call, so a large hole is filled over several calls
+    without blocking the caller for too long. A chunk successfully backfilled is recorded in
+    indexing_state and is therefore not missing anymore at the next call.
+
+    Args:
+        get_pg_connection: Function returning a new PostgreSQL connection
+        subgraph_url: URL of TheGraph subgraph endpoint
+        the_graph_api_key: API key for TheGraph authentication
+        start_block: First block of the span to check (creation block of the YAM contract)
+        end_block: Last block of the span to check (inclusive)
+        max_blocks_per_request: Maximum number of blocks backfilled at once
+        max_requests: Maximum number of chunks backfilled by this call
+
+    Returns:
+        Number of chunks backfilled
+    """
+    conn = get_pg_connection()
+    try:
+        missing_ranges = get_missing_block_ranges(conn, start_block, end_block)
+    finally:
+        conn.close()
+
+    if not missing_ranges:
+        return 0
+
+    missing_block_count = sum(to_block - from_block + 1 for from_block, to_block in missing_ranges)
+    logger.info(f"{len(missing_ranges)} missing block range(s) found in indexing_state ({missing_block_count} blocks)")
+
+    backfilled_count = 0
+    for from_block, to_block in missing_ranges:
+        for chunk_from in range(from_block, to_block + 1, max_blocks_per_request):
+            if backfilled_count >= max_requests:
+                return backfilled_count
+            chunk_to = min(chunk_from + max_blocks_per_request - 1, to_block)
+            indexed_to_block = backfill_db_block_range(get_pg_connection(), subgraph_url, the_graph_api_key, chunk_from, chunk_to)
+            backfilled_count += 1
+            if indexed_to_block < chunk_to:
+                # TheGraph has not indexed the next blocks yet: they stay missing until a later call
+                return backfilled_count
+
+    return backfilled_count
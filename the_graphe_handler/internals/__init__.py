@@ -2,7 +2,9 @@ from .fetch_offer_accepted_from_block_range import fetch_offer_accepted_from_blo
 from .fetch_offer_created_from_block_range import fetch_offer_created_from_block_range
 from .fetch_offer_deleted_from_block_range import fetch_offer_deleted_from_block_range
 from .fetch_offer_updated_from_block_range import fetch_offer_updated_from_block_range
-from .fetch_all_offer_accepted import fetch_all_offer_accepted
-from .fetch_all_offer_created import fetch_all_offer_created
-from .fetch_all_offer_deleted import fetch_all_offer_deleted
-from .fetch_all_offer_updated import fetch_all_offer_updated
\ No newline at end of file
+from .fetch_all_offer_accepted import fetch_all_offer_accepted, iter_all_offer_accepted_pages
+from .fetch_all_offer_created import fetch_all_offer_created, iter_all_offer_created_pages
+from .fetch_all_offer_deleted import fetch_all_offer_deleted, iter_all_offer_deleted_pages
+from .fetch_all_offer_updated import fetch_all_offer_updated, iter_all_offer_updated_pages
+from ._graphql_client import TheGraphError, TheGraphUnavailableError, TheGraphRateLimitError, TheGraphRequestError, TheGraphQueryError
+from ._page_cache import PageCache, set_page_cache, get_page_cache
\ No newline at end of file
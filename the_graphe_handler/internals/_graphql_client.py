@@ -0,0 +1,195 @@
+import time
+import random
+import threading
+import requests
+from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+
+import logging
+logger = logging.getLogger(__name__)
+
+"""
+HTTP client of the subgraph requests.
+
+All the requests of the process go through `post_graphql`, which:
+- sends them over one pooled `requests.Session`
+- bounds the number of requests in flight with an AIMD limiter shared by all the threads (additive increase
+  while the gateway answers, multiplicative decrease on a 429 or a gateway error), so the fetchers run as
+  fast as the API key allows without a fixed delay between pages
+- retries the 429, 5xx and network errors with a jittered exponential backoff (honouring `Retry-After`)
+- raises a TheGraphError subclass when a request finally fails, so a failed page is never taken for an
+  empty one
+"""
+
+REQUEST_TIMEOUT = 30  # seconds
+MAX_RETRIES = 6  # retries of a request after a 429, a 5xx or a network error
+BACKOFF_BASE_SECONDS = 0.5  # the n-th retry waits a random time up to BACKOFF_BASE_SECONDS * 2**n
+BACKOFF_MAX_SECONDS = 30
+INITIAL_CONCURRENCY = 4  # requests in flight allowed at start
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16  # also the size of the connection pool
+CONCURRENCY_DECREASE_FACTOR = 0.5
+CONCURRENCY_DECREASE_COOLDOWN_SECONDS = 1.0  # the failures of the requests in flight together only count once
+
+_RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class TheGraphError(Exception):
+    """Base class of the errors of a subgraph request."""
+
+
+class TheGraphUnavailableError(TheGraphError):
+    """The request still failed with a 5xx or a network error after all its retries."""
+
+
+class TheGraphRateLimitError(TheGraphUnavailableError):
+    """The request was still rate limited (HTTP 429) after all its retries."""
+
+
+class TheGraphRequestError(TheGraphError):
+    """The gateway rejected the request (non retryable HTTP status, e.g. 401 for an invalid API key)."""
+
+
+class TheGraphQueryError(TheGraphError):
+    """The response contains GraphQL errors."""
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limit of concurrent requests adjusted with AIMD (additive increase, multiplicative decrease).
+
+    Each successful request raises the limit by 1 / limit (about +1 per limit requests); a throttled request
+    multiplies it by `decrease_factor`, at most once per `decrease_cooldown` seconds.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = INITIAL_CONCURRENCY,
+        min_limit: int = MIN_CONCURRENCY,
+        max_limit: int = MAX_CONCURRENCY,
+        decrease_factor: float = CONCURRENCY_DECREASE_FACTOR,
+        decrease_cooldown: float = CONCURRENCY_DECREASE_COOLDOWN_SECONDS,
+    ) -> None:
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._decrease_factor = decrease_factor
+        self._decrease_cooldown = decrease_cooldown
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: Optional[bool] = None) -> None:
+        """
+        Free a slot. `throttled` is False after a success, True after a 429 / gateway error, None otherwise.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if throttled is False:
+                self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+            elif throttled:
+                now = time.monotonic()
+                if now - self._last_decrease >= self._decrease_cooldown:
+                    self._limit = max(self._min_limit, self._limit * self._decrease_factor)
+                    self._last_decrease = now
+                    logger.info(f"TheGraph throttling: concurrency limit decreased to {int(self._limit)}")
+            self._condition.notify_all()
+
+
+_session: Optional[requests.Session] = None
+_limiter = AdaptiveConcurrencyLimiter()
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Return the HTTP session shared by all the subgraph requests of the process.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENCY)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def get_limiter() -> AdaptiveConcurrencyLimiter:
+    return _limiter
+
+
+def _get_backoff_seconds(attempt: int, response: Optional[requests.Response]) -> float:
+    backoff = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after is not None and retry_after.isdigit():
+        backoff = max(backoff, min(BACKOFF_MAX_SECONDS, int(retry_after)))
+    return backoff
+
+
+def post_graphql(url: str, api_key: str, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Send a GraphQL query to the subgraph and return its `data`.
+
+    Raises:
+        TheGraphRateLimitError: If the request is still rate limited after MAX_RETRIES retries
+        TheGraphUnavailableError: If the request still fails with a 5xx / network error after MAX_RETRIES retries
+        TheGraphRequestError: On a non retryable HTTP status or an invalid request
+        TheGraphQueryError: If the response contains GraphQL errors
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+    payload = {"query": query, "variables": variables or {}}
+
+    for attempt in range(MAX_RETRIES + 1):
+        response: Optional[requests.Response] = None
+        error: Optional[str] = None
+        throttled: Optional[bool] = None
+        _limiter.acquire()
+        try:
+            response = get_session().post(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT)
+            if response.status_code in _RETRYABLE_STATUS_CODES:
+                error = f"HTTP {response.status_code}"
+            throttled = error is not None
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = str(e)
+            throttled = True
+        except requests.exceptions.RequestException as e:
+            raise TheGraphRequestError(f"TheGraph request could not be sent: {e}") from e
+        finally:
+            _limiter.release(throttled)
+
+        if error is None:
+            break
+        if attempt < MAX_RETRIES:
+            backoff = _get_backoff_seconds(attempt, response)
+            logger.debug(f"TheGraph request failed ({error}), retry {attempt + 1}/{MAX_RETRIES} in {backoff:.1f}s")
+            time.sleep(backoff)
+    else:
+        error_class = TheGraphRateLimitError if response is not None and response.status_code == 429 else TheGraphUnavailableError
+        raise error_class(f"TheGraph request failed after {MAX_RETRIES} retries: {error}")
+
+    if response.status_code >= 400:
+        raise TheGraphRequestError(f"TheGraph request rejected: HTTP {response.status_code} {response.text[:200]}")
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise TheGraphUnavailableError(f"Invalid JSON response from TheGraph: {e}") from e
+
+    if "errors" in data:
+        raise TheGraphQueryError(f"GraphQL errors: {data['errors']}")
+    return data.get("data") or {}
@@ -0,0 +1,552 @@
+import heapq
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Iterable
+
+from ._graphql_client import post_graphql, TheGraphQueryError
+from ._page_cache import get_page_cache
+
+import logging
+logger = logging.getLogger(__name__)
+
+"""
+Generic paginator for the YAM subgraph entities.
+
+Every fetcher of this package is a thin wrapper around `paginate_entities` with the EntitySpec of its
+entity. The paginator:
+- sends all its requests through `post_graphql` (see _graphql_client: pooled session, adaptive concurrency,
+  retries and typed errors), without any fixed delay between pages
+- passes all the values as GraphQL variables (the query text only depends on the entity and the filters used)
+- pins every page to the same subgraph block (`_meta.block.number` read once), so events indexed by
+  TheGraph while paging can not shift the cursor or be half included
+- pages in chain order: `orderBy: blockNumber` with a `blockNumber_gte` cursor. The entities of the last
+  block of a full page are held back and fetched again with the next page (the block may be cut), then
+  each page is sorted by (blockNumber, logIndex). `merge_entity_streams` interleaves several such
+  streams in chain order with a k-way merge
+
+`paginate_entities_multi` fetches several entities with one aliased query per page (one cursor per
+alias), which keeps the request count at one for the small windows of the periodic backfill.
+`paginate_entities_sharded` splits the block space of a full-history fetch into shards that are paginated
+concurrently, all at the same snapshot block.
+
+`iter_entity_pages` and `iter_entity_pages_sharded` are the streaming variants: they yield each page as
+it arrives instead of building the complete list, so a consumer can write a page to the DB while the next
+ones are fetched, with a memory use that does not depend on the size of the history.
+
+The page cache (see _page_cache) is only used by the fetches that ask for it (`use_page_cache`), i.e. the
+history fetch of `fill_db_history` at its pinned snapshot block: its pages are read from the cache before
+being requested, so a fetch re-run at the same snapshot block only requests the pages missing from the
+cache. The other fetches (live head, backfill windows) never go through it and can not evict its pages.
+"""
+
+PAGE_SIZE = 1000  # Maximum allowed by The Graph
+SHARDS_PER_WORKER = 4  # events are not evenly spread over the blocks: more shards than workers balance the load
+PREFETCH_PAGES_PER_SHARD = 4  # pages a running shard may fetch ahead of the consumer of a page stream
+YAM_CONTRACT_CREATION_BLOCK = 25530394  # block creation for the yam v1 contract: no entity before it
+
+_COMMON_FIELDS = ("id", "offerId", "transactionHash", "logIndex", "blockNumber", "timestamp")
+
+
+@dataclass(frozen=True)
+class EntitySpec:
+    """
+    Description of a subgraph entity collection.
+
+    Attributes:
+        collection: Name of the collection in the GraphQL schema (e.g. 'offerAccepteds')
+        topic: Event type set in the 'topic' key of each entity returned (e.g. 'OfferAccepted')
+        fields: Fields queried for each entity
+    """
+    collection: str
+    topic: str
+    fields: Tuple[str, ...]
+
+
+OFFER_CREATED = EntitySpec(
+    "offerCreateds", "OfferCreated",
+    _COMMON_FIELDS + ("offerToken", "buyerToken", "seller", "buyer", "price", "amount"),
+)
+OFFER_ACCEPTED = EntitySpec(
+    "offerAccepteds", "OfferAccepted",
+    _COMMON_FIELDS + ("offerToken", "buyerToken", "seller", "buyer", "price", "amount"),
+)
+OFFER_UPDATED = EntitySpec(
+    "offerUpdateds", "OfferUpdated",
+    _COMMON_FIELDS + ("oldPrice", "oldAmount", "newPrice", "newAmount"),
+)
+OFFER_DELETED = EntitySpec(
+    "offerDeleteds", "OfferDeleted",
+    _COMMON_FIELDS,
+)
+
+
+def resolve_subgraph_url(subgraph_url: str, api_key: str) -> str:
+    if "[api-key]" in subgraph_url:
+        return subgraph_url.replace("[api-key]", api_key)
+    raise ValueError(
+        "Invalid subgraph URL format. "
+        "Expected '[api-key]' placeholder in the URL, e.g.:\n"
+        "https://gateway.thegraph.com/api/[api-key]/subgraphs/id/<deployment_id>"
+    )
+
+
+@dataclass(frozen=True)
+class SubgraphStatus:
+    """
+    Indexing status of the subgraph (`_meta`).
+
+    Attributes:
+        block_number: Latest block indexed by the subgraph
+        has_indexing_errors: Whether the subgraph failed to index some block (its data may be incomplete)
+    """
+    block_number: int
+    has_indexing_errors: bool
+
+
+def fetch_subgraph_status(url: str, api_key: str) -> SubgraphStatus:
+    """
+    Return the head block and the indexing status of the subgraph.
+    """
+    data = post_graphql(url, api_key, "query { _meta { block { number } hasIndexingErrors } }")
+    meta = data.get("_meta") or {}
+    block_number = (meta.get("block") or {}).get("number")
+    if block_number is None:
+        raise TheGraphQueryError("Could not read _meta.block.number from subgraph response.")
+    return SubgraphStatus(block_number, bool(meta.get("hasIndexingErrors")))
+
+
+def fetch_snapshot_block(url: str, api_key: str) -> int:
+    """
+    Return the latest block indexed by the subgraph (`_meta.block.number`).
+    """
+    return fetch_subgraph_status(url, api_key).block_number
+
+
+def _fetch_page(
+    subgraph_url: str, url: str, api_key: str, query: str, variables: Dict[str, Any], use_page_cache: bool = False
+) -> Dict[str, Any]:
+    """
+    `post_graphql`, through the page cache if `use_page_cache` is set and a cache is enabled.
+    """
+    page_cache = get_page_cache() if use_page_cache else None
+    if page_cache is None:
+        return post_graphql(url, api_key, query, variables)
+
+    key = page_cache.make_key(subgraph_url, query, variables)
+    data = page_cache.get(key)
+    if data is None:
+        data = post_graphql(url, api_key, query, variables)
+        page_cache.put(key, data)
+    return data
+
+
+def _to_block_variables(to_block: Optional[int]) -> Tuple[List[str], List[str], Dict[str, Any]]:
+    if to_block is None:
+        return [], [], {}
+    return ["$toBlock: BigInt!"], ["blockNumber_lte: $toBlock"], {"toBlock": str(to_block)}
+
+
+def _build_collection_selection(spec: EntitySpec, alias: str, cursor_variable: str, range_where: List[str]) -> str:
+    where = [f"blockNumber_gte: ${cursor_variable}"] + range_where
+    fields = "\n        ".join(spec.fields)
+    return f"""
+      {alias}: {spec.collection}(
+        first: $first,
+        where: {{ {", ".join(where)} }},
+        orderBy: blockNumber,
+        orderDirection: asc,
+        block: {{ number: $block }}
+      ) {{
+        {fields}
+      }}"""
+
+
+def _build_page_query(spec: EntitySpec, to_block: Optional[int]) -> str:
+    range_definitions, range_where, _ = _to_block_variables(to_block)
+    variable_definitions = ["$first: Int!", "$cursorBlock: BigInt!", "$block: Int!"] + range_definitions
+    return f"""
+    query Get{spec.topic}({", ".join(variable_definitions)}) {{{_build_collection_selection(spec, spec.collection, "cursorBlock", range_where)}
+    }}
+    """
+
+
+def _build_multi_page_query(specs: List[EntitySpec], to_block: Optional[int]) -> str:
+    range_definitions, range_where, _ = _to_block_variables(to_block)
+    variable_definitions = ["$first: Int!", "$block: Int!"] + [f"$cursorBlock_{spec.collection}: BigInt!" for spec in specs]
+    variable_definitions += range_definitions
+    selections = "".join(
+        _build_collection_selection(spec, spec.collection, f"cursorBlock_{spec.collection}", range_where) for spec in specs
+    )
+    return f"""
+    query GetEntities({", ".join(variable_definitions)}) {{{selections}
+    }}
+    """
+
+
+def chain_order_key(entity: Dict[str, Any]) -> Tuple[int, int]:
+    return int(entity["blockNumber"]), int(entity["logIndex"])
+
+
+def _split_complete_blocks(entities: List[Dict[str, Any]], spec: EntitySpec) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Split a page ordered by blockNumber into its complete blocks (sorted in chain order) and the cursor of the
+    next page: None when the page is not full (last page), else the last block of the page, which may be cut
+    and is fetched again entirely with the next page.
+
+    Raises:
+        ValueError: If a full page only holds one block (the cursor could not move forward)
+    """
+    for entity in entities:
+        entity["topic"] = spec.topic
+
+    if len(entities) < PAGE_SIZE:
+        return sorted(entities, key=chain_order_key), None
+
+    last_block = int(entities[-1]["blockNumber"])
+    complete = [entity for entity in entities if int(entity["blockNumber"]) < last_block]
+    if not complete:
+        raise ValueError(f"More than {PAGE_SIZE} {spec.collection} in block {last_block}: can not paginate by block")
+    return sorted(complete, key=chain_order_key), last_block
+
+
+def iter_entity_pages(
+    subgraph_url: str,
+    api_key: str,
+    spec: EntitySpec,
+    from_block: Optional[int] = None,
+    to_block: Optional[int] = None,
+    snapshot_block: Optional[int] = None,
+    use_page_cache: bool = False,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield the entities of `spec`, optionally restricted to a block range, one page at a time in chain order.
+
+    Args:
+        subgraph_url: Subgraph endpoint URL with the '[api-key]' placeholder
+        api_key: The Graph API key
+        spec: Entity to fetch
+        from_block: First block (inclusive), None for no lower bound
+        to_block: Last block (inclusive), None for no upper bound
+        snapshot_block: Subgraph block all pages are read at (default: the current `_meta` block)
+        use_page_cache: Read and store the pages in the page cache, if one is set (pinned `snapshot_block` only)
+
+    Yields:
+        Non-empty pages of entities in (blockNumber, logIndex) order, each entity with a 'topic' key set to `spec.topic`
+
+    Raises:
+        TheGraphError: If a request fails (see _graphql_client.post_graphql)
+        ValueError: On an invalid subgraph URL or a block holding more than PAGE_SIZE entities
+    """
+    url = resolve_subgraph_url(subgraph_url, api_key)
+    if snapshot_block is None:
+        snapshot_block = fetch_snapshot_block(url, api_key)
+
+    query = _build_page_query(spec, to_block)
+    variables: Dict[str, Any] = {"first": PAGE_SIZE, "cursorBlock": str(from_block or 0), "block": snapshot_block}
+    variables.update(_to_block_variables(to_block)[2])
+
+    while True:
+        entities, next_cursor_block = _split_complete_blocks(
+            _fetch_page(subgraph_url, url, api_key, query, variables, use_page_cache).get(spec.collection, []), spec
+        )
+        if entities:
+            yield entities
+
+        # If we got fewer entities than the page size, we've reached the end
+        if next_cursor_block is None:
+            return
+        variables["cursorBlock"] = str(next_cursor_block)
+
+
+def paginate_entities(
+    subgraph_url: str,
+    api_key: str,
+    spec: EntitySpec,
+    from_block: Optional[int] = None,
+    to_block: Optional[int] = None,
+    snapshot_block: Optional[int] = None,
+    show_progress: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch all the entities of `spec`, optionally restricted to a block range, in chain order.
+
+    Args:
+        subgraph_url: Subgraph endpoint URL with the '[api-key]' placeholder
+        api_key: The Graph API key
+        spec: Entity to fetch
+        from_block: First block (inclusive), None for no lower bound
+        to_block: Last block (inclusive), None for no upper bound
+        snapshot_block: Subgraph block all pages are read at (default: the current `_meta` block)
+        show_progress: Print the number of entities fetched so far
+
+    Returns:
+        List of entities, each with a 'topic' key set to `spec.topic`
+
+    Raises:
+        TheGraphError: If a request fails (see _graphql_client.post_graphql)
+        ValueError: On an invalid subgraph URL
+    """
+    all_entities: List[Dict[str, Any]] = []
+    for entities in iter_entity_pages(subgraph_url, api_key, spec, from_block, to_block, snapshot_block):
+        all_entities.extend(entities)
+        if show_progress:
+            print(f"\rFetched {len(all_entities)} events {spec.topic[0].lower() + spec.topic[1:]} from TheGraph...", end="", flush=True)
+
+    if show_progress:
+        print()
+
+    return all_entities
+
+
+def paginate_entities_multi(
+    subgraph_url: str,
+    api_key: str,
+    specs: List[EntitySpec],
+    from_block: Optional[int] = None,
+    to_block: Optional[int] = None,
+    snapshot_block: Optional[int] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch all the entities of several specs with one aliased GraphQL query per page.
+
+    Each collection is queried under its own alias with its own block cursor. After the first page,
+    only the aliases that returned a full page are queried again, so a window where every collection
+    holds less than PAGE_SIZE entities costs a single request.
+
+    Args:
+        subgraph_url: Subgraph endpoint URL with the '[api-key]' placeholder
+        api_key: The Graph API key
+        specs: Entities to fetch (each collection at most once)
+        from_block: First block (inclusive), None for no lower bound
+        to_block: Last block (inclusive), None for no upper bound
+        snapshot_block: Subgraph block all pages are read at (default: the current `_meta` block)
+
+    Returns:
+        Dict of the entities of each spec in chain order, keyed by `spec.topic`; each entity has its 'topic' key set
+
+    Raises:
+        TheGraphError: If a request fails (see _graphql_client.post_graphql)
+        ValueError: On an invalid subgraph URL
+    """
+    url = resolve_subgraph_url(subgraph_url, api_key)
+    if snapshot_block is None:
+        snapshot_block = fetch_snapshot_block(url, api_key)
+
+    cursor_blocks: Dict[str, int] = {spec.collection: from_block or 0 for spec in specs}
+    results: Dict[str, List[Dict[str, Any]]] = {spec.topic: [] for spec in specs}
+    pending_specs = list(specs)
+
+    while pending_specs:
+        query = _build_multi_page_query(pending_specs, to_block)
+        variables: Dict[str, Any] = {"first": PAGE_SIZE, "block": snapshot_block}
+        variables.update(_to_block_variables(to_block)[2])
+        for spec in pending_specs:
+            variables[f"cursorBlock_{spec.collection}"] = str(cursor_blocks[spec.collection])
+
+        data = _fetch_page(subgraph_url, url, api_key, query, variables)
+
+        # Only the aliases that filled their page may have more entities
+        full_specs: List[EntitySpec] = []
+        for spec in pending_specs:
+            entities, next_cursor_block = _split_complete_blocks(data.get(spec.collection) or [], spec)
+            results[spec.topic].extend(entities)
+            if next_cursor_block is not None:
+                cursor_blocks[spec.collection] = next_cursor_block
+                full_specs.append(spec)
+        pending_specs = full_specs
+
+    return results
+
+
+def _split_block_range(start_block: int, end_block: int, shard_count: int) -> List[Tuple[int, int]]:
+    """
+    Split [start_block, end_block] (inclusive) into at most `shard_count` contiguous shards of equal width.
+    """
+    width = max(1, -(-(end_block - start_block + 1) // shard_count))
+    return [
+        (shard_start, min(shard_start + width - 1, end_block))
+        for shard_start in range(start_block, end_block + 1, width)
+    ]
+
+
+def paginate_entities_sharded(
+    subgraph_url: str,
+    api_key: str,
+    spec: EntitySpec,
+    start_block: int = YAM_CONTRACT_CREATION_BLOCK,
+    snapshot_block: Optional[int] = None,
+    parallelism: int = 4,
+    show_progress: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch all the entities of `spec` from `start_block` to the snapshot block, sharding the block space.
+
+    The block range is split into `parallelism * SHARDS_PER_WORKER` shards, each paginated in chain order by
+    `paginate_entities` with the same snapshot block, on `parallelism` workers. The shards are concatenated in
+    block order, so the result is in chain order whatever the order the shards complete.
+
+    Args:
+        subgraph_url: Subgraph endpoint URL with the '[api-key]' placeholder
+        api_key: The Graph API key
+        spec: Entity to fetch
+        start_block: First block of the block space (no entity is expected before it)
+        snapshot_block: Subgraph block all pages are read at and last block fetched (default: the current `_meta` block)
+        parallelism: Number of shards paginated concurrently
+        show_progress: Print the number of entities and shards fetched so far
+
+    Returns:
+        List of entities, each with a 'topic' key set to `spec.topic`
+
+    Raises:
+        TheGraphError: If a request fails (see _graphql_client.post_graphql)
+        ValueError: On an invalid subgraph URL
+    """
+    url = resolve_subgraph_url(subgraph_url, api_key)
+    if snapshot_block is None:
+        snapshot_block = fetch_snapshot_block(url, api_key)
+
+    parallelism = max(1, parallelism)
+    shards = _split_block_range(start_block, snapshot_block, parallelism * SHARDS_PER_WORKER)
+    shard_results: List[List[Dict[str, Any]]] = [[] for _ in shards]
+    fetched_count = 0
+
+    pool = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix=f"thegraph-{spec.collection}")
+    try:
+        futures = {
+            pool.submit(
+                paginate_entities, subgraph_url, api_key, spec, shard_start, shard_end, snapshot_block,
+            ): shard_index
+            for shard_index, (shard_start, shard_end) in enumerate(shards)
+        }
+        for completed_count, future in enumerate(as_completed(futures), start=1):
+            shard_results[futures[future]] = future.result()
+            fetched_count += len(shard_results[futures[future]])
+            if show_progress:
+                print(
+                    f"\rFetched {fetched_count} events {spec.topic[0].lower() + spec.topic[1:]} from TheGraph "
+                    f"({completed_count}/{len(shards)} block shards)...",
+                    end="", flush=True,
+                )
+    finally:
+        # on failure, the shards not started yet are cancelled and the running ones are not waited for
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if show_progress:
+        print()
+
+    return [entity for shard_entities in shard_results for entity in shard_entities]
+
+
+_SHARD_DONE = object()
+
+
+def iter_entity_pages_sharded(
+    subgraph_url: str,
+    api_key: str,
+    spec: EntitySpec,
+    start_block: int = YAM_CONTRACT_CREATION_BLOCK,
+    snapshot_block: Optional[int] = None,
+    parallelism: int = 4,
+    use_page_cache: bool = False,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Streaming variant of `paginate_entities_sharded`: yield the pages of the shards in block order.
+
+    Up to `parallelism` shards are paginated concurrently, each fetching at most PREFETCH_PAGES_PER_SHARD
+    pages ahead of the consumer, so the memory used is bounded whatever the size of the history.
+    Shards are started in block order and consumed in the same order, so the shard being read is always
+    running or done. Closing the generator stops the running shards after their current page.
+
+    Args:
+        subgraph_url: Subgraph endpoint URL with the '[api-key]' placeholder
+        api_key: The Graph API key
+        spec: Entity to fetch
+        start_block: First block of the block space (no entity is expected before it)
+        snapshot_block: Subgraph block all pages are read at and last block fetched (default: the current `_meta` block)
+        parallelism: Number of shards paginated concurrently
+        use_page_cache: Read and store the pages in the page cache, if one is set (pinned `snapshot_block` only)
+
+    Yields:
+        Non-empty pages of entities in (blockNumber, logIndex) order, each entity with a 'topic' key set to `spec.topic`
+
+    Raises:
+        TheGraphError: If a request fails (see _graphql_client.post_graphql)
+        ValueError: On an invalid subgraph URL or a block holding more than PAGE_SIZE entities
+    """
+    url = resolve_subgraph_url(subgraph_url, api_key)
+    if snapshot_block is None:
+        snapshot_block = fetch_snapshot_block(url, api_key)
+
+    parallelism = max(1, parallelism)
+    shards = _split_block_range(start_block, snapshot_block, parallelism * SHARDS_PER_WORKER)
+    shard_queues: List["queue.Queue[Any]"] = [queue.Queue(maxsize=PREFETCH_PAGES_PER_SHARD) for _ in shards]
+    stop_event = threading.Event()
+
+    def put(shard_queue: "queue.Queue[Any]", item: Any) -> bool:
+        while not stop_event.is_set():
+            try:
+                shard_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch_shard(shard_index: int) -> None:
+        shard_start, shard_end = shards[shard_index]
+        shard_queue = shard_queues[shard_index]
+        try:
+            for entities in iter_entity_pages(subgraph_url, api_key, spec, shard_start, shard_end, snapshot_block, use_page_cache):
+                if not put(shard_queue, entities):
+                    return
+        except Exception as e:
+            put(shard_queue, e)
+            return
+        put(shard_queue, _SHARD_DONE)
+
+    pool = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix=f"thegraph-{spec.collection}")
+    try:
+        for shard_index in range(len(shards)):
+            pool.submit(fetch_shard, shard_index)
+
+        for shard_queue in shard_queues:
+            while True:
+                item = shard_queue.get()
+                if item is _SHARD_DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        stop_event.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def merge_entity_streams(page_streams: List[Iterable[List[Dict[str, Any]]]], page_size: int = PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Interleave page streams that are each in chain order into one stream of pages in chain order.
+
+    The streams (e.g. one per entity type) are merged with `heapq.merge` on (blockNumber, logIndex): the
+    events of one block come out in log order, which the DB handlers rely on to compute the offer status,
+    and only the current page of each stream is held in memory.
+
+    Args:
+        page_streams: Streams of pages in (blockNumber, logIndex) order (a list of lists is a valid stream)
+        page_size: Number of events per page yielded
+
+    Yields:
+        Non-empty pages of events in (blockNumber, logIndex) order
+    """
+    events = (
+        (event for page in page_stream for event in page)
+        for page_stream in page_streams
+    )
+    page: List[Dict[str, Any]] = []
+    for event in heapq.merge(*events, key=chain_order_key):
+        page.append(event)
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
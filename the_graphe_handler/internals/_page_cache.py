@@ -0,0 +1,203 @@
+import os
+import gzip
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+"""
+Optional on-disk cache of the subgraph pages of the history fill.
+
+Only the fetches that request it (`use_page_cache`, see _graphql_paginator) go through the cache: the
+history fetch of `fill_db_history` at its pinned snapshot block. The live-head and backfill fetches bypass
+it, so their pages can not evict the history pages a resumed run needs.
+
+A page is stored under the hash of its request: the subgraph URL (with its '[api-key]' placeholder, so the
+key is never written to disk), the query text (entity, fields and filters) and the variables (cursor,
+range and snapshot block). Every page of the paginator is read at a pinned snapshot block, so a cached
+page never goes stale: re-running a fetch at the same snapshot block replays the pages already stored and
+only requests the missing ones.
+
+The cache is bounded in size: when it grows beyond `max_bytes`, the least recently used pages are deleted.
+The snapshot block of a long fetch can be pinned by name (`pin_snapshot_block`), so a run interrupted by a
+crash is resumed at the same snapshot block, and hits the cache, instead of starting again at a new one.
+"""
+
+_PAGE_SUFFIX = ".json.gz"
+_PINS_FILE = "pins.json"
+
+
+class PageCache:
+    """
+    Content-addressed, size-bounded store of subgraph responses in `directory`.
+
+    Pages are gzipped JSON files named after the SHA-256 of their request, spread over 256 subdirectories.
+    Files are written atomically (temporary file + rename), so concurrent fetch threads and a crash while
+    writing never leave a partial page. A page that can not be read is treated as missing.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, least recently used first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        self._evict()  # max_bytes may have been lowered since the last run
+
+    def _load_index(self) -> None:
+        pages = []
+        for subdirectory in os.scandir(self.directory):
+            if not subdirectory.is_dir():
+                continue
+            for entry in os.scandir(subdirectory.path):
+                if entry.name.endswith(_PAGE_SUFFIX):
+                    stat = entry.stat()
+                    pages.append((stat.st_mtime, entry.name[: -len(_PAGE_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(pages):
+            self._sizes[key] = size
+            self._total_bytes += size
+        logger.info(f"TheGraph page cache {self.directory}: {len(self._sizes)} pages, {self._total_bytes / 2**20:.1f} MB")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + _PAGE_SUFFIX)
+
+    @staticmethod
+    def make_key(subgraph_url: str, query: str, variables: Dict[str, Any]) -> str:
+        request = json.dumps({"url": subgraph_url, "query": " ".join(query.split()), "variables": variables}, sort_keys=True)
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached response of a request, or None if it is not cached.
+        """
+        with self._lock:
+            if key not in self._sizes:
+                self.misses += 1
+                return None
+            self._sizes.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt") as f:
+                data = json.load(f)
+            os.utime(path)  # recency survives a restart
+        except FileNotFoundError:
+            # evicted by another thread since the index lookup
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable TheGraph page cache file {path}, fetching the page again: {e}")
+            self._discard(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: Dict[str, Any]) -> None:
+        """
+        Store the response of a request, then evict the least recently used pages beyond `max_bytes`.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, gzip.GzipFile(fileobj=f, mode="wb", compresslevel=1) as gz:
+                gz.write(json.dumps(data, separators=(",", ":")).encode())
+            os.replace(temporary_path, path)
+        except OSError as e:
+            # the cache is an optimization: a failed write only costs a fetch on the next run
+            logger.warning(f"Could not write TheGraph page cache file {path}: {e}")
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            return
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes += size - self._sizes.pop(key, 0)
+            self._sizes[key] = size
+        self._evict()
+
+    def _evict(self) -> None:
+        # the most recent page is kept even if it is larger than max_bytes
+        evicted = []
+        with self._lock:
+            while self._total_bytes > self.max_bytes and len(self._sizes) > 1:
+                evicted_key, evicted_size = self._sizes.popitem(last=False)
+                self._total_bytes -= evicted_size
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            self._remove_file(evicted_key)
+
+    def _discard(self, key: str) -> None:
+        with self._lock:
+            self._total_bytes -= self._sizes.pop(key, 0)
+        self._remove_file(key)
+
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _read_pins(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self.directory, _PINS_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_pins(self, pins: Dict[str, int]) -> None:
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(pins, f)
+        os.replace(temporary_path, os.path.join(self.directory, _PINS_FILE))
+
+    def pin_snapshot_block(self, name: str, snapshot_block: int) -> int:
+        """
+        Return the snapshot block pinned under `name` by a previous, unfinished run, or pin `snapshot_block`.
+        """
+        with self._lock:
+            pins = self._read_pins()
+            if name in pins:
+                logger.info(f"Resuming '{name}' at the snapshot block {pins[name]} of the previous run")
+                return pins[name]
+            pins[name] = snapshot_block
+            self._write_pins(pins)
+            return snapshot_block
+
+    def unpin_snapshot_block(self, name: str) -> None:
+        """
+        Forget the snapshot block pinned under `name` (the run completed).
+        """
+        with self._lock:
+            pins = self._read_pins()
+            if pins.pop(name, None) is not None:
+                self._write_pins(pins)
+
+
+_page_cache: Optional[PageCache] = None
+
+
+def set_page_cache(page_cache: Optional[PageCache]) -> None:
+    """
+    Enable (or disable, with None) the page cache used by the subgraph fetches requesting it (`use_page_cache`).
+    """
+    global _page_cache
+    _page_cache = page_cache
+
+
+def get_page_cache() -> Optional[PageCache]:
+    return _page_cache
@@ -1,100 +1,23 @@
-import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 
+from ._graphql_paginator import paginate_entities_sharded, iter_entity_pages_sharded, OFFER_UPDATED, YAM_CONTRACT_CREATION_BLOCK
 
-def fetch_all_offer_updated(api_key: str, url: str) -> List[Dict[str, Any]]:
+
+def fetch_all_offer_updated(api_key: str, url: str, start_block: int = YAM_CONTRACT_CREATION_BLOCK, parallelism: int = 4, snapshot_block: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Fetch all offerUpdated entities from The Graph subgraph with deterministic pagination.
 
-    Approach:
-    - Freeze a snapshot using _meta.block.number so results don't change during pagination.
-    - Keep cursor-based pagination on `id` (same args / same return shape as your current function).
-
-    Note:
-    - This does NOT make results "chronological"; it only guarantees you won't miss/duplicate items
-      because new events arrived while you were paging.
+    All pages are read at the same subgraph block (`snapshot_block`, default _meta.block.number), so events
+    indexed by TheGraph while paging are neither missed nor duplicated. Results are in chain order (blockNumber, logIndex).
+    The blocks from `start_block` are split into shards paginated by `parallelism` concurrent workers.
     """
+    return paginate_entities_sharded(url, api_key, OFFER_UPDATED, start_block, snapshot_block, parallelism=parallelism, show_progress=True)
 
-    if "[api-key]" in url:
-        url = url.replace("[api-key]", api_key)
-    else:
-        raise ValueError(
-            "Invalid subgraph URL format. "
-            "Expected '[api-key]' placeholder in the URL, e.g.:\n"
-            "https://gateway.thegraph.com/api/[api-key]/subgraphs/id/<deployment_id>"
-        )
 
-    headers = {"Content-Type": "application/json"}
 
-    # Freeze snapshot block
-    meta_query = """
-    query {
-      _meta { block { number } }
-    }
+def iter_all_offer_updated_pages(api_key: str, url: str, start_block: int = YAM_CONTRACT_CREATION_BLOCK, parallelism: int = 4, snapshot_block: Optional[int] = None, use_page_cache: bool = False) -> Iterator[List[Dict[str, Any]]]:
     """
-    response = requests.post(url, headers=headers, json={"query": meta_query}, timeout=30)
-    response.raise_for_status()
-    meta = response.json()
-    if "errors" in meta:
-        raise ValueError(f"GraphQL errors: {meta['errors']}")
-    snapshot_block = meta.get("data", {}).get("_meta", {}).get("block", {}).get("number")
-    if snapshot_block is None:
-        raise ValueError("Could not read _meta.block.number from subgraph response.")
-
-    all_offers: List[Dict[str, Any]] = []
-    batch_size = 1000
-    last_id = ""
-
-    query_template = """
-    query GetOfferUpdated($first: Int!, $lastId: String!, $block: Int!) {
-      offerUpdateds(
-        first: $first,
-        where: { id_gt: $lastId },
-        orderBy: id,
-        orderDirection: asc,
-        block: { number: $block }
-      ) {
-        id
-        offerId
-        oldPrice
-        oldAmount
-        newPrice
-        newAmount
-        transactionHash
-        logIndex
-        blockNumber
-        timestamp
-      }
-    }
+    Streaming variant of `fetch_all_offer_updated`: yield the offerUpdated entities page by page, in shard order,
+    while the next pages are fetched in the background.
     """
-
-    while True:
-        payload = {
-            "query": query_template,
-            "variables": {"first": batch_size, "lastId": last_id, "block": snapshot_block},
-        }
-
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        if "errors" in data:
-            raise ValueError(f"GraphQL errors: {data['errors']}")
-
-        offers_batch = data.get("data", {}).get("offerUpdateds", [])
-        if not offers_batch:
-            break
-
-        all_offers.extend(offers_batch)
-        print(f"\rFetched {len(all_offers)} events offerUpdated from TheGraph...", end="", flush=True)
-
-        last_id = offers_batch[-1]["id"]
-
-        if len(offers_batch) < batch_size:
-            break
-
-    for offer in all_offers:
-        offer["topic"] = "OfferUpdated"
-
-    print()
-    return all_offers
+    return iter_entity_pages_sharded(url, api_key, OFFER_UPDATED, start_block, snapshot_block, parallelism=parallelism, use_page_cache=use_page_cache)
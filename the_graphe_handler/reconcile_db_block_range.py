@@ -0,0 +1,98 @@
+import logging
+from collections import Counter
+from typing import Dict, List, Any
+from psycopg2.extensions import connection as PGConnection
+from db_operations import add_events_to_db, get_event_keys
+from the_graphe_handler.backfill_db_block_range import fetch_block_range_events, clamp_block_range_to_subgraph
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_db_block_range(
+    pg_conn: PGConnection,
+    subgraph_url: str,
+    the_graph_api_key: str,
+    from_block: int,
+    to_block: int,
+    max_workers: int = 4,
+    multi_entity_max_blocks: int = 100000,
+) -> Dict[str, int]:
+    """
+    Reconcile the DB with TheGraph over a block range, writing only the events missing from the DB.
+
+    The events of the range are fetched from TheGraph (as by `backfill_db_block_range`) and the keys
+    (block_number, log_index) of the events already stored are read with a single query. Only the
+    TheGraph events whose key is not in the DB go through `add_events_to_db`, so the events indexed by
+    the live loop do not cost a round trip each. As the missing events are not replayed with the other
+    events of their offers, the status of these offers is then recomputed from all their stored events.
+
+    As for a backfill, the range is first clamped to the blocks TheGraph has indexed (nothing is fetched
+    when none of them is), so a subgraph lagging behind the chain is not reported as missing the most
+    recent events; the blocks after 'indexed_to_block' are left for a later cycle.
+
+    Args:
+        pg_conn: Existing PostgreSQL connection (closed by this function)
+        subgraph_url: URL of TheGraph subgraph endpoint
+        the_graph_api_key: API key for TheGraph authentication
+        from_block: First block of the range (inclusive)
+        to_block: Last block of the range (inclusive)
+        max_workers: Maximum number of concurrent subgraph fetches
+        multi_entity_max_blocks: Largest window fetched with the multi-entity query
+
+    Returns:
+        Dict with the number of events fetched from TheGraph ('thegraph_events'), stored in the DB
+        ('db_events'), missed by the live indexing and written ('missing_in_db') and present in the DB
+        but missed by TheGraph ('missing_in_thegraph'), and the last block reconciled ('indexed_to_block')
+
+    Raises:
+        Exception: If the fetch or the database operations fail
+    """
+    try:
+        snapshot_block, indexed_to_block = clamp_block_range_to_subgraph(subgraph_url, the_graph_api_key, from_block, to_block)
+        if snapshot_block is None:
+            pg_conn.close()
+            return {
+                "thegraph_events": 0, "db_events": 0, "missing_in_db": 0, "missing_in_thegraph": 0,
+                "indexed_to_block": indexed_to_block,
+            }
+
+        thegraph_events = fetch_block_range_events(
+            subgraph_url, the_graph_api_key, from_block, indexed_to_block, snapshot_block, max_workers, multi_entity_max_blocks,
+        )
+        # events with the wrong TheGraph log index (-1 as uint32) are never stored: they are left out of the diff
+        thegraph_events = [event for event in thegraph_events if int(event["logIndex"]) < 2**31]
+
+        db_event_keys = get_event_keys(pg_conn, from_block, indexed_to_block)
+        thegraph_event_keys = {(int(event["blockNumber"]), int(event["logIndex"])) for event in thegraph_events}
+
+        missing_events: List[Dict[str, Any]] = [
+            event for event in thegraph_events
+            if (int(event["blockNumber"]), int(event["logIndex"])) not in db_event_keys
+        ]
+        missing_in_thegraph = len(db_event_keys - thegraph_event_keys)
+
+        # also records the range in indexing_state, like a backfill. The missing events are inserted after
+        # later events of their offers (e.g. a missed OfferUpdated before a stored fill that sold the offer
+        # out), so the status of these offers is recomputed from all their events
+        add_events_to_db(
+            pg_conn, from_block, indexed_to_block, missing_events, event_source="backfill", refresh_offer_status=True,
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to reconcile database for block range {from_block}-{to_block}: {e}")
+        raise
+
+    report = {
+        "thegraph_events": len(thegraph_events),
+        "db_events": len(db_event_keys),
+        "missing_in_db": len(missing_events),
+        "missing_in_thegraph": missing_in_thegraph,
+        "indexed_to_block": indexed_to_block,
+    }
+    missing_by_type = dict(Counter(event["topic"] for event in missing_events))
+    logger.info(
+        f"Reconciliation of blocks {from_block}-{indexed_to_block}: {report['thegraph_events']} events in TheGraph, "
+        f"{report['db_events']} in the DB - {report['missing_in_db']} missed by the live indexing {missing_by_type or ''}, "
+        f"{report['missing_in_thegraph']} missed by TheGraph"
+    )
+    return report